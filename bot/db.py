@@ -381,6 +381,10 @@ class Message(Base):
     )
     media_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
     is_read: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    idempotency_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    idempotency_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -393,6 +397,75 @@ class Message(Base):
         Index("idx_messages_conversation_id", "conversation_id"),
         Index("idx_messages_sender_id", "sender_id"),
         Index("idx_messages_created_at", "created_at"),
+        UniqueConstraint(
+            "conversation_id",
+            "sender_id",
+            "idempotency_key",
+            name="unique_message_idempotency",
+        ),
+    )
+
+
+class ConversationInbox(Base):
+    """Conversation inbox table - per-user projection of conversations.
+
+    One row per (user, conversation), kept up to date on message insert and
+    read-state update so the inbox can be listed with a single range scan.
+    """
+
+    __tablename__ = "conversation_inbox"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    conversation_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    peer_user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_message_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_message_sender_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_message_preview: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    unread_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    sort_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_conversation_inbox_user_sort",
+            "user_id",
+            sort_at.desc(),
+            conversation_id.desc(),
+        ),
+    )
+
+
+class ParticipantReadState(Base):
+    """Participant read state table - last read message per conversation member."""
+
+    __tablename__ = "participant_read_state"
+
+    conversation_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_read_message_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_read_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+
+
+class OutboxEvent(Base):
+    """Outbox table - domain events written in the same transaction as the change.
+
+    Rows are published to RabbitMQ in id order by the data service outbox
+    relay and deleted once the broker confirms them.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    # Events sharing a key (e.g. a conversation) are consumed in order
+    aggregate_key: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    correlation_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
 
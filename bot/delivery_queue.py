@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+"""Durable queue for outgoing Telegram notifications.
+
+Notification requests are written to a local SQLite database and
+acknowledged immediately; a sender loop delivers them at the rate Telegram
+accepts. Each request carries an idempotency key, so a notification service
+retry after a lost response does not send the message twice. Finished rows
+are kept as tombstones for ``tombstone_ttl`` seconds, so the key keeps
+deduplicating after delivery.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    chat_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    delivered_at REAL
+);
+"""
+
+_INDEXES = """
+DROP INDEX IF EXISTS idx_deliveries_due;
+CREATE INDEX IF NOT EXISTS idx_deliveries_pending ON deliveries (next_attempt_at, id)
+    WHERE delivered_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_deliveries_delivered ON deliveries (delivered_at)
+    WHERE delivered_at IS NOT NULL;
+"""
+
+
+@dataclass(slots=True)
+class Delivery:
+    """A queued notification."""
+
+    id: int
+    chat_id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+
+
+class DeliveryQueue:
+    """SQLite-backed notification queue.
+
+    SQLite calls are short and run in a worker thread so they never block the
+    event loop.
+    """
+
+    def __init__(self, path: str, tombstone_ttl: float = 86400.0):
+        """Open (and create if needed) the queue database.
+
+        Args:
+            path: SQLite database file
+            tombstone_ttl: Seconds a finished notification's idempotency key
+                is remembered
+        """
+        self.path = path
+        self.tombstone_ttl = tombstone_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(deliveries)")}
+        if "delivered_at" not in columns:
+            # Queue files created before tombstones were kept
+            self._db.execute("ALTER TABLE deliveries ADD COLUMN delivered_at REAL")
+        self._db.executescript(_INDEXES)
+
+    async def enqueue(
+        self,
+        chat_id: int,
+        kind: str,
+        payload: dict[str, Any],
+        idempotency_key: str | None = None,
+    ) -> bool:
+        """Store a notification for delivery.
+
+        Returns:
+            False if a notification with this idempotency key was already queued
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        now = time.time()
+
+        def insert() -> bool:
+            with self._lock, self._db:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO deliveries "
+                    "(idempotency_key, chat_id, kind, payload, next_attempt_at, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, int(chat_id), kind, json.dumps(payload), now, now),
+                )
+                return cursor.rowcount == 1
+
+        return await asyncio.to_thread(insert)
+
+    async def due(self, limit: int) -> list[Delivery]:
+        """Get up to ``limit`` deliveries whose next attempt is due."""
+
+        def select() -> list[Delivery]:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, chat_id, kind, payload, attempts FROM deliveries "
+                    "WHERE delivered_at IS NULL AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at, id LIMIT ?",
+                    (time.time(), limit),
+                ).fetchall()
+            return [
+                Delivery(row[0], row[1], row[2], json.loads(row[3]), row[4])
+                for row in rows
+            ]
+
+        return await asyncio.to_thread(select)
+
+    async def complete(self, delivery_ids: list[int]) -> None:
+        """Mark delivered (or abandoned) notifications in one transaction.
+
+        The rows stay as tombstones with their payload cleared, so their
+        idempotency keys still reject duplicates until ``purge`` removes them.
+        """
+        if not delivery_ids:
+            return
+        now = time.time()
+
+        def mark() -> None:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "UPDATE deliveries SET delivered_at = ?, payload = '{}' "
+                    "WHERE id = ?",
+                    [(now, delivery_id) for delivery_id in delivery_ids],
+                )
+
+        await asyncio.to_thread(mark)
+
+    async def purge(self) -> int:
+        """Delete tombstones older than ``tombstone_ttl``.
+
+        Returns:
+            Number of tombstones deleted
+        """
+        cutoff = time.time() - self.tombstone_ttl
+
+        def delete() -> int:
+            with self._lock, self._db:
+                return self._db.execute(
+                    "DELETE FROM deliveries WHERE delivered_at < ?", (cutoff,)
+                ).rowcount
+
+        return await asyncio.to_thread(delete)
+
+    async def reschedule(
+        self, retries: list[tuple[int, float]], count_attempt: bool = True
+    ) -> None:
+        """Postpone notifications.
+
+        Args:
+            retries: (id, delay seconds) pairs
+            count_attempt: Whether the postponement follows a failed attempt
+        """
+        if not retries:
+            return
+        now = time.time()
+        increment = 1 if count_attempt else 0
+
+        def update() -> None:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "UPDATE deliveries SET attempts = attempts + ?, "
+                    "next_attempt_at = ? WHERE id = ?",
+                    [
+                        (increment, now + delay, delivery_id)
+                        for delivery_id, delay in retries
+                    ],
+                )
+
+        await asyncio.to_thread(update)
+
+    async def size(self) -> int:
+        """Number of queued notifications that are not finished yet."""
+
+        def count() -> int:
+            with self._lock:
+                return self._db.execute(
+                    "SELECT COUNT(*) FROM deliveries WHERE delivered_at IS NULL"
+                ).fetchone()[0]
+
+        return await asyncio.to_thread(count)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+class DeliverySender:
+    """Delivers queued notifications within Telegram's rate limits.
+
+    Deliveries are taken in batches; at most one message per chat is sent per
+    batch and chats are spaced by ``chat_interval``. A ``retry_after`` from
+    Telegram pauses the whole sender, since it applies to the bot token.
+    """
+
+    def __init__(
+        self,
+        queue: DeliveryQueue,
+        send: Callable[[int, str, dict[str, Any]], Awaitable[None]],
+        batch_size: int = 30,
+        global_rate: float = 30.0,
+        chat_interval: float = 1.0,
+        max_attempts: int = 8,
+        poll_interval: float = 0.5,
+        purge_interval: float = 3600.0,
+    ):
+        """Initialize sender.
+
+        Args:
+            queue: Queue to drain
+            send: Coroutine sending one notification; raises on failure
+            batch_size: Deliveries taken from the queue at once
+            global_rate: Messages per second across all chats
+            chat_interval: Minimum seconds between messages to one chat
+            max_attempts: Attempts before a notification is abandoned
+            poll_interval: Seconds to wait when nothing is due
+            purge_interval: Seconds between purges of expired tombstones
+        """
+        self.queue = queue
+        self.send = send
+        self.batch_size = batch_size
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._last_sent: dict[int, float] = {}
+        self._paused_until = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the sender loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the sender loop; queued notifications stay on disk."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Send batches until the queue is drained, then poll."""
+        while True:
+            try:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+
+                started = time.monotonic()
+                if started >= self._next_purge:
+                    self._next_purge = started + self.purge_interval
+                    await self.queue.purge()
+
+                sent = await self.send_batch()
+
+                if not sent:
+                    await asyncio.sleep(self.poll_interval)
+                else:
+                    # Keep the average rate under the global limit
+                    budget = sent / self.global_rate
+                    await asyncio.sleep(max(0.0, budget - (time.monotonic() - started)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Delivery sender error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def send_batch(self) -> int:
+        """Send one batch of due notifications.
+
+        Returns:
+            Number of send attempts made
+        """
+        deliveries = await self.queue.due(self.batch_size)
+        now = time.monotonic()
+
+        batch: list[Delivery] = []
+        deferred: list[tuple[int, float]] = []
+        chats: set[int] = set()
+        for delivery in deliveries:
+            wait = self._last_sent.get(delivery.chat_id, 0.0) + self.chat_interval
+            if delivery.chat_id in chats or wait > now:
+                # Same chat already in this batch or sent too recently
+                deferred.append((delivery.id, max(wait - now, self.chat_interval)))
+                continue
+            chats.add(delivery.chat_id)
+            batch.append(delivery)
+
+        results = await asyncio.gather(*(self._deliver(delivery) for delivery in batch))
+
+        done = [
+            delivery.id
+            for delivery, result in zip(batch, results, strict=True)
+            if result is None
+        ]
+        retries = [
+            (delivery.id, result)
+            for delivery, result in zip(batch, results, strict=True)
+            if result is not None
+        ]
+
+        await self.queue.complete(done)
+        await self.queue.reschedule(retries)
+        # Deferral is not a failed attempt; keep attempts for real retries
+        await self.queue.reschedule(deferred, count_attempt=False)
+
+        self._forget_idle_chats(now)
+        return len(batch)
+
+    async def _deliver(self, delivery: Delivery) -> float | None:
+        """Send one notification.
+
+        Returns:
+            None when finished (sent or abandoned), otherwise the retry delay
+        """
+        try:
+            await self.send(delivery.chat_id, delivery.kind, delivery.payload)
+            self._last_sent[delivery.chat_id] = time.monotonic()
+            return None
+        except TelegramRetryAfter as e:
+            logger.warning(f"Telegram rate limit hit, retrying after {e.retry_after}s")
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + e.retry_after
+            )
+            return float(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Bot blocked or chat gone: retrying will not help
+            logger.warning(
+                f"Dropping notification for chat {delivery.chat_id}: {e}",
+                extra={"event_type": "notification_dropped"},
+            )
+            return None
+        except Exception as e:
+            if delivery.attempts + 1 >= self.max_attempts:
+                logger.error(
+                    f"Giving up on notification for chat {delivery.chat_id} "
+                    f"after {delivery.attempts + 1} attempts: {e}",
+                    extra={"event_type": "notification_abandoned"},
+                )
+                return None
+            logger.warning(f"Notification send failed, will retry: {e}")
+            return min(300.0, 2.0**delivery.attempts)
+
+    def _forget_idle_chats(self, now: float) -> None:
+        """Drop per-chat timestamps older than the chat interval."""
+        cutoff = now - self.chat_interval
+        for chat_id in [c for c, t in self._last_sent.items() if t < cutoff]:
+            del self._last_sent[chat_id]
@@ -24,11 +24,15 @@ from aiohttp import web
 from core.utils.logging import configure_logging
 
 from .config import load_config
+from .delivery_queue import DeliveryQueue, DeliverySender
 
 # Bot instance for notifications (set during initialization)
 _bot_instance: Bot = None
 _dp_instance: Dispatcher = None
 
+# Durable delivery queue (enabled with DELIVERY_QUEUE_PATH)
+_delivery_queue: DeliveryQueue = None
+
 
 # Command handlers
 async def start_command_handler(message: Message) -> None:
@@ -67,6 +71,30 @@ async def start_command_handler(message: Message) -> None:
     )
 
 
+async def _queue_notification(
+    request: web.Request,
+    data: dict[str, Any],
+    kind: str,
+    user_id: int,
+    payload: dict[str, Any],
+) -> web.Response:
+    """Accept a notification into the delivery queue.
+
+    The idempotency key comes from the ``Idempotency-Key`` header or the
+    ``idempotency_key`` body field; a repeated key is accepted but not queued
+    again.
+    """
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get(
+        "idempotency_key"
+    )
+    queued = await _delivery_queue.enqueue(user_id, kind, payload, idempotency_key)
+
+    return web.json_response(
+        {"status": "accepted", "user_id": user_id, "duplicate": not queued},
+        status=202,
+    )
+
+
 # HTTP handlers for receiving notification requests from notification service
 async def send_match_notification_handler(request: web.Request) -> web.Response:
     """HTTP endpoint to send match notification.
@@ -89,6 +117,11 @@ async def send_match_notification_handler(request: web.Request) -> web.Response:
         if not user_id:
             return web.json_response({"error": "user_id is required"}, status=400)
 
+        if _delivery_queue:
+            return await _queue_notification(
+                request, data, "match", user_id, match_data
+            )
+
         success = await send_match_notification(user_id, match_data)
 
         if success:
@@ -123,6 +156,11 @@ async def send_message_notification_handler(request: web.Request) -> web.Respons
         if not user_id:
             return web.json_response({"error": "user_id is required"}, status=400)
 
+        if _delivery_queue:
+            return await _queue_notification(
+                request, data, "message", user_id, message_data
+            )
+
         success = await send_message_notification(user_id, message_data)
 
         if success:
@@ -158,6 +196,9 @@ async def send_like_notification_handler(request: web.Request) -> web.Response:
         if not user_id:
             return web.json_response({"error": "user_id is required"}, status=400)
 
+        if _delivery_queue:
+            return await _queue_notification(request, data, "like", user_id, like_data)
+
         success = await send_like_notification(user_id, like_data)
 
         if success:
@@ -176,6 +217,53 @@ async def health_check_handler(request: web.Request) -> web.Response:
     return web.json_response({"status": "ok", "service": "telegram-bot"})
 
 
+# Notification texts; "count" > 1 marks a digest from the notification scheduler
+def render_match_text(match_data: dict[str, Any]) -> str:
+    """Build the text of a match notification."""
+    count = match_data.get("count", 1)
+    if count > 1:
+        return f"💕 У вас новые матчи: {count}"
+
+    match_name = match_data.get("name", "Someone")
+    return f"💕 У вас новый матч!\n\n{match_name} тоже лайкнул(а) вас!"
+
+
+def render_message_text(message_data: dict[str, Any]) -> str:
+    """Build the text of a message notification."""
+    sender_name = message_data.get("sender_name", "Someone")
+    message_preview = message_data.get("preview", "...")
+    count = message_data.get("count", 1)
+    if count > 1:
+        return f"💬 Новые сообщения: {count}\n\n{sender_name}: {message_preview}"
+
+    return f"💬 Новое сообщение от {sender_name}\n\n{message_preview}"
+
+
+def render_like_text(like_data: dict[str, Any]) -> str:
+    """Build the text of a like notification."""
+    count = like_data.get("count", 1)
+    if count > 1:
+        return f"❤️ У вас новые лайки: {count}"
+
+    liker_name = like_data.get("name", "Someone")
+    return f"❤️ {liker_name} лайкнул(а) вас!"
+
+
+NOTIFICATION_RENDERERS = {
+    "match": render_match_text,
+    "message": render_message_text,
+    "like": render_like_text,
+}
+
+
+async def _send_queued_notification(
+    chat_id: int, kind: str, payload: dict[str, Any]
+) -> None:
+    """Send a notification from the delivery queue; errors propagate."""
+    text = NOTIFICATION_RENDERERS[kind](payload)
+    await _bot_instance.send_message(chat_id=chat_id, text=text)
+
+
 # Internal notification sending functions
 async def send_match_notification(user_id: int, match_data: dict[str, Any]) -> bool:
     """Send notification about a new match.
@@ -194,10 +282,8 @@ async def send_match_notification(user_id: int, match_data: dict[str, Any]) -> b
         return False
 
     try:
-        match_name = match_data.get("name", "Someone")
         match_id = match_data.get("id", "")
-
-        message_text = f"💕 У вас новый матч!\n\n{match_name} тоже лайкнул(а) вас!"
+        message_text = render_match_text(match_data)
 
         await _bot_instance.send_message(chat_id=user_id, text=message_text)
 
@@ -240,10 +326,7 @@ async def send_message_notification(user_id: int, message_data: dict[str, Any])
         return False
 
     try:
-        sender_name = message_data.get("sender_name", "Someone")
-        message_preview = message_data.get("preview", "...")
-
-        message_text = f"💬 Новое сообщение от {sender_name}\n\n{message_preview}"
+        message_text = render_message_text(message_data)
 
         await _bot_instance.send_message(chat_id=user_id, text=message_text)
 
@@ -285,9 +368,7 @@ async def send_like_notification(user_id: int, like_data: dict[str, Any]) -> boo
         return False
 
     try:
-        liker_name = like_data.get("name", "Someone")
-
-        message_text = f"❤️ {liker_name} лайкнул(а) вас!"
+        message_text = render_like_text(like_data)
 
         await _bot_instance.send_message(chat_id=user_id, text=message_text)
 
@@ -322,9 +403,46 @@ def create_notification_app() -> web.Application:
     app.router.add_post("/notifications/like", send_like_notification_handler)
     app.router.add_get("/health", health_check_handler)
 
+    if os.getenv("DELIVERY_QUEUE_PATH"):
+        app.on_startup.append(start_delivery_queue)
+        app.on_cleanup.append(stop_delivery_queue)
+
     return app
 
 
+async def start_delivery_queue(app: web.Application) -> None:
+    """Open the delivery queue and start sending queued notifications."""
+    global _delivery_queue
+    logger = logging.getLogger(__name__)
+
+    _delivery_queue = DeliveryQueue(
+        os.environ["DELIVERY_QUEUE_PATH"],
+        tombstone_ttl=float(os.getenv("DELIVERY_TOMBSTONE_TTL", "86400")),
+    )
+    sender = DeliverySender(
+        _delivery_queue,
+        _send_queued_notification,
+        global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+        chat_interval=float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1")),
+    )
+    await sender.start()
+    app["delivery_sender"] = sender
+
+    logger.info(
+        f"Delivery queue opened with {await _delivery_queue.size()} pending",
+        extra={"event_type": "delivery_queue_started"},
+    )
+
+
+async def stop_delivery_queue(app: web.Application) -> None:
+    """Stop the sender; undelivered notifications stay on disk."""
+    global _delivery_queue
+
+    await app["delivery_sender"].stop()
+    _delivery_queue.close()
+    _delivery_queue = None
+
+
 async def run_notification_server(host: str = "0.0.0.0", port: int = 8080):
     """Run HTTP server for notification requests."""
     logger = logging.getLogger(__name__)
@@ -9,11 +9,11 @@ Epic C: Discovery, interactions, matches, and favorites.
 import logging
 from datetime import UTC, date, datetime
 
-from sqlalchemy import delete, func, or_, select
+from sqlalchemy import delete, func, insert, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .cache import get_cache
-from .db import Favorite, Interaction, Match, Photo, Profile, User
+from .db import Favorite, Interaction, Match, OutboxEvent, Photo, Profile, User
 
 logger = logging.getLogger(__name__)
 cache = get_cache()
@@ -643,6 +643,20 @@ class ProfileRepository:
                 # Unexpected: constraint violation but match still not found
                 raise
 
+        # Publish match.created through the outbox, committed with the match
+        await self.session.execute(
+            insert(OutboxEvent).values(
+                event_type="match.created",
+                aggregate_key=f"match:{user1_id}:{user2_id}",
+                payload={
+                    "match_id": match.id,
+                    "user_id_1": user1_id,
+                    "user_id_2": user2_id,
+                    "matched_at": datetime.now(UTC).isoformat(),
+                },
+            )
+        )
+
         # Invalidate match cache for both users
         cache.delete_pattern(f"matches:{user1_id}:")
         cache.delete_pattern(f"matches:{user2_id}:")
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+"""Durable work queue for write-behind ingestion.
+
+The producer side acknowledges a client only after RabbitMQ has confirmed the
+persistent message, so accepted work survives a crash of either service. The
+consumer side pulls deliveries in micro-batches and hands them to a single
+batch handler, so one database round-trip covers many queued items.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import aio_pika
+from aio_pika import DeliveryMode, IncomingMessage, Message
+
+logger = logging.getLogger(__name__)
+
+# Queue carrying chat messages from chat-service to data-service
+MESSAGE_INGEST_QUEUE = "chat.message_ingest"
+
+
+class MessageIngestPublisher:
+    """Publishes work items to a durable queue with publisher confirms."""
+
+    def __init__(self, rabbitmq_url: str, queue_name: str = MESSAGE_INGEST_QUEUE):
+        """Initialize publisher.
+
+        Args:
+            rabbitmq_url: RabbitMQ connection URL
+            queue_name: Durable queue to publish to
+        """
+        self.rabbitmq_url = rabbitmq_url
+        self.queue_name = queue_name
+        self.connection = None
+        self.channel = None
+
+    async def connect(self):
+        """Establish connection and declare the durable queue."""
+        try:
+            self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
+            # Publisher confirms make publish() wait for the broker ack
+            self.channel = await self.connection.channel(publisher_confirms=True)
+            await self.channel.declare_queue(self.queue_name, durable=True)
+
+            logger.info(f"Connected to RabbitMQ, ingest queue: {self.queue_name}")
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ: {e}", exc_info=True)
+            raise
+
+    async def enqueue(
+        self, item: dict[str, Any], message_id: str, correlation_id: str = None
+    ) -> None:
+        """Publish an item and wait until the broker has persisted it.
+
+        Args:
+            item: Work item payload
+            message_id: Unique ID of the item (used for deduplication)
+            correlation_id: Optional correlation ID for tracing
+
+        Raises:
+            RuntimeError: If the publisher is not connected
+            aio_pika.exceptions.DeliveryError: If the broker rejected the item
+        """
+        if not self.channel:
+            raise RuntimeError("Ingest publisher not connected to RabbitMQ")
+
+        headers = {}
+        if correlation_id:
+            headers["correlation_id"] = correlation_id
+
+        message = Message(
+            body=json.dumps(item).encode(),
+            delivery_mode=DeliveryMode.PERSISTENT,
+            message_id=message_id,
+            headers=headers,
+            content_type="application/json",
+        )
+
+        await self.channel.default_exchange.publish(
+            message, routing_key=self.queue_name
+        )
+
+    async def close(self):
+        """Close connection."""
+        if self.connection:
+            await self.connection.close()
+            logger.info("RabbitMQ connection closed")
+
+
+class BatchedQueueConsumer:
+    """Consumes a durable queue in micro-batches.
+
+    Deliveries are buffered until ``batch_size`` items arrive or
+    ``flush_interval`` seconds pass, then handed to ``handler`` as one list.
+    The whole batch is acked on success. If it fails, the items are retried
+    one at a time: items raising one of ``permanent_errors`` are moved to the
+    dead-letter queue, and a transient failure requeues that item and the rest
+    of the batch. The handler must be idempotent.
+
+    Requeueing waits with exponential backoff (``retry_delay`` doubling up to
+    ``max_retry_delay``) while holding the flush, so consumption pauses
+    during an outage instead of redelivering in a tight loop.
+    """
+
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        handler: Callable[[list[dict[str, Any]]], Awaitable[Any]],
+        queue_name: str = MESSAGE_INGEST_QUEUE,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+        permanent_errors: tuple[type[BaseException], ...] = (
+            ValueError,
+            KeyError,
+            TypeError,
+        ),
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        """Initialize consumer.
+
+        Args:
+            rabbitmq_url: RabbitMQ connection URL
+            handler: Async function receiving a list of decoded items
+            queue_name: Durable queue to consume
+            batch_size: Maximum items per handler call
+            flush_interval: Maximum seconds an item waits for its batch
+            permanent_errors: Exceptions meaning an item can never be handled
+            retry_delay: Seconds to wait before the first requeue after a
+                transient failure
+            max_retry_delay: Upper bound of the requeue backoff
+        """
+        self.rabbitmq_url = rabbitmq_url
+        self.handler = handler
+        self.queue_name = queue_name
+        self.dead_letter_queue_name = f"{queue_name}.dead"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.permanent_errors = permanent_errors
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connection = None
+        self.channel = None
+        self.queue = None
+        self._buffer: list[IncomingMessage] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        # Consecutive transient failures, drives the requeue backoff
+        self._failures = 0
+
+    async def connect(self):
+        """Establish connection and declare the durable queue."""
+        try:
+            self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
+            self.channel = await self.connection.channel()
+            # Allow a full batch (plus the one being flushed) to be in flight
+            await self.channel.set_qos(prefetch_count=self.batch_size * 2)
+            self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
+            await self.channel.declare_queue(self.dead_letter_queue_name, durable=True)
+
+            logger.info(f"Connected to RabbitMQ, ingest queue: {self.queue_name}")
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ: {e}", exc_info=True)
+            raise
+
+    async def start_consuming(self):
+        """Start consuming the queue."""
+        if not self.queue:
+            logger.error("Ingest consumer not connected")
+            return
+
+        await self.queue.consume(self._on_message)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Started consuming {self.queue_name}")
+
+    async def _on_message(self, message: IncomingMessage):
+        """Buffer a delivery and flush when the batch is full."""
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_loop(self):
+        """Flush partially filled batches on a timer."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Hand buffered deliveries to the handler and settle them."""
+        async with self._lock:
+            if not self._buffer:
+                return
+
+            buffered, self._buffer = self._buffer, []
+            deliveries = []
+            items = []
+            for delivery in buffered:
+                try:
+                    items.append(json.loads(delivery.body.decode()))
+                    deliveries.append(delivery)
+                except ValueError:
+                    logger.error(
+                        f"Dropping malformed item from {self.queue_name}",
+                        extra={"event_type": "ingest_malformed"},
+                    )
+                    await delivery.reject(requeue=False)
+
+            if not items:
+                return
+
+            try:
+                await self.handler(items)
+            except Exception as e:
+                logger.warning(
+                    f"Batch of {len(items)} items failed, retrying one by one: {e}"
+                )
+                await self._settle_individually(deliveries, items)
+                return
+
+            # One multiple-ack settles the whole batch on this channel
+            await deliveries[-1].ack(multiple=True)
+            self._failures = 0
+
+    async def _settle_individually(
+        self, deliveries: list[IncomingMessage], items: list[dict[str, Any]]
+    ):
+        """Handle items of a failed batch one at a time, in order.
+
+        Items that fail permanently are dead-lettered so they cannot block
+        the queue. The first transient failure requeues that item and every
+        item after it, preserving their order for the next attempt.
+        """
+        for index, (delivery, item) in enumerate(zip(deliveries, items, strict=True)):
+            try:
+                await self.handler([item])
+            except self.permanent_errors as e:
+                logger.error(
+                    f"Dead-lettering item from {self.queue_name}: {e}",
+                    extra={"event_type": "ingest_dead_lettered"},
+                )
+                await self._dead_letter(delivery, e)
+                continue
+            except Exception as e:
+                remaining = deliveries[index:]
+                self._failures += 1
+                delay = min(
+                    self.max_retry_delay, self.retry_delay * 2 ** (self._failures - 1)
+                )
+                logger.error(
+                    f"Item from {self.queue_name} failed, "
+                    f"requeueing {len(remaining)} items in {delay:.1f}s: {e}",
+                    exc_info=True,
+                )
+                await asyncio.sleep(delay)
+                for pending in remaining:
+                    await pending.nack(requeue=True)
+                return
+
+            await delivery.ack()
+            self._failures = 0
+
+    async def _dead_letter(self, delivery: IncomingMessage, error: BaseException):
+        """Move a delivery to the dead-letter queue."""
+        headers = dict(delivery.headers or {})
+        headers["x-error"] = str(error)[:500]
+        try:
+            if self.channel is None:
+                raise RuntimeError("Ingest consumer not connected to RabbitMQ")
+            await self.channel.default_exchange.publish(
+                Message(
+                    body=delivery.body,
+                    delivery_mode=DeliveryMode.PERSISTENT,
+                    message_id=delivery.message_id,
+                    headers=headers,
+                    content_type=delivery.content_type,
+                ),
+                routing_key=self.dead_letter_queue_name,
+            )
+        except Exception as e:
+            logger.error(f"Failed to dead-letter item: {e}", exc_info=True)
+            await delivery.reject(requeue=False)
+            return
+
+        await delivery.ack()
+
+    async def close(self):
+        """Flush remaining items and close connection."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        await self.flush()
+
+        if self.connection:
+            await self.connection.close()
+            logger.info("RabbitMQ connection closed")
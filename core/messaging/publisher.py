@@ -1,26 +1,47 @@
 from __future__ import annotations
 
 """Event publisher for RabbitMQ."""
-import json
+import asyncio
 import logging
+import uuid
+from collections import deque
+from datetime import UTC, datetime
 from typing import Any
 
 import aio_pika
 from aio_pika import DeliveryMode, ExchangeType, Message
+from prometheus_client import Counter, Gauge
+
+from core.messaging.serialization import encode_event
 
 logger = logging.getLogger(__name__)
 
+# Outbox metrics for the batching publisher
+EVENT_OUTBOX_SIZE = Gauge(
+    "event_publisher_outbox_size", "Events waiting to be published", ["service"]
+)
+EVENTS_PUBLISHED = Counter(
+    "event_publisher_published_total", "Events confirmed by the broker", ["service"]
+)
+EVENTS_DROPPED = Counter(
+    "event_publisher_dropped_total",
+    "Events dropped because the outbox was full or they could not be encoded",
+    ["service"],
+)
+
 
 class EventPublisher:
     """Publishes events to RabbitMQ."""
 
-    def __init__(self, rabbitmq_url: str):
+    def __init__(self, rabbitmq_url: str, serializer: str = "json"):
         """Initialize publisher.
 
         Args:
             rabbitmq_url: RabbitMQ connection URL
+            serializer: Event body encoding, "json" or "msgpack"
         """
         self.rabbitmq_url = rabbitmq_url
+        self.serializer = serializer
         self.connection = None
         self.channel = None
         self.exchange = None
@@ -42,7 +63,11 @@ class EventPublisher:
             raise
 
     async def publish_event(
-        self, event_type: str, data: dict[str, Any], correlation_id: str = None
+        self,
+        event_type: str,
+        data: dict[str, Any],
+        correlation_id: str = None,
+        message_id: str = None,
     ) -> bool:
         """Publish event to exchange.
 
@@ -50,6 +75,7 @@ class EventPublisher:
             event_type: Event routing key (e.g., "match.created")
             data: Event payload
             correlation_id: Optional correlation ID for tracing
+            message_id: Stable message id for consumer deduplication
 
         Returns:
             True if published successfully
@@ -59,29 +85,15 @@ class EventPublisher:
             return False
 
         try:
-            # Prepare message
-            message_body = json.dumps(data).encode()
-            headers = {}
-            if correlation_id:
-                headers["correlation_id"] = correlation_id
-
-            message = Message(
-                body=message_body,
-                delivery_mode=DeliveryMode.PERSISTENT,
-                headers=headers,
-                content_type="application/json",
-            )
-
             # Publish to exchange with routing key
-            await self.exchange.publish(message, routing_key=event_type)
+            await self.exchange.publish(
+                self._build_message(data, correlation_id, message_id),
+                routing_key=event_type,
+            )
 
-            logger.info(
+            logger.debug(
                 f"Published event: {event_type}",
-                extra={
-                    "event_type": event_type,
-                    "correlation_id": correlation_id,
-                    "data": data,
-                },
+                extra={"event_type": event_type, "correlation_id": correlation_id},
             )
             return True
 
@@ -89,8 +101,242 @@ class EventPublisher:
             logger.error(f"Failed to publish event {event_type}: {e}", exc_info=True)
             return False
 
+    def _build_message(
+        self,
+        data: dict[str, Any],
+        correlation_id: str = None,
+        message_id: str = None,
+    ) -> Message:
+        """Build a persistent AMQP message for an event.
+
+        Every message gets a message id (for consumer deduplication) and a
+        timestamp (for consumer lag metrics).
+        """
+        body, content_type = encode_event(data, self.serializer)
+        headers: dict[str, Any] = {}
+        if correlation_id:
+            headers["correlation_id"] = correlation_id
+
+        return Message(
+            body=body,
+            delivery_mode=DeliveryMode.PERSISTENT,
+            headers=headers,
+            content_type=content_type,
+            message_id=message_id or uuid.uuid4().hex,
+            timestamp=datetime.now(UTC),
+        )
+
     async def close(self):
         """Close connection."""
         if self.connection:
             await self.connection.close()
             logger.info("RabbitMQ connection closed")
+
+
+class BatchingEventPublisher(EventPublisher):
+    """Publishes events from a local outbox in confirmed, pipelined micro-batches.
+
+    ``publish_event`` only appends to a bounded in-memory outbox and returns,
+    so callers never wait for the broker. A background task drains the outbox
+    in batches of up to ``batch_size`` events (or whatever accumulated within
+    ``flush_interval``), keeps at most ``max_in_flight`` unconfirmed publishes
+    outstanding, and puts events back at the head of the outbox when the
+    broker is unavailable or nacks them. Events that cannot be encoded are
+    dropped, since retrying them can never succeed.
+    """
+
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        service_name: str = "unknown",
+        serializer: str = "json",
+        batch_size: int = 100,
+        flush_interval: float = 0.01,
+        max_in_flight: int = 256,
+        max_outbox_size: int = 10000,
+        retry_delay: float = 1.0,
+    ):
+        """Initialize publisher.
+
+        Args:
+            rabbitmq_url: RabbitMQ connection URL
+            service_name: Service label for metrics
+            serializer: Event body encoding, "json" or "msgpack"
+            batch_size: Maximum events per flush
+            flush_interval: Seconds to wait for a batch to fill
+            max_in_flight: Maximum unconfirmed publishes
+            max_outbox_size: Events buffered before new ones are dropped
+            retry_delay: Seconds to wait after a failed flush
+        """
+        super().__init__(rabbitmq_url, serializer)
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_in_flight = max_in_flight
+        self.retry_delay = retry_delay
+        self.max_outbox_size = max_outbox_size
+        # (event_type, data, correlation_id, message_id)
+        self.outbox: deque[tuple[str, dict[str, Any], str | None, str]] = deque()
+        self._wakeup = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._flusher: asyncio.Task | None = None
+
+    async def connect(self):
+        """Establish connection and start the background flusher.
+
+        A broker that is down at startup does not fail the service; events
+        are buffered and published once the connection comes up.
+        """
+        try:
+            await super().connect()
+        except Exception:
+            logger.warning("RabbitMQ unavailable, buffering events in outbox")
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def publish_event(
+        self,
+        event_type: str,
+        data: dict[str, Any],
+        correlation_id: str = None,
+        message_id: str = None,
+    ) -> bool:
+        """Queue event for publishing.
+
+        The message id is fixed here, so an event resent after a failed
+        flush keeps it and consumers can deduplicate the copies.
+
+        Args:
+            event_type: Event routing key (e.g., "match.created")
+            data: Event payload
+            correlation_id: Optional correlation ID for tracing
+            message_id: Stable message id for consumer deduplication
+
+        Returns:
+            True if the event was queued, False if the outbox is full
+        """
+        if len(self.outbox) >= self.max_outbox_size:
+            EVENTS_DROPPED.labels(service=self.service_name).inc()
+            logger.warning(
+                f"Event outbox full, dropping event: {event_type}",
+                extra={"event_type": event_type, "correlation_id": correlation_id},
+            )
+            return False
+
+        self.outbox.append(
+            (event_type, data, correlation_id, message_id or uuid.uuid4().hex)
+        )
+        EVENT_OUTBOX_SIZE.labels(service=self.service_name).set(len(self.outbox))
+
+        if len(self.outbox) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _flush_loop(self):
+        """Drain the outbox until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self.outbox:
+                if not await self.flush_batch():
+                    await asyncio.sleep(self.retry_delay)
+                    break
+
+    async def flush_batch(self) -> bool:
+        """Publish one batch from the outbox.
+
+        Returns:
+            True if every event in the batch was confirmed
+        """
+        if not self.outbox:
+            return True
+        if not self.exchange:
+            try:
+                await super().connect()
+            except Exception:
+                return False
+
+        batch: list[tuple[str, dict[str, Any], str | None, str]] = []
+        messages: list[Message] = []
+        while self.outbox and len(batch) < self.batch_size:
+            event = self.outbox.popleft()
+            event_type, data, correlation_id, message_id = event
+            try:
+                messages.append(self._build_message(data, correlation_id, message_id))
+            except (TypeError, ValueError) as e:
+                # An unencodable event would block the outbox forever
+                EVENTS_DROPPED.labels(service=self.service_name).inc()
+                logger.error(
+                    f"Dropping event that cannot be encoded: {event_type}: {e}",
+                    extra={"event_type": event_type, "correlation_id": correlation_id},
+                )
+                continue
+            batch.append(event)
+
+        # Publishes are written in order; confirms are awaited concurrently
+        results = await asyncio.gather(
+            *(
+                self._publish_confirmed(event[0], message)
+                for event, message in zip(batch, messages, strict=True)
+            ),
+            return_exceptions=True,
+        )
+
+        confirmed = sum(1 for result in results if result is None)
+        if confirmed:
+            EVENTS_PUBLISHED.labels(service=self.service_name).inc(confirmed)
+
+        first_failure = next(
+            (index for index, result in enumerate(results) if result is not None),
+            None,
+        )
+        if first_failure is not None:
+            retry = batch[first_failure:]
+            logger.warning(
+                f"Failed to publish {len(batch) - confirmed} events, "
+                f"will retry {len(retry)} events from the first failure"
+            )
+            # Requeue from the first failure on, so consumers see the events
+            # in their original order (confirmed ones after it are resent)
+            self.outbox.extendleft(reversed(retry))
+
+        EVENT_OUTBOX_SIZE.labels(service=self.service_name).set(len(self.outbox))
+        return first_failure is None
+
+    async def _publish_confirmed(
+        self, event_type: str, message: Message
+    ) -> Exception | None:
+        """Publish one event and wait for its confirm within the window."""
+        async with self._in_flight:
+            try:
+                if self.exchange is None:
+                    raise ConnectionError("Publisher not connected to RabbitMQ")
+                await self.exchange.publish(message, routing_key=event_type)
+                return None
+            except Exception as e:
+                return e
+
+    async def close(self, timeout: float = 5.0):
+        """Flush what is left (bounded by ``timeout``) and close connection."""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        try:
+            async with asyncio.timeout(timeout):
+                while self.outbox and await self.flush_batch():
+                    pass
+        except TimeoutError:
+            pass
+
+        if self.outbox:
+            logger.warning(f"Closing with {len(self.outbox)} unpublished events")
+
+        await super().close()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+"""Event body serialization for RabbitMQ messages."""
+
+import json
+from typing import Any
+
+import msgpack
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+
+SERIALIZERS = {
+    "json": CONTENT_TYPE_JSON,
+    "msgpack": CONTENT_TYPE_MSGPACK,
+}
+
+
+def encode_event(data: dict[str, Any], serializer: str = "json") -> tuple[bytes, str]:
+    """Serialize an event payload.
+
+    Args:
+        data: Event payload
+        serializer: "json" or "msgpack"
+
+    Returns:
+        Tuple of body bytes and content type
+    """
+    if serializer == "msgpack":
+        return msgpack.packb(data, use_bin_type=True, default=str), CONTENT_TYPE_MSGPACK
+    return json.dumps(data, separators=(",", ":")).encode(), CONTENT_TYPE_JSON
+
+
+def decode_event(body: bytes, content_type: str | None = None) -> dict[str, Any]:
+    """Deserialize an event body according to its content type.
+
+    Messages without a content type are treated as JSON.
+    """
+    if content_type == CONTENT_TYPE_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body.decode())
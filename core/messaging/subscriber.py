@@ -1,65 +1,204 @@
 from __future__ import annotations
 
 """Event subscriber for RabbitMQ."""
-import json
+import asyncio
 import logging
+import time
+import zlib
+from collections import OrderedDict
 from collections.abc import Callable
+from typing import Any
 
 import aio_pika
-from aio_pika import ExchangeType, IncomingMessage
+from aio_pika import DeliveryMode, ExchangeType, IncomingMessage, Message
+from aio_pika.abc import AbstractChannel
+from prometheus_client import Counter, Gauge, Histogram
+
+from core.messaging.serialization import decode_event
 
 logger = logging.getLogger(__name__)
 
+# Header carrying how many times an event has been retried
+RETRY_COUNT_HEADER = "x-retry-count"
+
+# Header carrying the event's routing key on retried and dead-lettered copies
+ORIGINAL_ROUTING_KEY_HEADER = "x-original-routing-key"
+
+EVENTS_CONSUMED = Counter(
+    "event_consumer_events_total",
+    "Events processed by subscribers",
+    ["service", "event_type", "result"],
+)
+EVENT_CONSUMER_LAG = Histogram(
+    "event_consumer_lag_seconds",
+    "Time from publishing an event to the end of its processing",
+    ["service", "event_type"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+EVENT_QUEUE_DEPTH = Gauge(
+    "event_consumer_queue_depth",
+    "Events waiting in the broker queue",
+    ["service", "queue"],
+)
+EVENT_WORKER_BACKLOG = Gauge(
+    "event_consumer_worker_backlog",
+    "Events received from the broker and waiting for a worker",
+    ["service"],
+)
+
+
+def _retry_count(message: IncomingMessage) -> int:
+    """Number of retries recorded on a delivery (0 if missing or invalid)."""
+    value = message.headers.get(RETRY_COUNT_HEADER, 0)
+    try:
+        return int(value) if isinstance(value, int | str) else 0
+    except ValueError:
+        return 0
+
+
+class _BatchRoute:
+    """Buffer of deliveries for one batch handler."""
+
+    def __init__(self, handler: Callable, max_batch: int, max_wait: float):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.buffer: list[tuple[IncomingMessage, dict[str, Any]]] = []
+        self.flush_task: asyncio.Task | None = None
+
 
 class EventSubscriber:
-    """Subscribes to events from RabbitMQ."""
+    """Subscribes to events from RabbitMQ.
+
+    Events are spread over ``workers`` worker tasks. Events that share an
+    ordering key (e.g. a user or conversation id) always go to the same worker
+    and are processed in order; different keys run in parallel. A failed
+    event is retried up to ``max_retries`` times and then moved to the
+    ``<service>.events.dead`` queue instead of being requeued forever.
+    """
 
-    def __init__(self, rabbitmq_url: str, service_name: str):
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        service_name: str,
+        workers: int = 1,
+        prefetch_count: int | None = None,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+        dedup_window: int = 10000,
+    ):
         """Initialize subscriber.
 
         Args:
             rabbitmq_url: RabbitMQ connection URL
             service_name: Name of the service (for queue naming)
+            workers: Number of concurrent worker tasks
+            prefetch_count: Unacked deliveries allowed (default 10 per worker)
+            max_retries: Retries before an event is dead-lettered
+            retry_delay: Base delay in seconds before a retry (linear backoff)
+            dedup_window: Recently processed message ids remembered for
+                deduplication
         """
         self.rabbitmq_url = rabbitmq_url
         self.service_name = service_name
+        self.workers = max(1, workers)
+        self.prefetch_count = prefetch_count or 10 * self.workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.dedup_window = dedup_window
         self.connection = None
-        self.channel = None
+        self.channel: AbstractChannel | None = None
         self.exchange = None
         self.queue = None
+        self.queue_name = f"{service_name}.events"
+        self.dead_letter_queue_name = f"{service_name}.events.dead"
         self.handlers: dict[str, Callable] = {}
+        self.ordering_keys: dict[str, str | Callable | None] = {}
+        self.batch_routes: dict[str, _BatchRoute] = {}
+        # Handlers run on every replica, from a queue of this process only
+        self.broadcast_handlers: dict[str, Callable] = {}
+        self.broadcast_queue = None
+        self._worker_queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._round_robin = 0
+        self._seen_message_ids: OrderedDict[str, None] = OrderedDict()
 
     async def connect(self):
         """Establish connection to RabbitMQ."""
         try:
             self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
             self.channel = await self.connection.channel()
-            await self.channel.set_qos(prefetch_count=10)
+            await self.channel.set_qos(prefetch_count=self.prefetch_count)
 
             # Declare exchange
             self.exchange = await self.channel.declare_exchange(
                 "dating.events", ExchangeType.TOPIC, durable=True
             )
 
-            # Create service-specific queue
-            queue_name = f"{self.service_name}.events"
-            self.queue = await self.channel.declare_queue(queue_name, durable=True)
+            # Create service-specific queue and its dead-letter queue
+            self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
+            await self.channel.declare_queue(self.dead_letter_queue_name, durable=True)
 
-            logger.info(f"Connected to RabbitMQ, queue: {queue_name}")
+            logger.info(f"Connected to RabbitMQ, queue: {self.queue_name}")
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}", exc_info=True)
             raise
 
-    def register_handler(self, event_pattern: str, handler: Callable):
+    def register_handler(
+        self,
+        event_pattern: str,
+        handler: Callable,
+        ordering_key: str | Callable[[dict], Any] | None = None,
+    ):
         """Register handler for event pattern.
 
         Args:
             event_pattern: Routing key pattern (e.g., "match.*", "message.sent")
             handler: Async function to handle event
+            ordering_key: Payload field (or function of the payload) whose
+                value keeps events in order; None spreads events freely
         """
         self.handlers[event_pattern] = handler
+        self.ordering_keys[event_pattern] = ordering_key
         logger.info(f"Registered handler for pattern: {event_pattern}")
 
+    def register_batch_handler(
+        self,
+        event_pattern: str,
+        handler: Callable,
+        max_batch: int = 50,
+        max_wait: float = 0.1,
+    ):
+        """Register a handler that receives events in batches.
+
+        If a batch fails, its events are handled again one at a time so only
+        the events that fail on their own are retried or dead-lettered.
+
+        Args:
+            event_pattern: Routing key pattern
+            handler: Async function receiving a list of event payloads
+            max_batch: Maximum events per handler call
+            max_wait: Maximum seconds an event waits for its batch
+        """
+        self.handlers[event_pattern] = handler
+        self.batch_routes[event_pattern] = _BatchRoute(handler, max_batch, max_wait)
+        logger.info(f"Registered batch handler for pattern: {event_pattern}")
+
+    def register_broadcast_handler(self, event_pattern: str, handler: Callable):
+        """Register a handler that every replica runs for each matching event.
+
+        Events of the shared service queue reach only one replica. Broadcast
+        events (e.g. cache invalidations) are instead consumed from an
+        exclusive, auto-delete queue of this process. They are not retried:
+        a failed or missed event is logged and dropped.
+
+        Args:
+            event_pattern: Routing key pattern
+            handler: Async function to handle event
+        """
+        self.broadcast_handlers[event_pattern] = handler
+        logger.info(f"Registered broadcast handler for pattern: {event_pattern}")
+
     async def start_consuming(self):
         """Start consuming events from queue."""
         if not self.queue:
@@ -71,45 +210,353 @@ class EventSubscriber:
             await self.queue.bind(self.exchange, routing_key=pattern)
             logger.info(f"Bound queue to pattern: {pattern}")
 
+        if self.broadcast_handlers:
+            await self._consume_broadcasts()
+
+        # Start workers, each owning the keys that hash to it
+        self._worker_queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(worker_queue))
+            for worker_queue in self._worker_queues
+        ]
+        self._tasks.append(asyncio.create_task(self._monitor_queue_depth()))
+
         # Start consuming
         await self.queue.consume(self._process_message)
-        logger.info("Started consuming events")
+        logger.info(f"Started consuming events with {self.workers} workers")
+
+    async def _consume_broadcasts(self):
+        """Consume broadcast patterns from a queue owned by this process."""
+        channel = self._connected_channel()
+        # Server-named, deleted with the connection
+        self.broadcast_queue = await channel.declare_queue(
+            exclusive=True, auto_delete=True
+        )
+        for pattern in self.broadcast_handlers:
+            # Older deployments bound these to the shared queue
+            await self.queue.unbind(self.exchange, routing_key=pattern)
+            await self.broadcast_queue.bind(self.exchange, routing_key=pattern)
+            logger.info(f"Bound broadcast queue to pattern: {pattern}")
+        await self.broadcast_queue.consume(self._process_broadcast)
+
+    async def _process_broadcast(self, message: IncomingMessage):
+        """Run the broadcast handler for a delivery and ack it."""
+        event_type = self._event_type(message)
+        pattern = self._find_pattern(event_type, self.broadcast_handlers)
+        try:
+            if pattern:
+                data = decode_event(message.body, message.content_type)
+                await self.broadcast_handlers[pattern](
+                    data, correlation_id=message.headers.get("correlation_id")
+                )
+                result = "success"
+            else:
+                result = "error"
+                logger.warning(f"No broadcast handler for event: {event_type}")
+        except Exception as e:
+            result = "error"
+            logger.error(f"Error processing broadcast event: {e}", exc_info=True)
+
+        await message.ack()
+        EVENTS_CONSUMED.labels(
+            service=self.service_name, event_type=event_type, result=result
+        ).inc()
 
     async def _process_message(self, message: IncomingMessage):
-        """Process incoming message."""
-        async with message.process():
-            try:
-                # Parse message
-                data = json.loads(message.body.decode())
-                routing_key = message.routing_key
-                correlation_id = message.headers.get("correlation_id")
-
-                logger.info(
-                    f"Received event: {routing_key}",
-                    extra={"event_type": routing_key, "correlation_id": correlation_id},
+        """Route an incoming delivery to a worker or batch buffer."""
+        try:
+            data = decode_event(message.body, message.content_type)
+        except Exception as e:
+            logger.error(f"Dropping undecodable event: {e}")
+            await self._dead_letter(message)
+            return
+
+        pattern = self._find_pattern(self._event_type(message))
+
+        if pattern in self.batch_routes:
+            self._buffer_for_batch(self.batch_routes[pattern], message, data)
+            return
+
+        worker_index = self._select_worker(pattern, data)
+        self._worker_queues[worker_index].put_nowait((message, data, pattern))
+        EVENT_WORKER_BACKLOG.labels(service=self.service_name).inc()
+
+    def _select_worker(self, pattern: str | None, data: dict[str, Any]) -> int:
+        """Pick the worker for an event from its ordering key."""
+        key_spec = self.ordering_keys.get(pattern) if pattern else None
+        key = None
+        if callable(key_spec):
+            key = key_spec(data)
+        elif key_spec:
+            key = data.get(key_spec)
+
+        if key is None:
+            self._round_robin = (self._round_robin + 1) % self.workers
+            return self._round_robin
+
+        # Stable hash so a key keeps its worker for the process lifetime
+        return zlib.crc32(str(key).encode()) % self.workers
+
+    async def _worker(self, worker_queue: asyncio.Queue):
+        """Process events of one worker in order."""
+        while True:
+            message, data, pattern = await worker_queue.get()
+            EVENT_WORKER_BACKLOG.labels(service=self.service_name).dec()
+            handler = self.handlers.get(pattern) if pattern else None
+
+            async def call(handler=handler, message=message, data=data):
+                await handler(
+                    data, correlation_id=message.headers.get("correlation_id")
                 )
 
-                # Find and call handler
-                handler = self._find_handler(routing_key or "")
-                if handler:
-                    await handler(data, correlation_id=correlation_id)
+            await self._run(message, call if handler else None)
+
+    async def _run(self, message: IncomingMessage, call: Callable | None):
+        """Run a handler for one delivery and settle it."""
+        routing_key = self._event_type(message)
+        correlation_id = message.headers.get("correlation_id")
+
+        if self._is_duplicate(message):
+            logger.debug(f"Skipping duplicate event: {routing_key}")
+            await message.ack()
+            return
+
+        logger.debug(
+            f"Received event: {routing_key}",
+            extra={"event_type": routing_key, "correlation_id": correlation_id},
+        )
+
+        if call is None:
+            logger.warning(f"No handler for event: {routing_key}")
+            await message.ack()
+            return
+
+        try:
+            await call()
+        except Exception as e:
+            logger.error(f"Error processing message: {e}", exc_info=True)
+            EVENTS_CONSUMED.labels(
+                service=self.service_name, event_type=routing_key, result="error"
+            ).inc()
+            await self._retry_or_dead_letter(message)
+            return
+
+        self._remember(message)
+        await message.ack()
+        EVENTS_CONSUMED.labels(
+            service=self.service_name, event_type=routing_key, result="success"
+        ).inc()
+        self._observe_lag(message)
+
+    def _buffer_for_batch(
+        self, route: _BatchRoute, message: IncomingMessage, data: dict[str, Any]
+    ):
+        """Add a delivery to its batch and schedule a flush."""
+        route.buffer.append((message, data))
+        if len(route.buffer) >= route.max_batch:
+            asyncio.create_task(self._flush_batch(route))
+        elif route.flush_task is None or route.flush_task.done():
+            route.flush_task = asyncio.create_task(self._flush_after(route))
+
+    async def _flush_after(self, route: _BatchRoute):
+        """Flush a partially filled batch after its max wait."""
+        await asyncio.sleep(route.max_wait)
+        await self._flush_batch(route)
+
+    async def _flush_batch(self, route: _BatchRoute):
+        """Deliver buffered events to a batch handler and settle them."""
+        if not route.buffer:
+            return
+
+        batch = route.buffer[: route.max_batch]
+        route.buffer = route.buffer[route.max_batch :]
+        batch = [(msg, data) for msg, data in batch if not self._is_duplicate(msg)]
+        if not batch:
+            return
+
+        try:
+            await route.handler([data for _, data in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Batch event failed: {e}", exc_info=True)
+                await self._retry_or_dead_letter(batch[0][0])
+                return
+            # Find the failing events so healthy ones are not retried with them
+            logger.warning(
+                f"Batch of {len(batch)} events failed, retrying one by one: {e}"
+            )
+            for message, data in batch:
+                try:
+                    await route.handler([data])
+                except Exception as item_error:
+                    logger.error(
+                        f"Batch event failed: {item_error}",
+                        exc_info=True,
+                    )
+                    await self._retry_or_dead_letter(message)
                 else:
-                    logger.warning(f"No handler for event: {routing_key}")
+                    await self._settle_batched(message)
+            return
+
+        for message, _ in batch:
+            await self._settle_batched(message)
+
+    async def _settle_batched(self, message: IncomingMessage):
+        """Ack an event a batch handler processed."""
+        self._remember(message)
+        await message.ack()
+        EVENTS_CONSUMED.labels(
+            service=self.service_name,
+            event_type=self._event_type(message),
+            result="success",
+        ).inc()
+        self._observe_lag(message)
+
+    async def _retry_or_dead_letter(self, message: IncomingMessage):
+        """Schedule a retry, or dead-letter the event after max_retries."""
+        retries = _retry_count(message)
+        event_type = self._event_type(message)
 
+        if retries >= self.max_retries:
+            logger.error(
+                f"Event {event_type} failed {retries + 1} times, "
+                f"moving to {self.dead_letter_queue_name}",
+                extra={"event_type": "event_dead_lettered"},
+            )
+            EVENTS_CONSUMED.labels(
+                service=self.service_name,
+                event_type=event_type,
+                result="dead_lettered",
+            ).inc()
+            await self._dead_letter(message)
+            return
+
+        # Retry later without blocking the worker; the delivery stays unacked
+        # until the copy is safely republished
+        asyncio.create_task(self._republish_later(message, retries + 1))
+
+    async def _republish_later(self, message: IncomingMessage, retries: int):
+        """Republish a failed event to this service's queue after a delay."""
+        await asyncio.sleep(self.retry_delay * retries)
+        try:
+            # Sent straight to our queue; the event type travels in the copy
+            await self._connected_channel().default_exchange.publish(
+                self._copy(message, {RETRY_COUNT_HEADER: retries}),
+                routing_key=self.queue_name,
+            )
+            await message.ack()
+        except Exception as e:
+            logger.error(f"Failed to schedule retry: {e}")
+            await message.nack(requeue=True)
+
+    async def _dead_letter(self, message: IncomingMessage):
+        """Move an event to the dead-letter queue."""
+        try:
+            await self._connected_channel().default_exchange.publish(
+                self._copy(message, {}),
+                routing_key=self.dead_letter_queue_name,
+            )
+            await message.ack()
+        except Exception as e:
+            logger.error(f"Failed to dead-letter event: {e}")
+            await message.nack(requeue=True)
+
+    def _event_type(self, message: IncomingMessage) -> str:
+        """Get the routing key an event was originally published with.
+
+        Retries are republished directly to this service's queue, so their
+        delivery routing key is the queue name; the original key is carried
+        in a header and in the message type.
+        """
+        if message.routing_key == self.queue_name:
+            return str(
+                message.headers.get(ORIGINAL_ROUTING_KEY_HEADER) or message.type or ""
+            )
+        return message.routing_key or ""
+
+    def _connected_channel(self) -> AbstractChannel:
+        """The consumer's channel; raises ConnectionError if not connected."""
+        if self.channel is None:
+            raise ConnectionError("Subscriber not connected to RabbitMQ")
+        return self.channel
+
+    def _copy(self, message: IncomingMessage, extra_headers: dict[str, Any]) -> Message:
+        """Copy a delivery for republishing with extra headers."""
+        event_type = self._event_type(message)
+        return Message(
+            body=message.body,
+            delivery_mode=DeliveryMode.PERSISTENT,
+            headers={
+                **message.headers,
+                ORIGINAL_ROUTING_KEY_HEADER: event_type,
+                **extra_headers,
+            },
+            content_type=message.content_type,
+            message_id=message.message_id,
+            timestamp=message.timestamp,
+            type=event_type,
+        )
+
+    def _is_duplicate(self, message: IncomingMessage) -> bool:
+        """Check whether this message id was already processed."""
+        return bool(message.message_id) and (
+            message.message_id in self._seen_message_ids
+        )
+
+    def _remember(self, message: IncomingMessage):
+        """Record a processed message id for deduplication."""
+        if not message.message_id:
+            return
+        self._seen_message_ids[message.message_id] = None
+        if len(self._seen_message_ids) > self.dedup_window:
+            self._seen_message_ids.popitem(last=False)
+
+    def _observe_lag(self, message: IncomingMessage):
+        """Record end-to-end lag if the publisher set a timestamp."""
+        if message.timestamp:
+            EVENT_CONSUMER_LAG.labels(
+                service=self.service_name, event_type=self._event_type(message)
+            ).observe(max(0.0, time.time() - message.timestamp.timestamp()))
+
+    async def _monitor_queue_depth(self, interval: float = 15.0):
+        """Periodically export the broker-side queue depth."""
+        while True:
+            try:
+                queue = await self._connected_channel().declare_queue(
+                    self.queue_name, passive=True
+                )
+                EVENT_QUEUE_DEPTH.labels(
+                    service=self.service_name, queue=self.queue_name
+                ).set(queue.declaration_result.message_count or 0)
             except Exception as e:
-                logger.error(f"Error processing message: {e}", exc_info=True)
-                # Message will be requeued by aio_pika
+                logger.debug(f"Failed to read queue depth: {e}")
+            await asyncio.sleep(interval)
 
     def _find_handler(self, routing_key: str) -> Callable | None:
         """Find handler matching routing key."""
+        pattern = self._find_pattern(routing_key)
+        return self.handlers[pattern] if pattern else None
+
+    def _find_pattern(
+        self, routing_key: str, handlers: dict[str, Callable] | None = None
+    ) -> str | None:
+        """Find the registered pattern matching a routing key.
+
+        Args:
+            routing_key: Event routing key
+            handlers: Handlers to search (default: the shared queue's)
+        """
+        if handlers is None:
+            handlers = self.handlers
+
         # Exact match first
-        if routing_key in self.handlers:
-            return self.handlers[routing_key]
+        if routing_key in handlers:
+            return routing_key
 
         # Pattern match (e.g., "match.*" matches "match.created")
-        for pattern, handler in self.handlers.items():
+        for pattern in handlers:
             if self._matches_pattern(routing_key, pattern):
-                return handler
+                return pattern
 
         return None
 
@@ -128,7 +575,12 @@ class EventSubscriber:
         return True
 
     async def close(self):
-        """Close connection."""
+        """Stop workers and close connection."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
         if self.connection:
             await self.connection.close()
             logger.info("RabbitMQ connection closed")
@@ -8,6 +8,8 @@ from typing import Any
 
 from aiohttp import web
 
+from core.utils.path_router import PathRouter
+
 logger = logging.getLogger(__name__)
 
 # Critical operations that require audit logging
@@ -105,6 +107,36 @@ def audit_log(
     logger.log(log_level, f"AUDIT: {operation} by user {user_id}", extra=audit_entry)
 
 
+# (method, path prefix, operation) for requests audited automatically
+AUDITED_ENDPOINTS = [
+    # Authentication operations
+    ("POST", "/auth/validate", "user_login"),
+    ("POST", "/auth/refresh", "token_refresh"),
+    # Profile operations
+    ("POST", "/profiles", "profile_create"),
+    ("PUT", "/profiles", "profile_update"),
+    ("DELETE", "/profiles", "profile_delete"),
+    # Media operations
+    ("POST", "/media/upload", "file_upload"),
+    ("DELETE", "/media", "file_delete"),
+    # Discovery operations
+    ("POST", "/discovery/like", "profile_like"),
+    ("POST", "/discovery/dislike", "profile_dislike"),
+    # Chat operations
+    ("POST", "/chat/messages", "message_sent"),
+    # Admin operations
+    ("POST", "/admin/login", "admin_login"),
+    ("POST", "/admin/users/{user_id}/ban", "admin_user_ban"),
+    ("POST", "/admin/users/{user_id}/unban", "admin_user_unban"),
+]
+
+_OPERATION_ROUTERS: dict[str, PathRouter[str]] = {}
+for _method, _prefix, _operation in AUDITED_ENDPOINTS:
+    _OPERATION_ROUTERS.setdefault(_method, PathRouter()).add(
+        _prefix, _operation, prefix=True
+    )
+
+
 @web.middleware
 async def audit_logging_middleware(request: web.Request, handler) -> web.Response:
     """
@@ -139,48 +171,10 @@ async def audit_logging_middleware(request: web.Request, handler) -> web.Respons
 
 def _determine_operation(request: web.Request) -> str | None:
     """Determine the operation type based on request path and method."""
-    path = request.path
-    method = request.method
-
-    # Authentication operations
-    if path.startswith("/auth/validate") and method == "POST":
-        return "user_login"
-    elif path.startswith("/auth/refresh") and method == "POST":
-        return "token_refresh"
-
-    # Profile operations
-    elif path.startswith("/profiles") and method == "POST":
-        return "profile_create"
-    elif path.startswith("/profiles") and method == "PUT":
-        return "profile_update"
-    elif path.startswith("/profiles") and method == "DELETE":
-        return "profile_delete"
-
-    # Media operations
-    elif path.startswith("/media/upload") and method == "POST":
-        return "file_upload"
-    elif path.startswith("/media/") and method == "DELETE":
-        return "file_delete"
-
-    # Discovery operations
-    elif path.startswith("/discovery/like") and method == "POST":
-        return "profile_like"
-    elif path.startswith("/discovery/dislike") and method == "POST":
-        return "profile_dislike"
-
-    # Chat operations
-    elif path.startswith("/chat/messages") and method == "POST":
-        return "message_sent"
-
-    # Admin operations
-    elif path.startswith("/admin/login") and method == "POST":
-        return "admin_login"
-    elif path.startswith("/admin/users/") and "ban" in path and method == "POST":
-        return "admin_user_ban"
-    elif path.startswith("/admin/users/") and "unban" in path and method == "POST":
-        return "admin_user_unban"
-
-    return None
+    router = _OPERATION_ROUTERS.get(request.method)
+    if router is None:
+        return None
+    return router.match(request.path)
 
 
 def log_security_event(
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+"""Adaptive concurrency limit and load shedding.
+
+Each service admits at most ``limit`` requests at once. The limit follows
+observed latency with a gradient controller: while request latency stays
+near its long-term baseline the limit grows, and when latency rises
+(a slow database, a saturated pool) it shrinks proportionally. Failed
+requests halve the gradient.
+
+Requests over the limit wait briefly in a bounded queue and are otherwise
+rejected with 503 and ``Retry-After``, so a slow dependency degrades into
+fast failures instead of piling up until every caller times out.
+
+Priority classes reserve headroom: critical traffic (auth, chat) may use
+the whole limit, normal traffic most of it and low-priority traffic
+(admin, statistics) only half, and queued requests are admitted in
+priority order.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any
+
+from aiohttp import web
+from prometheus_client import Counter, Gauge
+
+from core.utils.path_router import PathRouter
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY_LIMIT = Gauge(
+    "concurrency_limit",
+    "Current adaptive concurrency limit",
+    ["service"],
+)
+
+CONCURRENCY_IN_FLIGHT = Gauge(
+    "concurrency_in_flight",
+    "Requests currently admitted by the concurrency limiter",
+    ["service"],
+)
+
+CONCURRENCY_QUEUE_DEPTH = Gauge(
+    "concurrency_queue_depth",
+    "Requests waiting for a concurrency slot",
+    ["service"],
+)
+
+REQUESTS_SHED = Counter(
+    "requests_shed_total",
+    "Requests rejected by the concurrency limiter",
+    ["service", "priority"],
+)
+
+# Priority classes, most important first
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+PRIORITY_NAMES = ("critical", "normal", "low")
+
+# Fraction of the limit each priority class may occupy
+PRIORITY_SHARES = (1.0, 0.9, 0.5)
+
+# Route prefixes with a non-default priority
+PRIORITY_ROUTES: dict[str, int] = {
+    "/auth": CRITICAL,
+    "/chat": CRITICAL,
+    "/data/chat": CRITICAL,
+    "/data/users/login": CRITICAL,
+    "/admin": LOW,
+    "/moderation": LOW,
+    "/data/stats": LOW,
+    "/data/profiles-count": LOW,
+    "/debug": LOW,
+}
+
+# Never limited: probes, scrapes and long-lived WebSockets
+EXEMPT_PREFIXES = ("/health", "/metrics", "/chat/ws")
+
+
+class AdaptiveConcurrencyLimiter:
+    """Gradient-controlled concurrency limit with a priority queue."""
+
+    def __init__(
+        self,
+        service_name: str,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+        queue_size: int = 50,
+        queue_timeout: float = 0.1,
+    ):
+        """Initialize limiter.
+
+        Args:
+            service_name: Service label for metrics
+            initial_limit: Starting concurrency limit
+            min_limit: Lowest limit the controller may set
+            max_limit: Highest limit the controller may set
+            smoothing: Weight of each new estimate in the limit
+            tolerance: Latency increase over the baseline treated as normal
+            long_window: Samples averaged into the latency baseline
+            queue_size: Maximum number of waiting requests
+            queue_timeout: Seconds a request may wait for a slot
+        """
+        self.service_name = service_name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.long_window = long_window
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.shed = 0
+        self._long_rtt = 0.0
+        self._waiters: tuple[deque[asyncio.Future], ...] = tuple(
+            deque() for _ in PRIORITY_NAMES
+        )
+
+        self._limit_gauge = CONCURRENCY_LIMIT.labels(service=service_name)
+        self._in_flight_gauge = CONCURRENCY_IN_FLIGHT.labels(service=service_name)
+        self._queue_gauge = CONCURRENCY_QUEUE_DEPTH.labels(service=service_name)
+        self._limit_gauge.set(self.limit)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a slot."""
+        return sum(len(waiters) for waiters in self._waiters)
+
+    def _has_room(self, priority: int) -> bool:
+        return self.in_flight < max(1, int(self.limit * PRIORITY_SHARES[priority]))
+
+    async def acquire(self, priority: int = NORMAL) -> bool:
+        """Take a slot, waiting up to ``queue_timeout`` for one.
+
+        Returns:
+            True if admitted (call release afterwards), False if shed
+        """
+        if self._has_room(priority) and not any(self._waiters[: priority + 1]):
+            self._admit()
+            return True
+
+        if self.queue_depth >= self.queue_size or self.queue_timeout <= 0:
+            return self._reject(priority)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self._queue_gauge.set(self.queue_depth)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait timed out
+                return True
+            waiter.cancel()
+            return self._reject(priority)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+            self._queue_gauge.set(self.queue_depth)
+
+    def release(self) -> None:
+        """Free a slot and admit waiting requests in priority order."""
+        self.in_flight -= 1
+        self._in_flight_gauge.set(self.in_flight)
+        self._wake_waiters()
+
+    def on_sample(self, rtt: float, failed: bool = False) -> None:
+        """Adjust the limit from a completed request.
+
+        Args:
+            rtt: Request latency in seconds
+            failed: Whether the request failed (5xx or exception)
+        """
+        if rtt <= 0:
+            return
+        if not self._long_rtt:
+            self._long_rtt = rtt
+        else:
+            self._long_rtt += (rtt - self._long_rtt) / self.long_window
+            # Let the baseline follow a lasting latency drop quickly
+            if self._long_rtt > 2 * rtt:
+                self._long_rtt *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / rtt))
+        if failed:
+            gradient = 0.5
+
+        # Only probe upwards while the limit is actually in use
+        if gradient >= 1.0 and self.in_flight < self.limit / 2:
+            return
+
+        estimate = gradient * self.limit + math.sqrt(self.limit)
+        limit = (1 - self.smoothing) * self.limit + self.smoothing * estimate
+        self.limit = min(self.max_limit, max(self.min_limit, limit))
+        self._limit_gauge.set(self.limit)
+        self._wake_waiters()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get limiter statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "latency_baseline_seconds": self._long_rtt,
+            "shed": self.shed,
+        }
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self._in_flight_gauge.set(self.in_flight)
+
+    def _reject(self, priority: int) -> bool:
+        self.shed += 1
+        REQUESTS_SHED.labels(
+            service=self.service_name, priority=PRIORITY_NAMES[priority]
+        ).inc()
+        return False
+
+    def _wake_waiters(self) -> None:
+        for priority, waiters in enumerate(self._waiters):
+            while waiters and self._has_room(priority):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._admit()
+                    waiter.set_result(None)
+            if waiters:
+                # Lower classes never overtake a waiting higher class
+                return
+
+
+_priority_router: PathRouter[int] = PathRouter()
+for _prefix, _priority in PRIORITY_ROUTES.items():
+    _priority_router.add(_prefix, _priority, prefix=True)
+
+
+def request_priority(path: str) -> int:
+    """Priority class of a request path."""
+    priority = _priority_router.match(path)
+    return NORMAL if priority is None else priority
+
+
+@web.middleware
+async def concurrency_limit_middleware(
+    request: web.Request, handler
+) -> web.StreamResponse:
+    """Admit requests within the service's adaptive concurrency limit."""
+    limiter: AdaptiveConcurrencyLimiter | None = request.app.get("concurrency_limiter")
+    if limiter is None or request.path.startswith(EXEMPT_PREFIXES):
+        return await handler(request)
+
+    priority = request_priority(request.path)
+    if not await limiter.acquire(priority):
+        logger.debug(
+            f"Shed {PRIORITY_NAMES[priority]} request {request.method} {request.path}",
+            extra={"event_type": "request_shed", "limit": limiter.limit},
+        )
+        return web.json_response(
+            {
+                "error": "OVERLOADED",
+                "message": "Service is overloaded, retry later",
+                "code": "OVERLOADED",
+                "status_code": 503,
+            },
+            status=503,
+            headers={"Retry-After": "1"},
+        )
+
+    start = time.perf_counter()
+    failed = True
+    try:
+        response = await handler(request)
+        failed = response.status >= 500
+        return response
+    except web.HTTPException as exc:
+        failed = exc.status >= 500
+        raise
+    finally:
+        limiter.release()
+        limiter.on_sample(time.perf_counter() - start, failed)
+
+
+def setup_concurrency_limit(
+    app: web.Application, service_name: str, max_limit: int | None = None
+) -> None:
+    """Add the concurrency limiter unless CONCURRENCY_LIMIT_ENABLED is false.
+
+    Args:
+        app: aiohttp Application instance
+        service_name: Name of the service (for metrics)
+        max_limit: Upper bound for the limit, e.g. the database pool size;
+            defaults to CONCURRENCY_MAX_LIMIT
+    """
+    if os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() != "true":
+        return
+
+    if max_limit is None:
+        max_limit = int(os.getenv("CONCURRENCY_MAX_LIMIT", "200"))
+
+    app["concurrency_limiter"] = AdaptiveConcurrencyLimiter(
+        service_name,
+        initial_limit=int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "20")),
+        min_limit=int(os.getenv("CONCURRENCY_MIN_LIMIT", "2")),
+        max_limit=max_limit,
+        queue_size=int(os.getenv("CONCURRENCY_QUEUE_SIZE", "50")),
+        queue_timeout=float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_MS", "100")) / 1000,
+    )
+    app.middlewares.append(concurrency_limit_middleware)
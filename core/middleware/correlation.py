@@ -6,6 +6,9 @@ import uuid
 
 from aiohttp import web
 
+from core.middleware.internal_identity import identity_headers
+from core.resilience.deadline import deadline_headers
+
 logger = logging.getLogger(__name__)
 
 CORRELATION_ID_HEADER = "X-Correlation-ID"
@@ -83,6 +86,12 @@ def create_headers_with_correlation(
     if request_id:
         headers[REQUEST_ID_HEADER] = request_id
 
+    # Forward the caller identity verified by the gateway
+    headers.update(identity_headers(request))
+
+    # Pass on what is left of the request budget
+    headers.update(deadline_headers())
+
     # Add additional headers
     if additional_headers:
         headers.update(additional_headers)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+"""Signed caller identity for internal hops.
+
+The gateway verifies a client's JWT once and forwards the result as a compact
+``X-Internal-Identity`` header:
+
+    v1.<key window>.<user_id>.<token_type>.<expires>.<signature>
+
+The signature is a truncated HMAC-SHA256 under a key derived from the shared
+secret for the current key window (one hour by default), so each signing key
+is short-lived and the shared secret itself never signs anything. Assertions
+expire after ``ttl`` seconds. Checking one costs a single HMAC over a few
+dozen bytes instead of parsing and verifying the JWT again.
+
+Services read the header in ``jwt_middleware`` / ``user_context_middleware``
+and pass it on to the services they call via ``identity_headers``. The
+gateway must drop any client-supplied copy of the header.
+
+Connections the gateway opens on its own behalf (the chat mux socket) carry
+an assertion with token type ``gateway`` instead; it proves the caller is
+the gateway and never authenticates a user.
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections.abc import Callable
+from typing import Any
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_IDENTITY_HEADER = "X-Internal-Identity"
+IDENTITY_VERSION = "v1"
+GATEWAY_TOKEN_TYPE = "gateway"
+
+
+class InternalIdentitySigner:
+    """Signs and verifies internal identity assertions."""
+
+    def __init__(
+        self,
+        secret: str,
+        ttl: int = 30,
+        key_period: int = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize signer.
+
+        Args:
+            secret: Secret shared by the gateway and the services
+            ttl: Seconds an assertion stays valid
+            key_period: Seconds each derived signing key is used
+            clock: Wall-clock time source (injectable for tests)
+        """
+        self._secret = hashlib.sha256(b"internal-identity:" + secret.encode()).digest()
+        self.ttl = ttl
+        self.key_period = key_period
+        self._clock = clock
+        self._keys: dict[int, bytes] = {}
+
+    def sign(
+        self, user_id: int, token_type: str = "access", expires_at: float | None = None
+    ) -> str:
+        """Create an assertion for a verified caller.
+
+        Args:
+            user_id: Verified user ID
+            token_type: Type of the verified token
+            expires_at: Expiry of the verified token; caps the assertion's expiry
+
+        Returns:
+            Header value
+        """
+        now = self._clock()
+        expires = int(now) + self.ttl
+        if expires_at is not None:
+            expires = min(expires, int(expires_at))
+
+        window = int(now // self.key_period)
+        body = f"{IDENTITY_VERSION}.{window}.{int(user_id)}.{token_type}.{expires}"
+        return f"{body}.{self._signature(window, body)}"
+
+    def verify(self, value: str) -> dict[str, Any] | None:
+        """Check an assertion.
+
+        Returns:
+            JWT-like payload (user_id, token_type, exp), or None if the
+            assertion is malformed, forged or expired
+        """
+        body, _, signature = value.rpartition(".")
+        parts = body.split(".")
+        if len(parts) != 5 or parts[0] != IDENTITY_VERSION:
+            return None
+
+        try:
+            window = int(parts[1])
+            user_id = int(parts[2])
+            expires = int(parts[4])
+        except ValueError:
+            return None
+
+        now = self._clock()
+        current_window = int(now // self.key_period)
+        if window not in (current_window, current_window - 1) or expires <= now:
+            return None
+        if not hmac.compare_digest(signature, self._signature(window, body)):
+            return None
+
+        return {"user_id": user_id, "token_type": parts[3], "exp": expires}
+
+    def _signature(self, window: int, body: str) -> str:
+        """Truncated HMAC of ``body`` under the key of ``window``."""
+        key = self._keys.get(window)
+        if key is None:
+            key = hmac.new(self._secret, str(window).encode(), hashlib.sha256).digest()
+            # Only the current and previous windows are ever needed
+            self._keys = {w: k for w, k in self._keys.items() if w >= window - 1}
+            self._keys[window] = key
+
+        digest = hmac.new(key, body.encode(), hashlib.sha256).digest()[:16]
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+_signer: InternalIdentitySigner | None = None
+
+
+def get_identity_signer() -> InternalIdentitySigner | None:
+    """Signer configured by INTERNAL_IDENTITY_KEY (or JWT_SECRET).
+
+    Returns:
+        The process-wide signer, or None if no secret is configured
+    """
+    global _signer
+    if _signer is None:
+        secret = os.getenv("INTERNAL_IDENTITY_KEY") or os.getenv("JWT_SECRET")
+        if not secret:
+            return None
+        _signer = InternalIdentitySigner(
+            secret, ttl=int(os.getenv("INTERNAL_IDENTITY_TTL", "30"))
+        )
+    return _signer
+
+
+def identity_from_request(request: web.Request) -> dict[str, Any] | None:
+    """Verified caller identity of ``request``, if it carries one.
+
+    The result is memoized on the request, and a verified header is
+    remembered so identity_headers can forward it.
+    """
+    if "caller_identity" in request:
+        return request["caller_identity"]
+
+    payload = None
+    value = request.headers.get(INTERNAL_IDENTITY_HEADER)
+    if value:
+        signer = get_identity_signer()
+        payload = signer.verify(value) if signer else None
+        if payload is None:
+            logger.warning(
+                f"Rejected internal identity header on {request.path}",
+                extra={
+                    "event_type": "internal_identity_rejected",
+                    "path": request.path,
+                },
+            )
+        elif payload["token_type"] == GATEWAY_TOKEN_TYPE:
+            # The gateway itself, not a user
+            payload = None
+        else:
+            request["internal_identity"] = value
+
+    request["caller_identity"] = payload
+    return payload
+
+
+def gateway_identity_headers() -> dict[str, str]:
+    """Headers proving a connection is opened by the gateway itself."""
+    signer = get_identity_signer()
+    if signer is None:
+        return {}
+    return {INTERNAL_IDENTITY_HEADER: signer.sign(0, GATEWAY_TOKEN_TYPE)}
+
+
+def is_gateway_request(request: web.Request) -> bool:
+    """Whether ``request`` carries a valid gateway assertion."""
+    value = request.headers.get(INTERNAL_IDENTITY_HEADER)
+    signer = get_identity_signer()
+    if not value or signer is None:
+        return False
+    payload = signer.verify(value)
+    return payload is not None and payload["token_type"] == GATEWAY_TOKEN_TYPE
+
+
+def identity_headers(request: web.Request) -> dict[str, str]:
+    """Headers forwarding the caller's verified identity to another service."""
+    value = request.get("internal_identity")
+    return {INTERNAL_IDENTITY_HEADER: value} if value else {}
@@ -7,8 +7,12 @@ import logging
 from aiohttp import web
 
 from core.metrics.business_metrics import JWT_TOKENS_EXPIRED, JWT_VALIDATION_FAILED
+from core.middleware.internal_identity import (
+    identity_from_request,
+    is_gateway_request,
+)
 from core.middleware.security_metrics import record_auth_failure, record_jwt_validation
-from core.utils.security import ValidationError, validate_jwt_token
+from core.utils.security import ValidationError, verified_token_cache
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +44,31 @@ async def jwt_middleware(request: web.Request, handler) -> web.Response:
     if request.path == "/admin/login":
         return await handler(request)
 
+    # Debug endpoints check for an admin token themselves
+    if request.path.startswith("/debug/"):
+        return await handler(request)
+
+    # Gateway WebSocket multiplexing: only the gateway may open the socket;
+    # every channel then carries and validates its own access token
+    if request.path == "/chat/ws/mux":
+        if not is_gateway_request(request):
+            logger.warning("Rejected mux connection without gateway identity")
+            record_auth_failure(
+                service=request.app.get("service_name", "unknown"),
+                reason="missing_gateway_identity",
+                user_id="unknown",
+                path=request.path,
+            )
+            return web.json_response({"error": "Forbidden"}, status=403)
+        return await handler(request)
+
+    # Identity already verified by the gateway: no need to check the JWT again
+    identity = identity_from_request(request)
+    if identity is not None:
+        request["user_id"] = identity["user_id"]
+        request["jwt_payload"] = identity
+        return await handler(request)
+
     # Проверить JWT токен
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
@@ -62,7 +91,7 @@ async def jwt_middleware(request: web.Request, handler) -> web.Response:
         return web.json_response({"error": "Server configuration error"}, status=500)
 
     try:
-        payload = validate_jwt_token(token, jwt_secret)
+        payload = verified_token_cache.validate(token, jwt_secret)
         user_id = payload.get("user_id")
         token_type = payload.get("token_type", "access")
 
@@ -163,7 +192,7 @@ async def admin_jwt_middleware(request: web.Request, handler) -> web.Response:
         return web.json_response({"error": "Server configuration error"}, status=500)
 
     try:
-        payload = validate_jwt_token(token, jwt_secret)
+        payload = verified_token_cache.validate(token, jwt_secret)
         admin_id = payload.get("admin_id")
 
         if not admin_id:
@@ -2,11 +2,27 @@ from __future__ import annotations
 
 """Prometheus metrics middleware for application services."""
 
+import asyncio
+import logging
+import os
+import re
 import time
 from collections.abc import Callable
 
 from aiohttp import web
-from prometheus_client import Counter, Gauge, Histogram, generate_latest
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.openmetrics import exposition as openmetrics
+
+from core.middleware.security_metrics import flush_jwt_validations
+
+logger = logging.getLogger(__name__)
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -44,71 +60,155 @@ ACTIVE_REQUESTS = Gauge(
 # Business metrics moved to core.metrics.business_metrics
 # Import them if needed for backward compatibility
 
+# Endpoint label for requests that matched no route (404s, scanners, ...)
+UNMATCHED_ENDPOINT = "unmatched"
+# Label value substituted once a label has too many distinct values
+OVERFLOW_LABEL = "other"
+
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text"
+
+# OpenMetrics caps exemplar labels at 128 characters; longer trace IDs
+# (taken from client headers) are not attached
+MAX_EXEMPLAR_TRACE_ID = 100
+_TRACE_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class LabelCardinalityGuard:
+    """Caps the number of distinct values a metric label can take.
+
+    Values beyond ``max_values`` are reported as ``OVERFLOW_LABEL`` so one
+    misbehaving label cannot grow the series count without bound.
+    """
+
+    def __init__(self, max_values: int = 200):
+        """Initialize guard.
+
+        Args:
+            max_values: Distinct values kept before collapsing to "other"
+        """
+        self.max_values = max_values
+        self._values: set[str] = set()
+        self.overflowed = 0
+
+    def __call__(self, value: str) -> str:
+        if value in self._values:
+            return value
+        if len(self._values) >= self.max_values:
+            self.overflowed += 1
+            return OVERFLOW_LABEL
+        self._values.add(value)
+        return value
+
+
+endpoint_label_guard = LabelCardinalityGuard(
+    int(os.getenv("METRICS_MAX_ENDPOINTS", "200"))
+)
+
+
+def trace_exemplar(trace_id: str | None) -> dict[str, str] | None:
+    """Exemplar for ``trace_id``, or None if it is unusable.
+
+    W3C trace IDs (32 hex characters) are always attached; other values only
+    when short enough to fit the OpenMetrics exemplar limit.
+    """
+    if not trace_id or not isinstance(trace_id, str):
+        return None
+    if _TRACE_ID_PATTERN.fullmatch(trace_id) or (
+        len(trace_id) <= MAX_EXEMPLAR_TRACE_ID and trace_id.isprintable()
+    ):
+        return {"trace_id": trace_id}
+    return None
+
+
+def route_template(request: web.Request) -> str:
+    """Canonical template of the route that handled ``request``.
+
+    ``/data/profiles/123`` is reported as ``/data/profiles/{user_id}``;
+    requests that matched no route share one bucket.
+    """
+    match_info = request.match_info
+    if match_info.http_exception is not None:
+        return UNMATCHED_ENDPOINT
+    route = match_info.route
+    resource = route.resource if route is not None else None
+    if resource is None:
+        return UNMATCHED_ENDPOINT
+    return endpoint_label_guard(resource.canonical)
+
 
 @web.middleware
 async def metrics_middleware(request: web.Request, handler: Callable) -> web.Response:
     """
     Middleware for Prometheus metrics collection.
 
-    Collects request metrics: count, duration, active requests.
+    Collects request metrics: count, duration, active requests. Endpoints
+    are labelled with route templates, and durations carry the request's
+    trace_id as an exemplar.
     """
     service_name = request.app.get("service_name", "unknown")
+    method = request.method if request.method in KNOWN_METHODS else OVERFLOW_LABEL
+    endpoint = route_template(request)
+    exemplar = trace_exemplar(request.get("trace_id"))
 
     # Increment active requests
     ACTIVE_REQUESTS.labels(service=service_name).inc()
 
     # Start timing
-    start_time = time.time()
+    start_time = time.perf_counter()
+    status_code = 500
 
     try:
         # Process request
         response = await handler(request)
+        status_code = response.status
+        return response
 
-        # Calculate duration
-        duration = time.time() - start_time
-
-        # Record metrics
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.path,
-            status_code=response.status,
-            service=service_name,
-        ).inc()
+    except web.HTTPException as e:
+        status_code = e.status
+        raise
 
-        REQUEST_DURATION.labels(
-            method=request.method, endpoint=request.path, service=service_name
-        ).observe(duration)
+    finally:
+        # Decrement active requests before anything that could raise
+        ACTIVE_REQUESTS.labels(service=service_name).dec()
 
-        return response
+        # Failed requests are recorded too (status 500 unless HTTP error)
+        duration = time.perf_counter() - start_time
 
-    except Exception:
-        # Calculate duration for failed requests
-        duration = time.time() - start_time
+        try:
+            REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code,
+                service=service_name,
+            ).inc()
 
-        # Record error metrics
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.path,
-            status_code=500,
-            service=service_name,
-        ).inc()
+            REQUEST_DURATION.labels(
+                method=method, endpoint=endpoint, service=service_name
+            ).observe(duration, exemplar)
+        except ValueError as e:
+            # Metrics must never fail the request they describe
+            logger.warning(f"Failed to record request metrics: {e}")
 
-        REQUEST_DURATION.labels(
-            method=request.method, endpoint=request.path, service=service_name
-        ).observe(duration)
 
-        # Re-raise the exception
-        raise
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Handler for /metrics endpoint.
 
-    finally:
-        # Decrement active requests
-        ACTIVE_REQUESTS.labels(service=service_name).dec()
+    Serves OpenMetrics (which carries exemplars) when the scraper asks for
+    it, the Prometheus text format otherwise. Rendering runs in a thread so
+    a scrape does not stall the event loop.
+    """
+    flush_jwt_validations()
 
+    if OPENMETRICS_CONTENT_TYPE in request.headers.get("Accept", ""):
+        metrics_data = await asyncio.to_thread(openmetrics.generate_latest, REGISTRY)
+        content_type = openmetrics.CONTENT_TYPE_LATEST
+    else:
+        metrics_data = await asyncio.to_thread(generate_latest, REGISTRY)
+        content_type = CONTENT_TYPE_LATEST
 
-async def metrics_handler(request: web.Request) -> web.Response:
-    """Handler for /metrics endpoint."""
-    metrics_data = generate_latest()
-    return web.Response(body=metrics_data, content_type="text/plain; version=0.0.4")
+    return web.Response(body=metrics_data, headers={"Content-Type": content_type})
 
 
 def add_metrics_route(app: web.Application, service_name: str) -> None:
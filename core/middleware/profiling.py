@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+"""On-demand profiling and per-stage request timing.
+
+Three pieces, all wired up by ``setup_profiling``:
+
+* Stage spans: ``stage("serialization")`` (and the SQLAlchemy / aiohttp
+  client hooks for "db" and "upstream") time parts of a request. Totals per
+  stage are attached to the request's trace context, exported as the
+  ``request_stage_duration_seconds`` histogram and, with profiling enabled,
+  returned in a ``Server-Timing`` header.
+* LoopMonitor: measures event loop lag and, from a watchdog thread, logs the
+  stack of the loop thread whenever a callback blocks it for too long.
+* ``GET /debug/profile?seconds=N``: samples the loop thread's stack for N
+  seconds and returns folded stacks ("frame;frame;frame count" lines) that
+  flamegraph.pl and speedscope read directly.
+
+The debug endpoints only exist with ``PROFILING_ENABLED=true`` and require an
+admin token.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as FrameCounter
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+from prometheus_client import Counter, Histogram
+
+from core.utils.security import ValidationError, validate_jwt_token
+
+logger = logging.getLogger(__name__)
+
+STAGE_DURATION = Histogram(
+    "request_stage_duration_seconds",
+    "Time spent per request stage (db, upstream, serialization)",
+    ["service", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between scheduled and actual wake-up of the loop monitor",
+    ["service"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+SLOW_CALLBACKS = Counter(
+    "event_loop_slow_callbacks_total",
+    "Callbacks that blocked the event loop longer than the threshold",
+    ["service"],
+)
+
+MAX_PROFILE_SECONDS = 60
+
+# Stage totals of the request being handled in the current context
+_stage_timings: contextvars.ContextVar[dict[str, float] | None] = (
+    contextvars.ContextVar("stage_timings", default=None)
+)
+_service_name = "unknown"
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add ``seconds`` to stage ``name`` of the current request."""
+    STAGE_DURATION.labels(service=_service_name, stage=name).observe(seconds)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as stage ``name`` of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Any) -> None:
+    """Record statement execution time of a SQLAlchemy engine as "db".
+
+    Works for async engines too; SQLAlchemy runs the event hooks in the
+    calling task's context.
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("stage_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("stage_start")
+        if starts:
+            record_stage("db", time.perf_counter() - starts.pop())
+
+
+def upstream_trace_config() -> aiohttp.TraceConfig:
+    """aiohttp client hooks recording request time as "upstream"."""
+
+    async def on_request_start(session, trace_config_ctx, params):
+        trace_config_ctx.start = time.perf_counter()
+
+    async def on_request_done(session, trace_config_ctx, params):
+        record_stage("upstream", time.perf_counter() - trace_config_ctx.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)  # type: ignore[arg-type]
+    trace_config.on_request_end.append(on_request_done)  # type: ignore[arg-type]
+    trace_config.on_request_exception.append(on_request_done)  # type: ignore[arg-type]
+    return trace_config
+
+
+@web.middleware
+async def stage_timing_middleware(request: web.Request, handler) -> web.Response:
+    """Collect stage spans of a request and attach them to its trace."""
+    timings: dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        response = await handler(request)
+    finally:
+        _stage_timings.reset(token)
+        trace_context = request.get("trace_context")
+        if trace_context is not None:
+            trace_context.stages = timings
+
+    if timings and request.app.get("profiling_enabled"):
+        response.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+        )
+    return response
+
+
+class LoopMonitor:
+    """Event loop lag and slow callback detection.
+
+    A task wakes up every ``interval`` and records how late it was. A
+    watchdog thread checks that those wake-ups keep happening; if the loop
+    has not run for ``slow_threshold`` it captures what the loop thread is
+    executing, which names the blocking callback.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        interval: float = 0.1,
+        slow_threshold: float = 0.25,
+        history: int = 20,
+    ):
+        """Initialize monitor.
+
+        Args:
+            service_name: Service label for metrics
+            interval: Seconds between loop heartbeats
+            slow_threshold: Blocking time reported as a slow callback
+            history: Number of slow callback reports kept for /debug/loop
+        """
+        self.service_name = service_name
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.max_lag = 0.0
+        self.slow_callbacks: deque[dict[str, Any]] = deque(maxlen=history)
+
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    async def start(self) -> None:
+        """Start heartbeat task and watchdog thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get loop statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "interval": self.interval,
+            "slow_threshold": self.slow_threshold,
+            "max_lag_seconds": self.max_lag,
+            "current_lag_seconds": max(
+                0.0, time.monotonic() - self._beat - self.interval
+            ),
+            "slow_callbacks": list(self.slow_callbacks),
+        }
+
+    async def _heartbeat(self) -> None:
+        lag_metric = EVENT_LOOP_LAG.labels(service=self.service_name)
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self.max_lag = max(self.max_lag, lag)
+            lag_metric.observe(lag)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self.slow_threshold / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.slow_threshold or beat == reported_beat:
+                continue
+
+            # Report each stall once
+            reported_beat = beat
+            frame = (
+                sys._current_frames().get(self._loop_thread_id)
+                if self._loop_thread_id is not None
+                else None
+            )
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            SLOW_CALLBACKS.labels(service=self.service_name).inc()
+            self.slow_callbacks.append(
+                {"blocked_seconds": round(blocked, 3), "stack": stack}
+            )
+            logger.warning(
+                f"Event loop blocked for {blocked:.3f}s in:\n{stack}",
+                extra={"event_type": "slow_callback"},
+            )
+
+
+def sample_profile(thread_id: int, seconds: float, interval: float = 0.005) -> str:
+    """Sample a thread's stack and return folded stacks.
+
+    Args:
+        thread_id: Thread to sample (the event loop thread)
+        seconds: Sampling duration
+        interval: Seconds between samples
+
+    Returns:
+        One "outer;...;inner count" line per distinct stack
+    """
+    stacks: FrameCounter[str] = FrameCounter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            )
+            frame = frame.f_back
+        if frames:
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _is_admin(request: web.Request) -> bool:
+    """Check the request carries a valid admin token."""
+    auth_header = request.headers.get("Authorization", "")
+    jwt_secret = os.getenv("JWT_SECRET")
+    if not auth_header.startswith("Bearer ") or not jwt_secret:
+        return False
+    try:
+        payload = validate_jwt_token(auth_header.split(" ")[1], jwt_secret)
+    except ValidationError:
+        return False
+    return bool(payload.get("admin_id"))
+
+
+async def profile_handler(request: web.Request) -> web.Response:
+    """Sample CPU for N seconds and return folded stacks.
+
+    GET /debug/profile?seconds=10
+    """
+    if not _is_admin(request):
+        return web.json_response({"error": "Admin token required"}, status=403)
+
+    try:
+        seconds = min(float(request.query.get("seconds", 10)), MAX_PROFILE_SECONDS)
+    except ValueError:
+        return web.json_response({"error": "Invalid seconds"}, status=400)
+
+    profile_lock: asyncio.Lock = request.app["profile_lock"]
+    if profile_lock.locked():
+        return web.json_response({"error": "Profile already running"}, status=409)
+
+    async with profile_lock:
+        folded = await asyncio.to_thread(sample_profile, threading.get_ident(), seconds)
+    return web.Response(text=folded, content_type="text/plain")
+
+
+async def loop_stats_handler(request: web.Request) -> web.Response:
+    """Event loop lag and recent slow callbacks.
+
+    GET /debug/loop
+    """
+    if not _is_admin(request):
+        return web.json_response({"error": "Admin token required"}, status=403)
+    return web.json_response(request.app["loop_monitor"].get_stats())
+
+
+def setup_profiling(app: web.Application, service_name: str) -> None:
+    """Add stage timing and, if PROFILING_ENABLED, the debug endpoints.
+
+    Args:
+        app: aiohttp Application instance
+        service_name: Name of the service (for metrics)
+    """
+    global _service_name
+    _service_name = service_name
+
+    app.middlewares.append(stage_timing_middleware)
+
+    enabled = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    app["profiling_enabled"] = enabled
+    if not enabled:
+        return
+
+    monitor = LoopMonitor(
+        service_name,
+        slow_threshold=float(os.getenv("SLOW_CALLBACK_SECONDS", "0.25")),
+    )
+    app["loop_monitor"] = monitor
+    app["profile_lock"] = asyncio.Lock()
+
+    async def start_monitor(app: web.Application) -> None:
+        await monitor.start()
+
+    async def stop_monitor(app: web.Application) -> None:
+        await monitor.stop()
+
+    app.on_startup.append(start_monitor)  # type: ignore[arg-type]
+    app.on_cleanup.append(stop_monitor)  # type: ignore[arg-type]
+    app.router.add_get("/debug/profile", profile_handler)
+    app.router.add_get("/debug/loop", loop_stats_handler)
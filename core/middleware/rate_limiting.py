@@ -7,15 +7,18 @@ import logging
 from aiohttp import web
 
 from core.middleware.security_metrics import record_rate_limit_hit
-from core.utils.security import RateLimiter
+from core.utils.rate_limiter import SlidingWindowRateLimiter
 
 logger = logging.getLogger(__name__)
 
 # Global rate limiter instance
-_rate_limiter = RateLimiter(
+_rate_limiter = SlidingWindowRateLimiter(
     max_requests=10, window_seconds=60
 )  # 10 requests per minute
 
+# Stricter rate limiting for auth endpoints: 5 requests per 5 minutes
+_auth_rate_limiter = SlidingWindowRateLimiter(max_requests=5, window_seconds=300)
+
 
 @web.middleware
 async def rate_limiting_middleware(request: web.Request, handler) -> web.Response:
@@ -113,10 +116,8 @@ async def auth_rate_limiting_middleware(request: web.Request, handler) -> web.Re
     except Exception:
         user_id = 0
 
-    # Stricter rate limiting for auth endpoints: 5 requests per 5 minutes
-    auth_limiter = RateLimiter(max_requests=5, window_seconds=300)
-
-    if not auth_limiter.is_allowed(user_id):
+    # Shared across requests; a per-request limiter would never trip
+    if not _auth_rate_limiter.is_allowed(user_id):
         logger.warning(
             f"Auth rate limit exceeded for IP {client_ip} on {request.path}",
             extra={
@@ -9,6 +9,9 @@ from collections.abc import Callable
 
 from aiohttp import web
 
+from core.middleware.internal_identity import identity_from_request
+from core.utils.log_sampling import request_log_sampler
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,6 +34,11 @@ async def request_logging_middleware(
     # Get correlation_id from request (set by correlation_middleware)
     correlation_id = request.get("correlation_id", "")
 
+    # Unsampled requests hold their records until the outcome is known
+    sampler = request_log_sampler
+    sampled = sampler.head_sampled(request.get("trace_id") or request_id, request.path)
+    held = None if sampled else sampler.start_buffer()
+
     # Log request
     logger.info(
         f"Request started: {request.method} {request.path}",
@@ -50,56 +58,63 @@ async def request_logging_middleware(
         # Process request
         response = await handler(request)
 
-        # Calculate duration
+    except Exception as e:
+        # Calculate duration for failed requests
         duration_ms = int((time.time() - start_time) * 1000)
 
-        # Log successful response
-        logger.info(
-            f"Request completed: {request.method} {request.path} -> {response.status}",
+        # Failures are always logged, with whatever was held back
+        if held is not None:
+            sampler.finish_buffer(*held, keep=True)
+
+        # Log error
+        logger.error(
+            f"Request failed: {request.method} {request.path} -> {type(e).__name__}: {e}",
+            exc_info=True,
             extra={
-                "event_type": "request_completed",
+                "event_type": "request_failed",
                 "request_id": request_id,
                 "correlation_id": correlation_id,
                 "method": request.method,
                 "path": request.path,
-                "status_code": response.status,
                 "duration_ms": duration_ms,
+                "error_type": type(e).__name__,
+                "error_message": str(e),
                 "user_id": request.get("user_id"),
                 "service": request.app.get("service_name", "unknown"),
             },
         )
 
-        # Add request_id and correlation_id to response headers
-        response.headers["X-Request-ID"] = request_id
-        if correlation_id:
-            response.headers["X-Correlation-ID"] = correlation_id
+        # Re-raise the exception
+        raise
 
-        return response
+    # Calculate duration
+    duration_ms = int((time.time() - start_time) * 1000)
 
-    except Exception as e:
-        # Calculate duration for failed requests
-        duration_ms = int((time.time() - start_time) * 1000)
-
-        # Log error
-        logger.error(
-            f"Request failed: {request.method} {request.path} -> {type(e).__name__}: {e}",
-            exc_info=True,
+    # Log successful response
+    if held is None or sampler.finish_buffer(
+        *held, keep=sampler.tail_keep(response.status, duration_ms)
+    ):
+        logger.info(
+            f"Request completed: {request.method} {request.path} -> {response.status}",
             extra={
-                "event_type": "request_failed",
+                "event_type": "request_completed",
                 "request_id": request_id,
                 "correlation_id": correlation_id,
                 "method": request.method,
                 "path": request.path,
+                "status_code": response.status,
                 "duration_ms": duration_ms,
-                "error_type": type(e).__name__,
-                "error_message": str(e),
                 "user_id": request.get("user_id"),
                 "service": request.app.get("service_name", "unknown"),
             },
         )
 
-        # Re-raise the exception
-        raise
+    # Add request_id and correlation_id to response headers
+    response.headers["X-Request-ID"] = request_id
+    if correlation_id:
+        response.headers["X-Correlation-ID"] = correlation_id
+
+    return response
 
 
 @web.middleware
@@ -109,24 +124,28 @@ async def user_context_middleware(
     """
     Middleware to add user context to logs.
 
-    Extracts user_id from JWT token and adds to request context.
+    Extracts user_id from the internal identity header or JWT token and
+    adds it to request context.
     """
-    # Try to extract user_id from JWT token
+    # Prefer the identity verified by the gateway, else the JWT token
     user_id = None
     auth_header = request.headers.get("Authorization")
+    identity = identity_from_request(request)
 
-    if auth_header and auth_header.startswith("Bearer "):
+    if identity is not None:
+        user_id = identity["user_id"]
+    elif auth_header and auth_header.startswith("Bearer "):
         try:
             # Import here to avoid circular imports
             import os
 
-            from core.utils.security import validate_jwt_token
+            from core.utils.security import verified_token_cache
 
             token = auth_header.split(" ")[1]
             jwt_secret = os.getenv("JWT_SECRET")
 
             if jwt_secret:
-                payload = validate_jwt_token(token, jwt_secret)
+                payload = verified_token_cache.validate(token, jwt_secret)
                 user_id = payload.get("user_id")
                 request["user_id"] = user_id
 
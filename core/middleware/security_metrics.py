@@ -3,6 +3,7 @@ from __future__ import annotations
 """Security-specific metrics for monitoring authentication and security events."""
 
 import logging
+import time
 
 from prometheus_client import Counter, Gauge, Histogram
 
@@ -64,6 +65,12 @@ FAILED_LOGIN_ATTEMPTS = Gauge(
     ["service", "user_id"],
 )
 
+# Successful JWT validations are counted locally and added to JWT_VALIDATIONS
+# in bulk: one labels() lookup per flush instead of per request
+JWT_SUCCESS_FLUSH_INTERVAL = 1.0
+_jwt_successes: dict[tuple[str, str], int] = {}
+_jwt_successes_flushed_at = time.monotonic()
+
 
 def record_security_event(
     event_type: str, service: str, severity: str = "info", **labels
@@ -124,6 +131,13 @@ def record_jwt_validation(
     service: str, result: str, token_type: str = "access", **labels
 ):
     """Record a JWT validation attempt."""
+    if result == "success":
+        key = (service, token_type)
+        _jwt_successes[key] = _jwt_successes.get(key, 0) + 1
+        if time.monotonic() - _jwt_successes_flushed_at >= JWT_SUCCESS_FLUSH_INTERVAL:
+            flush_jwt_validations()
+        return
+
     JWT_VALIDATIONS.labels(service=service, result=result, token_type=token_type).inc()
 
     if result == "failure":
@@ -136,6 +150,17 @@ def record_jwt_validation(
         )
 
 
+def flush_jwt_validations() -> None:
+    """Add locally counted successful validations to JWT_VALIDATIONS."""
+    global _jwt_successes_flushed_at
+    _jwt_successes_flushed_at = time.monotonic()
+    while _jwt_successes:
+        (service, token_type), count = _jwt_successes.popitem()
+        JWT_VALIDATIONS.labels(
+            service=service, result="success", token_type=token_type
+        ).inc(count)
+
+
 def record_file_upload(service: str, result: str, file_type: str = "unknown", **labels):
     """Record a file upload attempt."""
     FILE_UPLOADS.labels(service=service, result=result, file_type=file_type).inc()
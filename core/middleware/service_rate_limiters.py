@@ -9,86 +9,124 @@ import logging
 from aiohttp import web
 
 from core.middleware.security_metrics import record_rate_limit_hit
-from core.utils.security import RateLimiter
+from core.utils.path_router import PathRouter
+from core.utils.rate_limit_store import (
+    DistributedRateLimiter,
+    create_rate_limit_store,
+)
+from core.utils.rate_limiter import SlidingWindowRateLimiter, retry_after_header
 
 logger = logging.getLogger(__name__)
 
+# Shared counters across replicas when RATE_LIMIT_REDIS_URL is set
+_rate_limit_store = create_rate_limit_store()
+
+
+def _limiter(
+    name: str, max_requests: int, window_seconds: int
+) -> SlidingWindowRateLimiter:
+    """Create a limiter, shared across replicas if a store is configured."""
+    if _rate_limit_store is None:
+        return SlidingWindowRateLimiter(max_requests, window_seconds)
+    return DistributedRateLimiter(name, max_requests, window_seconds, _rate_limit_store)
+
+
 # Service-specific rate limiters
 SERVICE_RATE_LIMITERS = {
-    "auth-service": RateLimiter(max_requests=10, window_seconds=60),  # 10 req/min
-    "profile-service": RateLimiter(max_requests=50, window_seconds=60),  # 50 req/min
-    "discovery-service": RateLimiter(max_requests=50, window_seconds=60),  # 50 req/min
-    "chat-service": RateLimiter(max_requests=50, window_seconds=60),  # 50 req/min
-    "media-service": RateLimiter(max_requests=20, window_seconds=60),  # 20 req/min
-    "admin-service": RateLimiter(max_requests=30, window_seconds=60),  # 30 req/min
-    "notification-service": RateLimiter(
-        max_requests=50, window_seconds=60
+    "auth-service": _limiter(
+        "service:auth-service", max_requests=10, window_seconds=60
+    ),  # 10 req/min
+    "profile-service": _limiter(
+        "service:profile-service", max_requests=50, window_seconds=60
+    ),  # 50 req/min
+    "discovery-service": _limiter(
+        "service:discovery-service", max_requests=50, window_seconds=60
     ),  # 50 req/min
-    "data-service": RateLimiter(
-        max_requests=100, window_seconds=60
+    "chat-service": _limiter(
+        "service:chat-service", max_requests=50, window_seconds=60
+    ),  # 50 req/min
+    "media-service": _limiter(
+        "service:media-service", max_requests=20, window_seconds=60
+    ),  # 20 req/min
+    "admin-service": _limiter(
+        "service:admin-service", max_requests=30, window_seconds=60
+    ),  # 30 req/min
+    "notification-service": _limiter(
+        "service:notification-service", max_requests=50, window_seconds=60
+    ),  # 50 req/min
+    "data-service": _limiter(
+        "service:data-service", max_requests=100, window_seconds=60
     ),  # 100 req/min (internal)
 }
 
 # Endpoint-specific rate limiters for sensitive operations
 ENDPOINT_RATE_LIMITERS = {
     # Auth endpoints - stricter limits
-    "/auth/validate": RateLimiter(max_requests=5, window_seconds=60),  # 5 req/min
-    "/auth/refresh": RateLimiter(max_requests=10, window_seconds=60),  # 10 req/min
+    "/auth/validate": _limiter(
+        "endpoint:/auth/validate", max_requests=5, window_seconds=60
+    ),  # 5 req/min
+    "/auth/refresh": _limiter(
+        "endpoint:/auth/refresh", max_requests=10, window_seconds=60
+    ),  # 10 req/min
     # Media endpoints - file upload limits
-    "/media/upload": RateLimiter(max_requests=5, window_seconds=60),  # 5 uploads/min
-    "/media/upload/photo": RateLimiter(
-        max_requests=3, window_seconds=60
+    "/media/upload": _limiter(
+        "endpoint:/media/upload", max_requests=5, window_seconds=60
+    ),  # 5 uploads/min
+    "/media/upload/photo": _limiter(
+        "endpoint:/media/upload/photo", max_requests=3, window_seconds=60
     ),  # 3 photos/min
     # Discovery endpoints - swipe limits
-    "/discovery/swipe": RateLimiter(
-        max_requests=30, window_seconds=60
+    "/discovery/swipe": _limiter(
+        "endpoint:/discovery/swipe", max_requests=30, window_seconds=60
     ),  # 30 swipes/min
     # Chat endpoints - message limits
-    "/chat/messages": RateLimiter(
-        max_requests=20, window_seconds=60
+    "/chat/messages": _limiter(
+        "endpoint:/chat/messages", max_requests=20, window_seconds=60
     ),  # 20 messages/min
-    "/chat/conversations/{id}/messages": RateLimiter(
-        max_requests=20, window_seconds=60
+    "/chat/conversations/{id}/messages": _limiter(
+        "endpoint:/chat/conversations/{id}/messages", max_requests=20, window_seconds=60
     ),
     # Admin endpoints - moderation limits
-    "/admin/moderation": RateLimiter(
-        max_requests=10, window_seconds=60
+    "/admin/moderation": _limiter(
+        "endpoint:/admin/moderation", max_requests=10, window_seconds=60
     ),  # 10 actions/min
     # Report endpoints - abuse prevention
-    "/reports": RateLimiter(max_requests=5, window_seconds=60),  # 5 reports/min
-    "/discovery/report": RateLimiter(max_requests=5, window_seconds=60),
-    "/chat/reports": RateLimiter(max_requests=5, window_seconds=60),
+    "/reports": _limiter(
+        "endpoint:/reports", max_requests=5, window_seconds=60
+    ),  # 5 reports/min
+    "/discovery/report": _limiter(
+        "endpoint:/discovery/report", max_requests=5, window_seconds=60
+    ),
+    "/chat/reports": _limiter(
+        "endpoint:/chat/reports", max_requests=5, window_seconds=60
+    ),
 }
 
 
-def get_rate_limiter_for_service(service_name: str) -> RateLimiter:
-    """Get rate limiter for a specific service."""
-    return SERVICE_RATE_LIMITERS.get(
-        service_name, RateLimiter(max_requests=50, window_seconds=60)
-    )
-
+# Endpoint policies compiled once; lookups cost O(path depth)
+_endpoint_router: PathRouter[SlidingWindowRateLimiter] = PathRouter()
+for _pattern, _endpoint_limiter in ENDPOINT_RATE_LIMITERS.items():
+    _endpoint_router.add(_pattern, _endpoint_limiter)
 
-def get_rate_limiter_for_endpoint(endpoint: str) -> RateLimiter:
-    """Get rate limiter for a specific endpoint."""
-    # Try exact match first
-    if endpoint in ENDPOINT_RATE_LIMITERS:
-        return ENDPOINT_RATE_LIMITERS[endpoint]
+_default_service_limiters: dict[str, SlidingWindowRateLimiter] = {}
 
-    # Try pattern matching for parameterized endpoints
-    for pattern, limiter in ENDPOINT_RATE_LIMITERS.items():
-        if "{" in pattern and _matches_pattern(endpoint, pattern):
-            return limiter
-
-    return None  # type: ignore[return-value]
 
+def get_rate_limiter_for_service(service_name: str) -> SlidingWindowRateLimiter:
+    """Get rate limiter for a specific service."""
+    limiter = SERVICE_RATE_LIMITERS.get(service_name)
+    if limiter is None:
+        limiter = _default_service_limiters.get(service_name)
+        if limiter is None:
+            limiter = _limiter(
+                f"service:{service_name}", max_requests=50, window_seconds=60
+            )
+            _default_service_limiters[service_name] = limiter
+    return limiter
 
-def _matches_pattern(endpoint: str, pattern: str) -> bool:
-    """Check if endpoint matches a parameterized pattern."""
-    # Simple pattern matching for {id} parameters
-    import re
 
-    pattern_regex = pattern.replace("{id}", r"[^/]+").replace("{user_id}", r"[^/]+")
-    return bool(re.match(pattern_regex, endpoint))
+def get_rate_limiter_for_endpoint(endpoint: str) -> SlidingWindowRateLimiter | None:
+    """Get rate limiter for a specific endpoint."""
+    return _endpoint_router.match(endpoint)
 
 
 @web.middleware
@@ -114,7 +152,8 @@ async def service_rate_limiting_middleware(
     # Check endpoint-specific rate limiting first
     endpoint_limiter = get_rate_limiter_for_endpoint(request.path)
     if endpoint_limiter:
-        if not endpoint_limiter.is_allowed(user_id):
+        decision = endpoint_limiter.check(user_id)
+        if not decision.allowed:
             logger.warning(
                 f"Endpoint rate limit exceeded for {user_id} on {request.path}",
                 extra={
@@ -133,15 +172,16 @@ async def service_rate_limiting_middleware(
                     "code": "RATE_001",
                     "status_code": 429,
                     "timestamp": None,  # Will be set by error middleware
-                    "retry_after": endpoint_limiter.window_seconds,
+                    "retry_after": int(retry_after_header(decision)),
                 },
                 status=429,
-                headers={"Retry-After": str(endpoint_limiter.window_seconds)},
+                headers={"Retry-After": retry_after_header(decision)},
             )
 
     # Check service-level rate limiting
     service_limiter = get_rate_limiter_for_service(service_name)
-    if not service_limiter.is_allowed(user_id):
+    decision = service_limiter.check(user_id)
+    if not decision.allowed:
         logger.warning(
             f"Service rate limit exceeded for {user_id} on {service_name}",
             extra={
@@ -160,17 +200,22 @@ async def service_rate_limiting_middleware(
                 "code": "RATE_001",
                 "status_code": 429,
                 "timestamp": None,  # Will be set by error middleware
-                "retry_after": service_limiter.window_seconds,
+                "retry_after": int(retry_after_header(decision)),
             },
             status=429,
-            headers={"Retry-After": str(service_limiter.window_seconds)},
+            headers={"Retry-After": retry_after_header(decision)},
         )
 
     return await handler(request)
 
 
-def _get_user_identifier(request: web.Request) -> int:
-    """Get user identifier for rate limiting."""
+def _get_user_identifier(request: web.Request) -> int | str:
+    """Get user identifier for rate limiting.
+
+    Authenticated users are keyed by user ID, anonymous clients by IP
+    address. The key must be the same on every replica and across restarts
+    so the shared rate limit store applies one quota per client.
+    """
     # Try to get user_id from JWT payload if available
     if "jwt_payload" in request:
         user_id = request["jwt_payload"].get("user_id")
@@ -185,11 +230,8 @@ def _get_user_identifier(request: web.Request) -> int:
         or "unknown"
     )
 
-    # Convert IP to integer for consistent hashing
-    try:
-        return hash(client_ip) % (2**31)  # Convert to 32-bit integer
-    except Exception:
-        return 0
+    # Prefixed so an address never shares a bucket with a user ID
+    return f"ip:{client_ip}"
 
 
 # Specialized rate limiters for specific use cases
@@ -197,13 +239,13 @@ class AuthRateLimiter:
     """Specialized rate limiter for authentication endpoints."""
 
     def __init__(self):
-        self.login_limiter = RateLimiter(
+        self.login_limiter = SlidingWindowRateLimiter(
             max_requests=5, window_seconds=60
         )  # 5 login attempts/min
-        self.refresh_limiter = RateLimiter(
+        self.refresh_limiter = SlidingWindowRateLimiter(
             max_requests=10, window_seconds=60
         )  # 10 refresh/min
-        self.validate_limiter = RateLimiter(
+        self.validate_limiter = SlidingWindowRateLimiter(
             max_requests=5, window_seconds=60
         )  # 5 validate/min
 
@@ -221,13 +263,13 @@ class MediaRateLimiter:
     """Specialized rate limiter for media upload endpoints."""
 
     def __init__(self):
-        self.upload_limiter = RateLimiter(
+        self.upload_limiter = SlidingWindowRateLimiter(
             max_requests=3, window_seconds=60
         )  # 3 uploads/min
-        self.photo_limiter = RateLimiter(
+        self.photo_limiter = SlidingWindowRateLimiter(
             max_requests=2, window_seconds=60
         )  # 2 photos/min
-        self.video_limiter = RateLimiter(
+        self.video_limiter = SlidingWindowRateLimiter(
             max_requests=1, window_seconds=60
         )  # 1 video/min
 
@@ -245,13 +287,13 @@ class DiscoveryRateLimiter:
     """Specialized rate limiter for discovery endpoints."""
 
     def __init__(self):
-        self.swipe_limiter = RateLimiter(
+        self.swipe_limiter = SlidingWindowRateLimiter(
             max_requests=30, window_seconds=60
         )  # 30 swipes/min
-        self.super_like_limiter = RateLimiter(
+        self.super_like_limiter = SlidingWindowRateLimiter(
             max_requests=5, window_seconds=60
         )  # 5 super likes/min
-        self.undo_limiter = RateLimiter(
+        self.undo_limiter = SlidingWindowRateLimiter(
             max_requests=3, window_seconds=300
         )  # 3 undos/5min
 
@@ -269,13 +311,13 @@ class ChatRateLimiter:
     """Specialized rate limiter for chat endpoints."""
 
     def __init__(self):
-        self.message_limiter = RateLimiter(
+        self.message_limiter = SlidingWindowRateLimiter(
             max_requests=20, window_seconds=60
         )  # 20 messages/min
-        self.typing_limiter = RateLimiter(
+        self.typing_limiter = SlidingWindowRateLimiter(
             max_requests=10, window_seconds=60
         )  # 10 typing events/min
-        self.read_limiter = RateLimiter(
+        self.read_limiter = SlidingWindowRateLimiter(
             max_requests=50, window_seconds=60
         )  # 50 read updates/min
 
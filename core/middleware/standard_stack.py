@@ -5,16 +5,19 @@ from __future__ import annotations
 from aiohttp import web
 
 from core.middleware.audit_logging import audit_logging_middleware
+from core.middleware.concurrency_limit import setup_concurrency_limit
 from core.middleware.correlation import correlation_middleware
 from core.middleware.error_handling import error_handling_middleware
 from core.middleware.jwt_middleware import admin_jwt_middleware, jwt_middleware
 from core.middleware.metrics_middleware import metrics_middleware
+from core.middleware.profiling import setup_profiling
 from core.middleware.request_logging import (
     request_logging_middleware,
     user_context_middleware,
 )
 from core.middleware.service_rate_limiters import service_rate_limiting_middleware
 from core.middleware.tracing import tracing_middleware
+from core.resilience.deadline import setup_deadlines
 
 
 def setup_standard_middleware_stack(
@@ -22,6 +25,7 @@ def setup_standard_middleware_stack(
     service_name: str,
     use_auth: bool = True,
     use_audit: bool = True,
+    max_concurrency: int | None = None,
 ) -> None:
     """
     Setup the standard middleware stack for a microservice.
@@ -31,6 +35,7 @@ def setup_standard_middleware_stack(
         service_name: Name of the service (for metrics and logging)
         use_auth: Whether to include JWT authentication middleware
         use_audit: Whether to include audit logging middleware
+        max_concurrency: Upper bound for the adaptive concurrency limit
     """
     # Set service name for metrics and logging
     app["service_name"] = service_name
@@ -40,6 +45,12 @@ def setup_standard_middleware_stack(
     # 1. Error handler - must be first to catch all exceptions
     app.middlewares.append(error_handling_middleware)
 
+    # 1a. Request deadline - budget propagated by the caller
+    setup_deadlines(app)
+
+    # 1b. Load shedding - reject early when overloaded
+    setup_concurrency_limit(app, service_name, max_limit=max_concurrency)
+
     # 2. Distributed tracing - extract/generate trace context
     app.middlewares.append(tracing_middleware)
 
@@ -52,6 +63,9 @@ def setup_standard_middleware_stack(
     # 5. Request logging - log all requests with context
     app.middlewares.append(request_logging_middleware)
 
+    # 5a. Stage timing and opt-in profiling endpoints
+    setup_profiling(app, service_name)
+
     # 6. Rate limiting - protect against abuse
     app.middlewares.append(service_rate_limiting_middleware)
 
@@ -83,6 +97,12 @@ def setup_admin_middleware_stack(app: web.Application, service_name: str) -> Non
     # 1. Error handler
     app.middlewares.append(error_handling_middleware)
 
+    # 1a. Request deadline
+    setup_deadlines(app)
+
+    # 1b. Load shedding
+    setup_concurrency_limit(app, service_name)
+
     # 2. Distributed tracing
     app.middlewares.append(tracing_middleware)
 
@@ -123,6 +143,12 @@ def setup_auth_service_middleware_stack(
     # 1. Error handler
     app.middlewares.append(error_handling_middleware)
 
+    # 1a. Request deadline
+    setup_deadlines(app)
+
+    # 1b. Load shedding
+    setup_concurrency_limit(app, service_name)
+
     # 2. Distributed tracing
     app.middlewares.append(tracing_middleware)
 
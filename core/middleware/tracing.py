@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import uuid
+from collections.abc import Mapping
 
 from aiohttp import web
 
@@ -26,6 +27,8 @@ class TraceContext:
         self.trace_id = trace_id
         self.span_id = span_id
         self.parent_span_id = parent_span_id
+        # Seconds per request stage (db, upstream, ...), see core.middleware.profiling
+        self.stages: dict[str, float] = {}
 
     def to_headers(self) -> dict[str, str]:
         """Convert trace context to HTTP headers."""
@@ -44,7 +47,7 @@ class TraceContext:
         return headers
 
     @classmethod
-    def from_headers(cls, headers: dict[str, str]) -> TraceContext:
+    def from_headers(cls, headers: Mapping[str, str]) -> TraceContext:
         """Create trace context from HTTP headers."""
         # Try to get from custom headers first
         trace_id = headers.get(TRACE_ID_HEADER)
@@ -62,15 +65,15 @@ class TraceContext:
 
         # Generate new IDs if not found
         if not trace_id:
-            trace_id = str(uuid.uuid4()).replace("-", "")
+            trace_id = uuid.uuid4().hex
         if not span_id:
-            span_id = str(uuid.uuid4()).replace("-", "")[:16]
+            span_id = uuid.uuid4().hex[:16]
 
         return cls(trace_id, span_id, parent_span_id)
 
     def create_child_span(self) -> TraceContext:
         """Create a child span context."""
-        new_span_id = str(uuid.uuid4()).replace("-", "")[:16]
+        new_span_id = uuid.uuid4().hex[:16]
         return TraceContext(self.trace_id, new_span_id, self.span_id)
 
 
@@ -81,8 +84,8 @@ async def tracing_middleware(request: web.Request, handler):
 
     Extracts or generates trace context and adds it to request and logs.
     """
-    # Extract or generate trace context
-    trace_context = TraceContext.from_headers(dict(request.headers))
+    # Extract or generate trace context (headers are looked up case-insensitively)
+    trace_context = TraceContext.from_headers(request.headers)
 
     # Store in request for use by other middleware and handlers
     request["trace_context"] = trace_context
@@ -90,19 +93,22 @@ async def tracing_middleware(request: web.Request, handler):
     request["span_id"] = trace_context.span_id
     request["parent_span_id"] = trace_context.parent_span_id
 
+    debug = logger.isEnabledFor(logging.DEBUG)
+
     # Log trace context
-    logger.debug(
-        f"Trace context: {trace_context.trace_id} -> {trace_context.span_id}",
-        extra={
-            "event_type": "trace_start",
-            "trace_id": trace_context.trace_id,
-            "span_id": trace_context.span_id,
-            "parent_span_id": trace_context.parent_span_id,
-            "service": request.app.get("service_name", "unknown"),
-            "path": request.path,
-            "method": request.method,
-        },
-    )
+    if debug:
+        logger.debug(
+            f"Trace context: {trace_context.trace_id} -> {trace_context.span_id}",
+            extra={
+                "event_type": "trace_start",
+                "trace_id": trace_context.trace_id,
+                "span_id": trace_context.span_id,
+                "parent_span_id": trace_context.parent_span_id,
+                "service": request.app.get("service_name", "unknown"),
+                "path": request.path,
+                "method": request.method,
+            },
+        )
 
     # Process request
     response = await handler(request)
@@ -113,19 +119,21 @@ async def tracing_middleware(request: web.Request, handler):
         response.headers[header] = value
 
     # Log trace completion
-    logger.debug(
-        f"Trace completed: {trace_context.trace_id} -> {trace_context.span_id}",
-        extra={
-            "event_type": "trace_complete",
-            "trace_id": trace_context.trace_id,
-            "span_id": trace_context.span_id,
-            "parent_span_id": trace_context.parent_span_id,
-            "service": request.app.get("service_name", "unknown"),
-            "path": request.path,
-            "method": request.method,
-            "status_code": response.status,
-        },
-    )
+    if debug:
+        logger.debug(
+            f"Trace completed: {trace_context.trace_id} -> {trace_context.span_id}",
+            extra={
+                "event_type": "trace_complete",
+                "trace_id": trace_context.trace_id,
+                "span_id": trace_context.span_id,
+                "parent_span_id": trace_context.parent_span_id,
+                "service": request.app.get("service_name", "unknown"),
+                "path": request.path,
+                "method": request.method,
+                "status_code": response.status,
+                "stages": trace_context.stages,
+            },
+        )
 
     return response
 
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+"""Request deadlines propagated across service calls.
+
+The gateway gives every request a time budget. Each hop carries the
+remaining budget in the ``X-Request-Budget-Ms`` header; a service receiving
+it starts its own deadline from that value, and everything it sends on
+carries whatever is left at send time, so the budget shrinks by the time
+spent at every hop. Relative budgets keep clock skew between hosts out of
+the picture.
+
+While a deadline is set:
+
+* ``deadline_headers`` forwards the remaining budget to other services,
+* ``client_timeout`` caps aiohttp client timeouts at the remaining budget,
+* ``stop_on_deadline`` stops tenacity retries that no longer fit,
+* ``install_statement_timeout`` makes Postgres cancel statements that would
+  outlive the caller (``SET LOCAL statement_timeout``).
+
+Requests arriving with no budget left are rejected with 504.
+"""
+
+import contextvars
+import logging
+import time
+from typing import Any
+
+from aiohttp import ClientTimeout, web
+from tenacity import RetryCallState
+from tenacity.stop import stop_base
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Budget-Ms"
+
+# Monotonic deadline of the request being handled in the current context
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+def set_deadline(budget_seconds: float) -> contextvars.Token:
+    """Start a deadline ``budget_seconds`` from now in the current context."""
+    return _deadline.set(time.monotonic() + budget_seconds)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    """Restore the deadline replaced by set_deadline."""
+    _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left until the current deadline, or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_headers() -> dict[str, str]:
+    """Headers passing the remaining budget to the next service."""
+    left = remaining()
+    if left is None:
+        return {}
+    return {DEADLINE_HEADER: str(max(0, int(left * 1000)))}
+
+
+def client_timeout(total: float, connect: float | None = None) -> ClientTimeout:
+    """aiohttp timeout of at most ``total`` seconds and the remaining budget."""
+    left = remaining()
+    if left is not None:
+        total = max(0.001, min(total, left))
+    return ClientTimeout(total=total, connect=connect)
+
+
+class stop_on_deadline(stop_base):
+    """Tenacity stop condition: give up once the next attempt cannot fit.
+
+    Stops when the remaining budget, after the upcoming backoff sleep, is
+    less than ``min_attempt_seconds``. Without a deadline it never stops.
+    """
+
+    def __init__(self, min_attempt_seconds: float = 0.1):
+        self.min_attempt_seconds = min_attempt_seconds
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        left = remaining()
+        if left is None:
+            return False
+        if left - (retry_state.upcoming_sleep or 0.0) >= self.min_attempt_seconds:
+            return False
+
+        logger.debug(
+            f"Skipping retry: {max(0.0, left):.3f}s of request budget left",
+            extra={"event_type": "retry_skipped_deadline"},
+        )
+        return True
+
+
+def statement_timeout_ms(margin_ms: int = 50) -> int | None:
+    """Statement timeout matching the remaining budget.
+
+    Args:
+        margin_ms: Time kept for sending the response after the query
+
+    Returns:
+        Milliseconds (at least 1), or None without a deadline
+    """
+    left = remaining()
+    if left is None:
+        return None
+    return max(1, int(left * 1000) - margin_ms)
+
+
+def install_statement_timeout(engine: Any, margin_ms: int = 50) -> None:
+    """Bound every transaction on ``engine`` by the request deadline.
+
+    Issues ``SET LOCAL statement_timeout`` when a session begins a
+    transaction while a deadline is set. Postgres only.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(Session, "after_begin")
+    def _set_statement_timeout(session, transaction, connection):
+        if connection.engine is not sync_engine:
+            return
+        timeout_ms = statement_timeout_ms(margin_ms)
+        if timeout_ms is not None:
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+@web.middleware
+async def deadline_middleware(request: web.Request, handler) -> web.StreamResponse:
+    """Start the request's deadline from the incoming budget header."""
+    budget = request.app.get("default_request_budget")
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            received = int(header) / 1000
+        except ValueError:
+            received = None
+        if received is not None:
+            budget = received if budget is None else min(budget, received)
+
+    # WebSockets live beyond any request budget
+    if budget is None or request.headers.get("Upgrade", "").lower() == "websocket":
+        return await handler(request)
+
+    if budget <= 0:
+        logger.info(
+            f"Rejecting {request.method} {request.path}: request budget exhausted",
+            extra={"event_type": "deadline_exceeded", "path": request.path},
+        )
+        return web.json_response(
+            {
+                "error": "DEADLINE_EXCEEDED",
+                "message": "Request budget exhausted",
+                "code": "DEADLINE_EXCEEDED",
+                "status_code": 504,
+            },
+            status=504,
+        )
+
+    token = set_deadline(budget)
+    try:
+        return await handler(request)
+    finally:
+        reset_deadline(token)
+
+
+def setup_deadlines(app: web.Application, default_budget: float | None = None) -> None:
+    """Add deadline propagation to an application.
+
+    Args:
+        app: aiohttp Application instance
+        default_budget: Budget in seconds for requests arriving without a
+            budget header (the gateway); incoming budgets are capped by it.
+            Services behind the gateway leave it unset.
+    """
+    app["default_request_budget"] = default_budget
+    app.middlewares.append(deadline_middleware)
@@ -13,6 +13,8 @@ from tenacity import (
     wait_exponential,
 )
 
+from core.resilience.deadline import stop_on_deadline
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,9 +27,12 @@ def retry_on_service_error(
         max_attempts: Maximum number of retry attempts
         min_wait: Minimum wait time in seconds
         max_wait: Maximum wait time in seconds
+
+    Retries stop early when the request deadline leaves no room for
+    another attempt.
     """
     return retry(
-        stop=stop_after_attempt(max_attempts),
+        stop=stop_after_attempt(max_attempts) | stop_on_deadline(),
         wait=wait_exponential(multiplier=1, min=min_wait, max=max_wait),
         retry=retry_if_exception_type(
             (ClientError, ServerTimeoutError, ConnectionError)
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 """Core utility functions - platform independent."""
 
+from .path_router import PathRouter
+from .rate_limiter import SlidingWindowRateLimiter
 from .security import (
     RateLimiter,
+    TelegramInitDataValidator,
     ValidationError,
     generate_jwt_token,
     validate_jwt_token,
@@ -15,7 +18,10 @@ __all__ = [
     "validate_age",
     "ValidationError",
     "validate_telegram_webapp_init_data",
+    "TelegramInitDataValidator",
     "generate_jwt_token",
     "validate_jwt_token",
     "RateLimiter",
+    "SlidingWindowRateLimiter",
+    "PathRouter",
 ]
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+"""Head and tail sampling of request logs.
+
+Head sampling decides per trace whether a request's logs are written: the
+decision hashes the trace ID, so every service keeps or drops the same
+traces. Rates are configured per route prefix and scaled down
+automatically when the service writes more lines per second than its
+budget.
+
+Requests that are not head-sampled still have their records held in a tail
+buffer until they complete. If the request fails or is slow the buffered
+records are written after all, so errors and slow requests are always
+logged. Warnings and errors are never buffered.
+"""
+
+import contextvars
+import logging
+import os
+import time
+import zlib
+from collections.abc import Callable
+
+from core.utils.path_router import PathRouter
+
+logger = logging.getLogger(__name__)
+
+
+class TailBuffer:
+    """Records of one unsampled request."""
+
+    __slots__ = ("records", "closed", "max_records")
+
+    def __init__(self, max_records: int = 200):
+        self.records: list[logging.LogRecord] = []
+        self.closed = False
+        self.max_records = max_records
+
+
+# Buffer of the request being handled in the current context, if unsampled
+_tail_buffer: contextvars.ContextVar[TailBuffer | None] = contextvars.ContextVar(
+    "log_tail_buffer", default=None
+)
+
+
+class LogSampler:
+    """Per-route head sampling with a lines-per-second budget."""
+
+    def __init__(
+        self,
+        default_rate: float = 1.0,
+        route_rates: dict[str, float] | None = None,
+        slow_request_ms: int = 1000,
+        target_lines_per_second: float = 0.0,
+        adjust_interval: float = 10.0,
+        min_factor: float = 0.001,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize sampler.
+
+        Args:
+            default_rate: Fraction of requests logged when no route matches
+            route_rates: Sample rate per route prefix
+            slow_request_ms: Requests at least this slow are always logged
+            target_lines_per_second: Log line budget; 0 disables adjustment
+            adjust_interval: Seconds between rate adjustments
+            min_factor: Lowest scale applied to configured rates
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.default_rate = default_rate
+        self.slow_request_ms = slow_request_ms
+        self.target_lines_per_second = target_lines_per_second
+        self.adjust_interval = adjust_interval
+        self.min_factor = min_factor
+        self._clock = clock
+
+        self._routes: PathRouter[float] = PathRouter()
+        for prefix, rate in (route_rates or {}).items():
+            self._routes.add(prefix, rate, prefix=True)
+
+        # Scale applied to every rate to stay within the line budget
+        self.factor = 1.0
+        self.lines = 0
+        self.dropped_requests = 0
+        self._window_start = clock()
+
+    @classmethod
+    def from_env(cls) -> LogSampler:
+        """Create a sampler from LOG_SAMPLE_* environment variables.
+
+        ``LOG_SAMPLE_ROUTES`` is a comma-separated list of ``prefix=rate``.
+        """
+        route_rates = {}
+        for item in os.getenv("LOG_SAMPLE_ROUTES", "").split(","):
+            prefix, _, rate = item.strip().partition("=")
+            if prefix and rate:
+                route_rates[prefix] = float(rate)
+
+        return cls(
+            default_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+            route_rates=route_rates,
+            slow_request_ms=int(os.getenv("LOG_SLOW_REQUEST_MS", "1000")),
+            target_lines_per_second=float(os.getenv("LOG_LINES_PER_SECOND", "0")),
+        )
+
+    def rate_for(self, path: str) -> float:
+        """Effective sample rate of ``path``."""
+        rate = self._routes.match(path)
+        if rate is None:
+            rate = self.default_rate
+        return rate * self.factor
+
+    def head_sampled(self, trace_id: str, path: str) -> bool:
+        """Whether a request's logs are written regardless of outcome."""
+        rate = self.rate_for(path)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return zlib.crc32(trace_id.encode()) / 0x100000000 < rate
+
+    def tail_keep(self, status_code: int | None, duration_ms: int) -> bool:
+        """Whether an unsampled request is logged after all."""
+        return (
+            status_code is None
+            or status_code >= 500
+            or duration_ms >= self.slow_request_ms
+        )
+
+    def count_line(self) -> None:
+        """Count a written line and adjust rates once per interval."""
+        self.lines += 1
+        if not self.target_lines_per_second:
+            return
+
+        now = self._clock()
+        elapsed = now - self._window_start
+        if elapsed < self.adjust_interval:
+            return
+
+        observed = self.lines / elapsed
+        if observed > 0:
+            self.factor = min(
+                1.0,
+                max(
+                    self.min_factor,
+                    self.factor * self.target_lines_per_second / observed,
+                ),
+            )
+        self.lines = 0
+        self._window_start = now
+
+    def start_buffer(self) -> tuple[TailBuffer, contextvars.Token]:
+        """Hold records of the current request until it completes."""
+        buffer = TailBuffer()
+        return buffer, _tail_buffer.set(buffer)
+
+    def finish_buffer(
+        self, buffer: TailBuffer, token: contextvars.Token, keep: bool
+    ) -> bool:
+        """Write or discard a request's held records.
+
+        Returns:
+            ``keep``, for chaining into the caller's own logging
+        """
+        buffer.closed = True
+        _tail_buffer.reset(token)
+        if not keep:
+            self.dropped_requests += 1
+            return False
+        for record in buffer.records:
+            logging.getLogger(record.name).handle(record)
+        return True
+
+    def get_stats(self) -> dict[str, float]:
+        """Get sampler statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "default_rate": self.default_rate,
+            "factor": self.factor,
+            "dropped_requests": self.dropped_requests,
+            "target_lines_per_second": self.target_lines_per_second,
+        }
+
+
+class TailSamplingFilter(logging.Filter):
+    """Handler filter that diverts records of unsampled requests.
+
+    Install on output handlers. Records below WARNING emitted while an
+    unsampled request is in flight go to its tail buffer instead of the
+    handler; every record that passes is counted against the line budget.
+    """
+
+    def __init__(self, sampler: LogSampler):
+        super().__init__()
+        self.sampler = sampler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        buffer = _tail_buffer.get()
+        if (
+            buffer is not None
+            and not buffer.closed
+            and record.levelno < logging.WARNING
+            and len(buffer.records) < buffer.max_records
+        ):
+            buffer.records.append(record)
+            return False
+
+        self.sampler.count_line()
+        return True
+
+
+# Sampler shared by request logging and the logging configuration
+request_log_sampler = LogSampler.from_env()
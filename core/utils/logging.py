@@ -1,12 +1,47 @@
 from __future__ import annotations
 
-"""Shared structured JSON logging configuration for all services."""
+"""Shared structured JSON logging configuration for all services.
+
+By default records are not written on the calling thread: QueueLogHandler
+appends them to an in-memory deque and a background thread formats and
+writes them to stdout in batches, so log I/O stays off the event loop.
+"""
 
-import json
 import logging
+import os
 import sys
+import threading
+from collections import deque
 from datetime import UTC, datetime
-from typing import Any
+from typing import Any, TextIO
+
+import orjson
+
+from core.utils.log_sampling import TailSamplingFilter, request_log_sampler
+
+# Extra fields copied from log records into the JSON document
+EXTRA_FIELDS = (
+    "user_id",
+    "event_type",
+    "service_name",
+    "request_id",
+    "correlation_id",
+    "trace_id",
+    "span_id",
+    "parent_span_id",
+    "duration_ms",
+    "status_code",
+    "method",
+    "path",
+    "remote_addr",
+    "user_agent",
+    "error_type",
+    "error_message",
+    "stages",
+)
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+_exception_formatter = logging.Formatter()
 
 
 class JsonFormatter(logging.Formatter):
@@ -15,7 +50,7 @@ class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON."""
         log_data: dict[str, Any] = {
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -27,44 +62,216 @@ class JsonFormatter(logging.Formatter):
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
 
         # Add extra fields if present
-        for field in [
-            "user_id",
-            "event_type",
-            "service_name",
-            "request_id",
-            "correlation_id",
-            "trace_id",
-            "span_id",
-            "parent_span_id",
-            "duration_ms",
-            "status_code",
-            "method",
-            "path",
-            "remote_addr",
-            "user_agent",
-            "error_type",
-            "error_message",
-        ]:
-            if hasattr(record, field):
-                log_data[field] = getattr(record, field)
-
-        return json.dumps(log_data)
+        attributes = record.__dict__
+        for field in EXTRA_FIELDS:
+            if field in attributes:
+                log_data[field] = attributes[field]
+
+        return orjson.dumps(log_data, default=str, option=_ORJSON_OPTIONS).decode()
+
+
+class QueueLogHandler(logging.Handler):
+    """Handler that hands records to a background writer thread.
+
+    ``emit`` only appends to a deque (atomic under the GIL, no lock taken);
+    the writer thread formats and writes batches of records with one write
+    and flush per batch, under its own lock rather than the handler lock.
+    When ``max_size`` records are pending, new records are dropped and
+    counted (``policy="drop"``) or the caller waits until the writer signals
+    room (``policy="block"``).
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        max_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        policy: str = "drop",
+    ):
+        """Initialize handler and start the writer thread.
+
+        Args:
+            stream: Output stream (stdout by default)
+            max_size: Maximum pending records
+            batch_size: Maximum records per write
+            flush_interval: Seconds the writer waits for more records
+            policy: "drop" or "block" when the queue is full
+        """
+        super().__init__()
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+
+        self.stream = stream or sys.stdout
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.dropped = 0
+        self.written = 0
+
+        self._records: deque[logging.LogRecord] = deque()
+        self._wakeup = threading.Event()
+        # Serializes writers (thread and flush); emit never takes it
+        self._write_lock = threading.Lock()
+        # Signalled by the writer after each batch, for policy="block"
+        self._space = threading.Condition()
+        self._stopped = False
+        self._reported_dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        """Filter and queue a record without taking the handler lock."""
+        result = self.filter(record)
+        if isinstance(result, logging.LogRecord):
+            record = result
+        if result:
+            self.emit(record)
+        return bool(result)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue a record without formatting or writing it."""
+        if len(self._records) >= self.max_size:
+            if self.policy == "drop" or self._stopped:
+                self.dropped += 1
+                return
+            with self._space:
+                while len(self._records) >= self.max_size and not self._stopped:
+                    self._wakeup.set()
+                    self._space.wait(self.flush_interval)
+
+        self._records.append(self.prepare(record))
+        if len(self._records) >= self.batch_size:
+            self._wakeup.set()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Resolve parts of the record that must not change after emit."""
+        # Arguments may be mutated by the caller once emit returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def flush(self) -> None:
+        """Write all pending records on the calling thread."""
+        with self._write_lock:
+            while self._records:
+                self._write_batch()
+
+    def close(self) -> None:
+        """Stop the writer thread after writing pending records."""
+        self._stopped = True
+        self._wakeup.set()
+        with self._space:
+            self._space.notify_all()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        super().close()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get queue statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "pending": len(self._records),
+            "written": self.written,
+            "dropped": self.dropped,
+            "policy": self.policy,
+        }
+
+    def _run(self) -> None:
+        """Writer thread: drain the queue in batches."""
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._write_lock:
+                while self._records:
+                    self._write_batch()
+
+    def _write_batch(self) -> None:
+        """Format and write up to ``batch_size`` records."""
+        lines = []
+        for _ in range(self.batch_size):
+            try:
+                record = self._records.popleft()
+            except IndexError:
+                break
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+
+        if self.dropped != self._reported_dropped:
+            lines.append(self._dropped_line())
+
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+            except Exception:
+                # Nothing sensible to do if stdout is gone
+                pass
+
+        # Records were taken off the queue: wake emitters waiting for room
+        with self._space:
+            self._space.notify_all()
+
+    def _dropped_line(self) -> str:
+        """Log line reporting records dropped since the last report."""
+        dropped = self.dropped
+        count = dropped - self._reported_dropped
+        self._reported_dropped = dropped
+        return orjson.dumps(
+            {
+                "timestamp": datetime.now(UTC).isoformat(),
+                "level": "WARNING",
+                "logger": __name__,
+                "message": f"{count} log records dropped, queue full",
+                "event_type": "log_records_dropped",
+                "dropped_total": dropped,
+            }
+        ).decode()
 
 
 def configure_logging(service_name: str, log_level: str = "INFO") -> None:
     """Configure JSON logging for a service.
 
+    Queued logging is on unless ``LOG_QUEUE_ENABLED=false``; ``LOG_QUEUE_SIZE``
+    and ``LOG_QUEUE_POLICY`` (drop/block) tune the queue.
+
     Args:
         service_name: Name of the service (e.g., "auth-service", "profile-service")
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
     """
-    handler = logging.StreamHandler(sys.stdout)
+    handler: logging.Handler
+    if os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true":
+        handler = QueueLogHandler(
+            max_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            policy=os.getenv("LOG_QUEUE_POLICY", "drop"),
+        )
+    else:
+        handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(JsonFormatter())
+    handler.addFilter(TailSamplingFilter(request_log_sampler))
 
     # Configure root logger
     root_logger = logging.getLogger()
+    for old_handler in root_logger.handlers:
+        if isinstance(old_handler, QueueLogHandler):
+            old_handler.close()
     root_logger.handlers.clear()
     root_logger.addHandler(handler)
     root_logger.setLevel(getattr(logging, log_level.upper()))
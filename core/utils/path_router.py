@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+"""Precompiled path classification.
+
+Middlewares that pick a policy by request path (rate limits, audit
+operations, ...) register their patterns once in a PathRouter. Patterns are
+stored in a trie keyed by path segment, so a lookup walks the segments of the
+request path once: its cost depends on the path depth, not on how many
+patterns are registered.
+
+Pattern segments written as ``{name}`` match any single segment. A pattern
+added with ``prefix=True`` also matches every path below it; the deepest
+matching pattern wins and literal segments take precedence over ``{name}``.
+"""
+
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Node(Generic[T]):
+    """Trie node for one path segment."""
+
+    __slots__ = ("children", "wildcard", "exact", "prefix")
+
+    def __init__(self):
+        self.children: dict[str, _Node[T]] = {}
+        self.wildcard: _Node[T] | None = None
+        # Value for paths ending here / for paths at or below this node
+        self.exact: T | None = None
+        self.prefix: T | None = None
+
+
+def split_path(path: str) -> list[str]:
+    """Split a path into its non-empty segments."""
+    return [segment for segment in path.split("/") if segment]
+
+
+class PathRouter(Generic[T]):
+    """Map request paths to values through a segment trie."""
+
+    def __init__(self):
+        self._root: _Node[T] = _Node()
+        self._patterns: dict[str, T] = {}
+
+    def add(self, pattern: str, value: T, prefix: bool = False) -> None:
+        """Register a pattern.
+
+        Args:
+            pattern: Path pattern, e.g. ``/chat/conversations/{id}/messages``
+            value: Value returned for matching paths
+            prefix: Also match every path below ``pattern``
+        """
+        node = self._root
+        for segment in split_path(pattern):
+            if segment.startswith("{") and segment.endswith("}"):
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, _Node())
+
+        if prefix:
+            node.prefix = value
+        else:
+            node.exact = value
+        self._patterns[pattern] = value
+
+    def match(self, path: str) -> T | None:
+        """Return the value of the most specific pattern matching ``path``."""
+        return self._match(self._root, split_path(path), 0)
+
+    def _match(self, node: _Node[T], segments: list[str], position: int) -> T | None:
+        if position == len(segments):
+            return node.exact if node.exact is not None else node.prefix
+
+        child = node.children.get(segments[position])
+        if child is not None:
+            value = self._match(child, segments, position + 1)
+            if value is not None:
+                return value
+
+        if node.wildcard is not None:
+            value = self._match(node.wildcard, segments, position + 1)
+            if value is not None:
+                return value
+
+        return node.prefix
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._patterns
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def items(self):
+        """Registered (pattern, value) pairs."""
+        return self._patterns.items()
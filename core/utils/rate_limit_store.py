@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+"""Rate limiting shared across service replicas.
+
+DistributedRateLimiter uses the same sliding-window-counter estimate as
+SlidingWindowRateLimiter, but the window counters live in a shared store so a
+limit holds across all replicas. To avoid one round trip per request, each
+replica decides locally from the last known shared counts plus its own
+unsynced requests, and pushes its deltas in one batched, atomic store update
+every ``sync_interval``. The overshoot is bounded by what all replicas can
+accept within one sync interval.
+
+If the store is unavailable the limiter keeps counting locally, so limits
+degrade to per-replica instead of failing open or closed. Requests counted
+meanwhile are pushed once the store is back, so other replicas see them for
+the windows still in use.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Protocol
+
+from core.utils.rate_limiter import (
+    RateLimitDecision,
+    SlidingWindowRateLimiter,
+    _evict_idle,
+    _Window,
+)
+
+logger = logging.getLogger(__name__)
+
+# (key, window index, delta) pushed to the store
+WindowUpdate = tuple[Hashable, int, int]
+
+
+class RateLimitStore(Protocol):
+    """Shared storage of per-window request counters."""
+
+    async def sync(
+        self, name: str, window_seconds: int, updates: list[WindowUpdate]
+    ) -> list[tuple[int, int]]:
+        """Atomically add deltas to window counters.
+
+        Args:
+            name: Limiter name (namespace for keys)
+            window_seconds: Window length, used for counter expiry
+            updates: (key, window index, delta) entries
+
+        Returns:
+            (previous window count, window count after the update) per entry
+        """
+        ...
+
+
+class InMemoryRateLimitStore:
+    """Process-local store, for tests and single-replica deployments."""
+
+    def __init__(self):
+        self._counters: dict[tuple[str, Hashable, int], int] = {}
+
+    async def sync(
+        self, name: str, window_seconds: int, updates: list[WindowUpdate]
+    ) -> list[tuple[int, int]]:
+        """Apply deltas; runs without awaiting, so it is atomic."""
+        results = []
+        for key, index, delta in updates:
+            current = self._counters.get((name, key, index), 0) + delta
+            self._counters[(name, key, index)] = current
+            self._counters.pop((name, key, index - 2), None)
+            results.append((self._counters.get((name, key, index - 1), 0), current))
+        return results
+
+
+class RedisRateLimitStore:
+    """Store backed by Redis.
+
+    Works with any client exposing the ``redis.asyncio`` pipeline API
+    (``pipeline(transaction=True)``, ``incrby``, ``expire``, ``get``,
+    ``execute``). All updates of one sync run in a single MULTI/EXEC.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit"):
+        """Initialize store.
+
+        Args:
+            client: Async Redis client
+            prefix: Key prefix
+        """
+        self.client = client
+        self.prefix = prefix
+
+    async def sync(
+        self, name: str, window_seconds: int, updates: list[WindowUpdate]
+    ) -> list[tuple[int, int]]:
+        """Add deltas and read counters in one transaction."""
+        pipe = self.client.pipeline(transaction=True)
+        for key, index, delta in updates:
+            counter = f"{self.prefix}:{name}:{key}:{index}"
+            pipe.incrby(counter, delta)
+            pipe.expire(counter, window_seconds * 2)
+            pipe.get(f"{self.prefix}:{name}:{key}:{index - 1}")
+
+        replies = await pipe.execute()
+        return [
+            (int(replies[i + 2] or 0), int(replies[i]))
+            for i in range(0, len(replies), 3)
+        ]
+
+
+class _SharedWindow(_Window):
+    """Known shared counters of one key."""
+
+    __slots__ = ("pending",)
+
+    def __init__(self, index: int):
+        super().__init__(index)
+        # Local requests in ``index`` not yet pushed to the store
+        self.pending = 0
+
+
+class DistributedRateLimiter(SlidingWindowRateLimiter):
+    """Sliding-window-counter limiter backed by a shared store.
+
+    Drop-in replacement for SlidingWindowRateLimiter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_requests: int,
+        window_seconds: int,
+        store: RateLimitStore,
+        sync_interval: float = 0.1,
+        retry_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize limiter.
+
+        Args:
+            name: Limiter name; replicas sharing a name share the limit
+            max_requests: Maximum requests allowed per window
+            window_seconds: Time window in seconds
+            store: Shared counter store
+            sync_interval: Seconds between batched store updates
+            retry_interval: Seconds to stay local-only after a store error
+            clock: Time source; wall clock so window indexes agree across hosts
+        """
+        super().__init__(max_requests, window_seconds, clock)
+        self.name = name
+        self.store = store
+        self.sync_interval = sync_interval
+        self.retry_interval = retry_interval
+        # Unsynced deltas of windows that already rolled over
+        self._rolled: list[WindowUpdate] = []
+        # Deltas counted while the store was unavailable, by (key, window)
+        self._backlog: dict[tuple[Hashable, int], int] = {}
+        # Shared windows by key, used in place of the parent's ``_windows``
+        self._shared: OrderedDict[Hashable, _SharedWindow] = OrderedDict()
+        self._degraded_until = 0.0
+        self._sync_task: asyncio.Task | None = None
+
+    def check(self, key: Hashable, cost: int = 1) -> RateLimitDecision:
+        """Count a request for ``key`` if it fits in the shared limit."""
+        self._ensure_sync_task()
+
+        now = self._clock()
+        index = int(now // self.window_seconds)
+        self._evict(index)
+
+        window = self._shared.get(key)
+        if window is None:
+            window = _SharedWindow(index)
+            self._shared[key] = window
+        else:
+            self._shared.move_to_end(key)
+            self._roll_shared(key, window, index)
+
+        elapsed = now / self.window_seconds - index
+        current = window.current + window.pending
+        estimate = window.previous * (1.0 - elapsed) + current
+
+        if estimate + cost > self.max_requests:
+            return RateLimitDecision(
+                False, 0, self._retry_after(window.previous, current, elapsed, cost)
+            )
+
+        window.pending += cost
+        return RateLimitDecision(
+            True, max(0, int(self.max_requests - estimate - cost)), 0.0
+        )
+
+    def _roll_shared(self, key: Hashable, window: _SharedWindow, index: int) -> None:
+        """Advance a key to window ``index``, keeping unsynced deltas."""
+        if window.index == index:
+            return
+        if window.pending:
+            self._rolled.append((key, window.index, window.pending))
+        if window.index == index - 1:
+            window.previous = window.current + window.pending
+        else:
+            window.previous = 0
+        window.current = 0
+        window.pending = 0
+        window.index = index
+
+    def _evict(self, index: int) -> None:
+        """Evict a few idle keys."""
+        _evict_idle(self._shared, index)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get rate limiter statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {**super().get_stats(), "active_users": len(self._shared)}
+
+    def _ensure_sync_task(self) -> None:
+        """Start the background sync once an event loop is running."""
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._sync_task = loop.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        """Push pending deltas periodically."""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Rate limit sync failed: {e}", exc_info=True)
+
+    async def sync(self) -> None:
+        """Push local deltas and refresh shared counts in one store call."""
+        if self._clock() < self._degraded_until:
+            # Local-only: fold deltas into the local view, push them later
+            updates = self._rolled
+            self._rolled = []
+            for key, window in self._shared.items():
+                if window.pending:
+                    updates.append((key, window.index, window.pending))
+                    window.current += window.pending
+                    window.pending = 0
+            self._defer(updates)
+            return
+
+        updates = self._take_backlog() + self._rolled
+        self._rolled = []
+        synced: list[tuple[_SharedWindow, int, int]] = []
+        for key, window in self._shared.items():
+            if window.pending:
+                synced.append((window, window.index, window.pending))
+                updates.append((key, window.index, window.pending))
+                window.pending = 0
+
+        if not updates:
+            return
+
+        try:
+            results = await self.store.sync(self.name, self.window_seconds, updates)
+        except Exception as e:
+            logger.warning(
+                f"Rate limit store unavailable for {self.name}, limiting locally: {e}",
+                extra={"event_type": "rate_limit_store_unavailable"},
+            )
+            self._degraded_until = self._clock() + self.retry_interval
+            self._defer(updates)
+            for window, index, delta in synced:
+                if window.index == index:
+                    window.current += delta
+            return
+
+        # Rolled-over windows come first in ``updates``; only live ones matter
+        for (window, index, _), (previous, current) in zip(
+            synced, results[len(updates) - len(synced) :], strict=True
+        ):
+            if window.index == index:
+                window.previous = previous
+                window.current = current
+            elif window.index == index + 1:
+                # The key moved on to the next window while syncing
+                window.previous = current
+
+    def _defer(self, updates: list[WindowUpdate]) -> None:
+        """Keep deltas the store has not seen for the next successful sync."""
+        for key, index, delta in updates:
+            self._backlog[(key, index)] = self._backlog.get((key, index), 0) + delta
+
+    def _take_backlog(self) -> list[WindowUpdate]:
+        """Take deferred deltas of the current and previous window.
+
+        Older windows no longer affect any estimate and are discarded.
+        """
+        oldest = int(self._clock() // self.window_seconds) - 1
+        updates = [
+            (key, index, delta)
+            for (key, index), delta in self._backlog.items()
+            if index >= oldest
+        ]
+        self._backlog = {}
+        return updates
+
+    async def close(self) -> None:
+        """Stop the sync task after a final sync."""
+        if self._sync_task:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        await self.sync()
+
+
+def create_rate_limit_store() -> RateLimitStore | None:
+    """Create the shared store configured by ``RATE_LIMIT_REDIS_URL``.
+
+    Returns:
+        A Redis store, or None for process-local limiting
+    """
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if not redis_url:
+        return None
+
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed")
+        return None
+
+    return RedisRateLimitStore(redis_asyncio.from_url(redis_url))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+"""Sliding-window-counter rate limiter with constant memory per key.
+
+Each key keeps two counters: requests in the current fixed window and in the
+previous one. The number of requests in the sliding window ending now is
+estimated by weighting the previous window by how much of it still overlaps:
+
+    estimate = previous * (1 - elapsed / window) + current
+
+That is O(1) time and memory per check regardless of the limit, unlike
+keeping a timestamp per request.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+class _Window:
+    """Counters of one key."""
+
+    __slots__ = ("index", "previous", "current")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+_W = TypeVar("_W", bound=_Window)
+
+
+def _evict_idle(
+    windows: OrderedDict[Hashable, _W], index: int, budget: int = 2
+) -> None:
+    """Drop up to ``budget`` least recently used keys idle for two windows."""
+    for _ in range(budget):
+        if not windows:
+            return
+        oldest = next(iter(windows.values()))
+        if oldest.index >= index - 1:
+            return
+        windows.popitem(last=False)
+
+
+class SlidingWindowRateLimiter:
+    """In-memory sliding-window-counter rate limiter.
+
+    Checks never await, so they are atomic with respect to other coroutines
+    on the event loop. Idle keys are evicted incrementally in least recently
+    used order, so there is no periodic full sweep.
+    """
+
+    def __init__(
+        self,
+        max_requests: int = 20,
+        window_seconds: int = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize rate limiter.
+
+        Args:
+            max_requests: Maximum requests allowed per window
+            window_seconds: Time window in seconds
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._windows: OrderedDict[Hashable, _Window] = OrderedDict()
+
+    def check(self, key: Hashable, cost: int = 1) -> RateLimitDecision:
+        """Count a request for ``key`` if it fits in the limit.
+
+        Args:
+            key: Client identifier (user id, IP, ...)
+            cost: Weight of the request
+
+        Returns:
+            Whether the request is allowed, how many remain and, if rejected,
+            seconds until it would be allowed
+        """
+        now = self._clock()
+        index = int(now // self.window_seconds)
+        self._evict(index)
+
+        window = self._windows.get(key)
+        if window is None:
+            window = _Window(index)
+            self._windows[key] = window
+        else:
+            self._windows.move_to_end(key)
+            self._roll(window, index)
+
+        elapsed = now / self.window_seconds - index
+        weight = 1.0 - elapsed
+        estimate = window.previous * weight + window.current
+
+        if estimate + cost > self.max_requests:
+            return RateLimitDecision(
+                False,
+                0,
+                self._retry_after(window.previous, window.current, elapsed, cost),
+            )
+
+        window.current += cost
+        return RateLimitDecision(
+            True, max(0, int(self.max_requests - estimate - cost)), 0.0
+        )
+
+    def is_allowed(self, user_id: Hashable) -> bool:
+        """Check if request is allowed for user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            True if request is allowed, False if rate limit exceeded
+        """
+        decision = self.check(user_id)
+        if not decision.allowed:
+            logger.warning(
+                f"Rate limit exceeded for user {user_id}",
+                extra={
+                    "event_type": "rate_limit_exceeded",
+                    "user_id": user_id,
+                    "limit": self.max_requests,
+                },
+            )
+        return decision.allowed
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get rate limiter statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "active_users": len(self._windows),
+            "max_requests": self.max_requests,
+            "window_seconds": self.window_seconds,
+        }
+
+    @staticmethod
+    def _roll(window: _Window, index: int) -> None:
+        """Advance a key's counters to the window ``index``."""
+        if window.index == index:
+            return
+        window.previous = window.current if window.index == index - 1 else 0
+        window.current = 0
+        window.index = index
+
+    def _retry_after(
+        self, previous: int, current: int, elapsed: float, cost: int
+    ) -> float:
+        """Seconds until a request of ``cost`` would fit."""
+        free = self.max_requests - current - cost
+        remaining_in_window = (1.0 - elapsed) * self.window_seconds
+        if free < 0 or previous == 0:
+            # Not before the current window becomes the previous one
+            return remaining_in_window
+
+        # previous * (1 - t / window) must drop to ``free``
+        target = 1.0 - free / previous
+        return max(0.0, (target - elapsed) * self.window_seconds)
+
+    def _evict(self, index: int) -> None:
+        """Evict a few idle keys."""
+        _evict_idle(self._windows, index)
+
+
+def retry_after_header(decision: RateLimitDecision) -> str:
+    """Format a decision's wait time for the Retry-After header."""
+    return str(max(1, math.ceil(decision.retry_after)))
@@ -10,6 +10,8 @@ import hmac
 import json
 import logging
 import time
+from collections import OrderedDict
+from collections.abc import Callable
 from datetime import UTC, datetime, timedelta
 from typing import Any
 from urllib.parse import parse_qsl, unquote
@@ -30,151 +32,272 @@ class ValidationError(Exception):
     pass
 
 
-def validate_telegram_webapp_init_data(
-    init_data: str, bot_token: str, max_age_seconds: int = 3600
-) -> dict[str, Any]:
-    """Validate Telegram WebApp initData using HMAC-SHA256.
+class TelegramInitDataValidator:
+    """Validates Telegram WebApp initData for one bot.
 
-    This implements the validation algorithm from Telegram documentation:
+    Implements the validation algorithm from Telegram documentation:
     https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
 
-    Args:
-        init_data: The initData string from Telegram WebApp
-        bot_token: The bot token from BotFather
-        max_age_seconds: Maximum age of the data in seconds (default: 1 hour)
+    The secret key derived from the bot token is computed once. The mini-app
+    resends the same initData on every open, so validated results are kept
+    for ``cache_ttl`` seconds, keyed by the data's hash and auth_date. A hit
+    still requires the exact same initData string and a fresh auth_date.
+    """
 
-    Returns:
-        Dictionary containing parsed and validated data
+    def __init__(
+        self,
+        bot_token: str,
+        max_age_seconds: int = 3600,
+        cache_size: int = 10000,
+        cache_ttl: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize validator.
 
-    Raises:
-        ValidationError: If validation fails for any reason
+        Args:
+            bot_token: The bot token from BotFather
+            max_age_seconds: Maximum age of the data in seconds (default: 1 hour)
+            cache_size: Maximum number of cached results; 0 disables caching
+            cache_ttl: Seconds a validated result is reused
+            clock: Wall-clock time source (injectable for tests)
+
+        Raises:
+            ValidationError: If bot_token is empty
+        """
+        if not bot_token:
+            raise ValidationError("bot_token is required")
+
+        self.max_age_seconds = max_age_seconds
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._clock = clock
+        # HMAC-SHA256 of bot token with constant string
+        self._secret_key = hmac.new(
+            key=b"WebAppData", msg=bot_token.encode(), digestmod=hashlib.sha256
+        ).digest()
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[str, dict[str, Any], float]
+        ] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, init_data: str) -> dict[str, Any]:
+        """Validate initData.
 
-    Example:
-        >>> data = validate_telegram_webapp_init_data(init_data, bot_token)
-        >>> user_id = data['user']['id']
-    """
-    if not init_data:
-        logger.warning("Empty initData received", extra={"event_type": "auth_failed"})
-        raise ValidationError("initData is empty")
+        Args:
+            init_data: The initData string from Telegram WebApp
 
-    if not bot_token:
-        raise ValidationError("bot_token is required")
+        Returns:
+            Dictionary containing parsed and validated data
 
-    # Parse the init data
-    try:
-        data_dict = dict(parse_qsl(init_data, keep_blank_values=True))
-    except Exception as exc:
-        logger.warning(
-            "Failed to parse initData",
-            exc_info=True,
-            extra={"event_type": "auth_failed"},
-        )
-        raise ValidationError(f"Failed to parse initData: {exc}") from exc
+        Raises:
+            ValidationError: If validation fails for any reason
+        """
+        if not init_data:
+            logger.warning(
+                "Empty initData received", extra={"event_type": "auth_failed"}
+            )
+            raise ValidationError("initData is empty")
+
+        if not self.cache_size:
+            return self._verify(init_data)
+
+        key = self._cache_key(init_data)
+        entry = self._entries.get(key) if key else None
+        if key and entry is not None:
+            cached_init_data, validated_data, expires_at = entry
+            if cached_init_data == init_data and self._clock() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(validated_data)
+            del self._entries[key]
+
+        self.misses += 1
+        validated_data = self._verify(init_data)
+
+        if key:
+            expires_at = min(
+                self._clock() + self.cache_ttl,
+                int(key[1]) + self.max_age_seconds,
+            )
+            self._entries[key] = (init_data, validated_data, expires_at)
+            if len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+        return dict(validated_data)
 
-    # Extract hash from the data
-    received_hash = data_dict.pop("hash", None)
-    if not received_hash:
-        logger.warning("Missing hash in initData", extra={"event_type": "auth_failed"})
-        raise ValidationError("Missing hash in initData")
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache statistics.
 
-    # Check auth_date
-    auth_date_str = data_dict.get("auth_date")
-    if not auth_date_str:
-        logger.warning(
-            "Missing auth_date in initData", extra={"event_type": "auth_failed"}
-        )
-        raise ValidationError("Missing auth_date in initData")
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
 
-    try:
-        auth_date = int(auth_date_str)
-    except ValueError as exc:
-        logger.warning(
-            "Invalid auth_date format",
-            extra={"event_type": "auth_failed", "auth_date": auth_date_str},
-        )
-        raise ValidationError("Invalid auth_date format") from exc
+    @staticmethod
+    def _cache_key(init_data: str) -> tuple[str, str] | None:
+        """(hash, auth_date) of raw initData, without decoding it."""
+        received_hash = auth_date = None
+        for pair in init_data.split("&"):
+            if pair.startswith("hash="):
+                received_hash = pair[5:]
+            elif pair.startswith("auth_date="):
+                auth_date = pair[10:]
+        if not received_hash or not auth_date or not auth_date.isdigit():
+            return None
+        return received_hash, auth_date
+
+    def _verify(self, init_data: str) -> dict[str, Any]:
+        """Parse initData and check its age and signature."""
+        # Parse the init data
+        try:
+            data_dict = dict(parse_qsl(init_data, keep_blank_values=True))
+        except Exception as exc:
+            logger.warning(
+                "Failed to parse initData",
+                exc_info=True,
+                extra={"event_type": "auth_failed"},
+            )
+            raise ValidationError(f"Failed to parse initData: {exc}") from exc
 
-    # Check if data is not too old (TTL check)
-    current_time = int(time.time())
-    data_age = current_time - auth_date
+        # Extract hash from the data
+        received_hash = data_dict.pop("hash", None)
+        if not received_hash:
+            logger.warning(
+                "Missing hash in initData", extra={"event_type": "auth_failed"}
+            )
+            raise ValidationError("Missing hash in initData")
 
-    if data_age > max_age_seconds:
-        logger.warning(
-            "initData is too old",
-            extra={
-                "event_type": "auth_failed",
-                "data_age_seconds": data_age,
-                "max_age_seconds": max_age_seconds,
-            },
-        )
-        raise ValidationError(
-            f"initData is too old (age: {data_age}s, max: {max_age_seconds}s)"
-        )
+        # Check auth_date
+        auth_date_str = data_dict.get("auth_date")
+        if not auth_date_str:
+            logger.warning(
+                "Missing auth_date in initData", extra={"event_type": "auth_failed"}
+            )
+            raise ValidationError("Missing auth_date in initData")
 
-    if data_age < 0:
-        logger.warning(
-            "auth_date is in the future",
-            extra={"event_type": "auth_failed", "data_age_seconds": data_age},
-        )
-        raise ValidationError("auth_date is in the future")
+        try:
+            auth_date = int(auth_date_str)
+        except ValueError as exc:
+            logger.warning(
+                "Invalid auth_date format",
+                extra={"event_type": "auth_failed", "auth_date": auth_date_str},
+            )
+            raise ValidationError("Invalid auth_date format") from exc
 
-    # Prepare data check string
-    # Sort keys and create data_check_string
-    data_check_pairs = [f"{k}={v}" for k, v in sorted(data_dict.items())]
-    data_check_string = "\n".join(data_check_pairs)
+        # Check if data is not too old (TTL check)
+        current_time = int(self._clock())
+        data_age = current_time - auth_date
 
-    # Calculate secret key: HMAC-SHA256 of bot token with constant string
-    secret_key = hmac.new(
-        key=b"WebAppData", msg=bot_token.encode(), digestmod=hashlib.sha256
-    ).digest()
+        if data_age > self.max_age_seconds:
+            logger.warning(
+                "initData is too old",
+                extra={
+                    "event_type": "auth_failed",
+                    "data_age_seconds": data_age,
+                    "max_age_seconds": self.max_age_seconds,
+                },
+            )
+            raise ValidationError(
+                f"initData is too old (age: {data_age}s, max: {self.max_age_seconds}s)"
+            )
 
-    # Calculate hash: HMAC-SHA256 of data_check_string with secret_key
-    calculated_hash = hmac.new(
-        key=secret_key, msg=data_check_string.encode(), digestmod=hashlib.sha256
-    ).hexdigest()
+        if data_age < 0:
+            logger.warning(
+                "auth_date is in the future",
+                extra={"event_type": "auth_failed", "data_age_seconds": data_age},
+            )
+            raise ValidationError("auth_date is in the future")
 
-    # Timing-safe comparison to prevent timing attacks
-    if not hmac.compare_digest(calculated_hash, received_hash):
-        logger.warning(
-            "HMAC validation failed",
-            extra={"event_type": "auth_failed", "reason": "hash_mismatch"},
-        )
-        raise ValidationError("HMAC validation failed")
+        # Data check string: sorted key=value lines
+        data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data_dict.items()))
 
-    # Parse user data if present
-    validated_data = data_dict.copy()
+        # Calculate hash: HMAC-SHA256 of data_check_string with secret_key
+        calculated_hash = hmac.new(
+            key=self._secret_key,
+            msg=data_check_string.encode(),
+            digestmod=hashlib.sha256,
+        ).hexdigest()
 
-    if "user" in validated_data:
-        try:
-            validated_data["user"] = json.loads(unquote(validated_data["user"]))
-        except (json.JSONDecodeError, ValueError):
+        # Timing-safe comparison to prevent timing attacks
+        if not hmac.compare_digest(calculated_hash, received_hash):
             logger.warning(
-                "Failed to parse user data",
-                exc_info=True,
-                extra={"event_type": "auth_warning"},
+                "HMAC validation failed",
+                extra={"event_type": "auth_failed", "reason": "hash_mismatch"},
             )
-            # Don't fail validation, just keep the raw string
+            raise ValidationError("HMAC validation failed")
 
-    # Parse other JSON fields if present
-    for field in ["receiver", "chat", "chat_type", "chat_instance"]:
-        if field in validated_data:
+        # Parse user data if present
+        validated_data = data_dict.copy()
+
+        if "user" in validated_data:
             try:
-                value = unquote(validated_data[field])
-                validated_data[field] = json.loads(value)
+                validated_data["user"] = json.loads(unquote(validated_data["user"]))
             except (json.JSONDecodeError, ValueError):
-                # Keep raw value if parsing fails
-                pass
+                logger.warning(
+                    "Failed to parse user data",
+                    exc_info=True,
+                    extra={"event_type": "auth_warning"},
+                )
+                # Don't fail validation, just keep the raw string
+
+        # Parse other JSON fields if present
+        for field in ["receiver", "chat", "chat_type", "chat_instance"]:
+            if field in validated_data:
+                try:
+                    value = unquote(validated_data[field])
+                    validated_data[field] = json.loads(value)
+                except (json.JSONDecodeError, ValueError):
+                    # Keep raw value if parsing fails
+                    pass
 
-    logger.info(
-        "initData validated successfully",
-        extra={
-            "event_type": "auth_success",
-            "user_id": None,
-            "data_age_seconds": data_age,
-        },
-    )
+        logger.info(
+            "initData validated successfully",
+            extra={
+                "event_type": "auth_success",
+                "user_id": None,
+                "data_age_seconds": data_age,
+            },
+        )
+
+        return validated_data
+
+
+def validate_telegram_webapp_init_data(
+    init_data: str, bot_token: str, max_age_seconds: int = 3600
+) -> dict[str, Any]:
+    """Validate Telegram WebApp initData using HMAC-SHA256.
+
+    One-off validation without caching; services validating many requests
+    for the same bot should keep a TelegramInitDataValidator instead.
+
+    Args:
+        init_data: The initData string from Telegram WebApp
+        bot_token: The bot token from BotFather
+        max_age_seconds: Maximum age of the data in seconds (default: 1 hour)
+
+    Returns:
+        Dictionary containing parsed and validated data
 
-    return validated_data
+    Raises:
+        ValidationError: If validation fails for any reason
+
+    Example:
+        >>> data = validate_telegram_webapp_init_data(init_data, bot_token)
+        >>> user_id = data['user']['id']
+    """
+    if not init_data:
+        logger.warning("Empty initData received", extra={"event_type": "auth_failed"})
+        raise ValidationError("initData is empty")
+
+    validator = TelegramInitDataValidator(
+        bot_token, max_age_seconds=max_age_seconds, cache_size=0
+    )
+    return validator.validate(init_data)
 
 
 def generate_jwt_token(
@@ -309,7 +432,7 @@ def validate_jwt_token(
             )
             raise ValidationError(f"Invalid token type: expected {expected_type}")
 
-        logger.info(
+        logger.debug(
             "JWT token validated",
             extra={
                 "event_type": "jwt_validated",
@@ -336,6 +459,77 @@ def validate_jwt_token(
         raise ValidationError(f"Invalid token: {exc}") from exc
 
 
+class VerifiedTokenCache:
+    """LRU of JWTs that already passed validation.
+
+    Entries are keyed by a keyed BLAKE2 digest of the token, so the cache
+    holds no usable tokens and a token verified under one secret or type is
+    never returned for another. Each entry expires with the token's own
+    ``exp`` claim; the least recently used entry is evicted when full.
+    """
+
+    def __init__(self, max_size: int = 10000, clock: Callable[[], float] = time.time):
+        """Initialize cache.
+
+        Args:
+            max_size: Maximum number of cached tokens
+            clock: Wall-clock time source (injectable for tests)
+        """
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: OrderedDict[bytes, tuple[dict[str, Any], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def validate(
+        self, token: str, secret_key: str, expected_type: str = "access"
+    ) -> dict[str, Any]:
+        """Validate a token, verifying it only if not cached.
+
+        Same contract as validate_jwt_token.
+        """
+        key = hashlib.blake2b(
+            token.encode(),
+            key=hashlib.blake2b(secret_key.encode()).digest(),
+            person=expected_type.encode()[:16],
+            digest_size=32,
+        ).digest()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, expires_at = entry
+            if self._clock() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(payload)
+            del self._entries[key]
+
+        self.misses += 1
+        payload = validate_jwt_token(token, secret_key, expected_type)
+
+        self._entries[key] = (payload, float(payload["exp"]))
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return dict(payload)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Shared by the JWT middlewares of a service
+verified_token_cache = VerifiedTokenCache()
+
+
 class RateLimiter:
     """Simple in-memory rate limiter with TTL-based cleanup.
 
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+"""Framing for multiplexing many client WebSockets over one upstream socket.
+
+Every mux frame is a binary WebSocket frame with a 5-byte header followed by
+the payload:
+
+    channel_id (uint32, network order) | opcode (uint8) | payload
+
+Opcodes:
+    OPEN   gateway -> service: JSON {"token", "conversation_id", "protocols"}
+           service -> gateway: JSON {"protocol"} once the channel is accepted
+    TEXT   payload of a client text frame (UTF-8)
+    BINARY payload of a client binary frame
+    CLOSE  either side closes a channel; optional JSON {"code", "reason"}
+"""
+
+import json
+import struct
+from typing import Any
+
+MUX_HEADER = struct.Struct("!IB")
+
+OP_OPEN = 1
+OP_TEXT = 2
+OP_BINARY = 3
+OP_CLOSE = 4
+
+# Largest channel id before ids wrap around
+MAX_CHANNEL_ID = 0xFFFFFFFF
+
+
+def pack_frame(channel_id: int, opcode: int, payload: bytes = b"") -> bytes:
+    """Build a mux frame.
+
+    Args:
+        channel_id: Virtual channel the frame belongs to
+        opcode: One of the OP_* constants
+        payload: Raw frame payload
+
+    Returns:
+        Bytes to send as one binary WebSocket frame
+    """
+    return MUX_HEADER.pack(channel_id, opcode) + payload
+
+
+def unpack_frame(frame: bytes) -> tuple[int, int, bytes]:
+    """Split a mux frame into channel id, opcode and payload.
+
+    Raises:
+        ValueError: If the frame is shorter than the header
+    """
+    if len(frame) < MUX_HEADER.size:
+        raise ValueError("Mux frame too short")
+
+    channel_id, opcode = MUX_HEADER.unpack_from(frame)
+    return channel_id, opcode, frame[MUX_HEADER.size :]
+
+
+def pack_control(channel_id: int, opcode: int, data: dict[str, Any]) -> bytes:
+    """Build an OPEN/CLOSE frame with a JSON payload."""
+    return pack_frame(channel_id, opcode, json.dumps(data).encode())
+
+
+def unpack_control(payload: bytes) -> dict[str, Any]:
+    """Decode the JSON payload of an OPEN/CLOSE frame."""
+    return json.loads(payload) if payload else {}
@@ -7,21 +7,39 @@ This service routes requests to appropriate microservices with WebSocket support
 
 import logging
 import os
+from typing import Any
 
-from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp import ClientSession, TCPConnector, web
 from aiohttp_cors import ResourceOptions
 from aiohttp_cors import setup as cors_setup
 
 from core.middleware.correlation import correlation_middleware
+from core.middleware.internal_identity import (
+    INTERNAL_IDENTITY_HEADER,
+    get_identity_signer,
+)
 from core.middleware.metrics_middleware import add_metrics_route, metrics_middleware
+from core.middleware.profiling import upstream_trace_config
 from core.middleware.request_logging import (
     request_logging_middleware,
     user_context_middleware,
 )
 from core.middleware.versioning import versioning_middleware
+from core.resilience.deadline import (
+    client_timeout,
+    deadline_headers,
+    setup_deadlines,
+)
 from core.utils.logging import configure_logging
-
-from .websocket_proxy import is_websocket_request, proxy_websocket
+from core.utils.security import ValidationError, verified_token_cache
+
+from .upstreams import UpstreamSelector
+from .websocket_proxy import (
+    MuxPool,
+    is_websocket_request,
+    proxy_websocket,
+    proxy_websocket_mux,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,55 +47,88 @@ logger = logging.getLogger(__name__)
 async def proxy_request(
     request: web.Request, target_url: str, path_override: str = None
 ) -> web.Response:
-    """Proxy request to target microservice."""
-    timeout = ClientTimeout(total=30, connect=10)
+    """Proxy request to target microservice.
+
+    Uses the app's shared session so upstream calls reuse pooled
+    connections and are timed by the profiling trace config.
+    """
+    # Bounded by the request budget set in deadline_middleware
+    timeout = client_timeout(30, connect=10)
 
     try:
-        async with ClientSession(timeout=timeout) as session:
-            # Build target URL - strip /v1/{service}/ prefix
-            if path_override:
-                path = path_override
+        session = request.app["http_session"]
+
+        # Build target URL - strip /v1/{service}/ prefix
+        if path_override:
+            path = path_override
+        else:
+            # Extract path after /v1/{service}/
+            path_parts = request.path.split("/")
+            if len(path_parts) >= 4 and path_parts[1] == "v1":
+                # Remove /v1/{service} prefix
+                path = "/" + "/".join(path_parts[3:])
             else:
-                # Extract path after /v1/{service}/
-                path_parts = request.path.split("/")
-                if len(path_parts) >= 4 and path_parts[1] == "v1":
-                    # Remove /v1/{service} prefix
-                    path = "/" + "/".join(path_parts[3:])
-                else:
-                    path = request.path
-
-            query_string = request.query_string
-            full_url = f"{target_url}{path}"
-            if query_string:
-                full_url = f"{full_url}?{query_string}"
-
-            # Prepare headers
-            headers = {
-                k: v
-                for k, v in request.headers.items()
-                if k.lower() not in ["host", "connection"]
-            }
-
-            # Make request
-            async with session.request(
-                method=request.method,
-                url=full_url,
-                headers=headers,
-                data=await request.read() if request.can_read_body else None,
-            ) as response:
-                # Read response body
-                body = await response.read()
-
-                # Create response
-                return web.Response(
-                    body=body, status=response.status, headers=dict(response.headers)
-                )
+                path = request.path
+
+        query_string = request.query_string
+        full_url = f"{target_url}{path}"
+        if query_string:
+            full_url = f"{full_url}?{query_string}"
+
+        # Prepare headers; identity assertions are only ever set here
+        headers = {
+            k: v
+            for k, v in request.headers.items()
+            if k.lower() not in ["host", "connection", "x-internal-identity"]
+        }
+        headers.update(_verified_identity_headers(request))
+        headers.update(deadline_headers())
+
+        # Make request
+        async with session.request(
+            method=request.method,
+            url=full_url,
+            headers=headers,
+            data=await request.read() if request.can_read_body else None,
+            timeout=timeout,
+        ) as response:
+            # Read response body
+            body = await response.read()
+
+            # Create response
+            return web.Response(
+                body=body, status=response.status, headers=dict(response.headers)
+            )
 
     except Exception as e:
         logger.error(f"Proxy error: {e}")
         return web.json_response({"error": "Service unavailable"}, status=503)
 
 
+def _verified_identity_headers(request: web.Request) -> dict[str, str]:
+    """Verify the caller's access token once and assert it to upstreams.
+
+    Invalid or missing tokens are passed through untouched; the upstream
+    service rejects them as before.
+    """
+    auth_header = request.headers.get("Authorization", "")
+    jwt_secret = request.app["config"].get("jwt_secret")
+    signer = get_identity_signer()
+    if not auth_header.startswith("Bearer ") or not jwt_secret or signer is None:
+        return {}
+
+    try:
+        payload = verified_token_cache.validate(auth_header.split(" ")[1], jwt_secret)
+    except ValidationError:
+        return {}
+
+    return {
+        INTERNAL_IDENTITY_HEADER: signer.sign(
+            payload["user_id"], payload["token_type"], payload["exp"]
+        )
+    }
+
+
 # ==================== ROUTING FUNCTIONS ====================
 
 
@@ -111,6 +162,14 @@ async def route_chat(request: web.Request) -> web.Response:
 
     # Check if this is a WebSocket request
     if is_websocket_request(request):
+        # Sticky per conversation so its participants share an instance
+        target_url = request.app["chat_upstreams"].select(
+            request.query.get("conversation_id")
+        )
+        if request.app["config"].get("chat_ws_mode") == "mux":
+            return await proxy_websocket_mux(
+                request, request.app["chat_mux_pool"], target_url, "/chat/ws/mux"
+            )
         return await proxy_websocket(request, target_url)
 
     # Regular HTTP request
@@ -147,8 +206,16 @@ def create_app(config: dict) -> web.Application:
     app = web.Application()
     app["config"] = config
 
-    # HTTP session will be created on startup
+    # HTTP and WebSocket upstream sessions will be created on startup
     app["http_session"] = None
+    app["ws_session"] = None
+
+    # Chat WebSocket upstream selection and optional multiplexing
+    app["chat_upstreams"] = UpstreamSelector(
+        config.get("chat_service_urls") or [config["chat_service_url"]],
+        config.get("chat_ws_balance_policy", "rendezvous"),
+    )
+    app["chat_mux_pool"] = MuxPool(app, config.get("chat_ws_mux_connections", 2))
 
     # Add middleware
     app.middlewares.append(request_logging_middleware)
@@ -157,6 +224,9 @@ def create_app(config: dict) -> web.Application:
     app.middlewares.append(versioning_middleware)
     app.middlewares.append(correlation_middleware)
 
+    # Every request gets a time budget, passed on to the services
+    setup_deadlines(app, config.get("request_budget_ms", 30000) / 1000)
+
     # Setup CORS
     # Configure CORS with multiple origins
     allowed_origins = [
@@ -219,21 +289,35 @@ def create_app(config: dict) -> web.Application:
 
 
 async def startup_session(app: web.Application):
-    """Create HTTP session on app startup."""
-    app["http_session"] = ClientSession()
+    """Create the upstream sessions on app startup.
+
+    Proxied WebSockets hold their connection for the whole socket lifetime,
+    so they get a pool of their own and cannot starve HTTP proxying.
+    """
+    config = app["config"]
+    app["http_session"] = ClientSession(
+        connector=TCPConnector(limit=config.get("upstream_http_connections", 200)),
+        trace_configs=[upstream_trace_config()],
+    )
+    app["ws_session"] = ClientSession(
+        connector=TCPConnector(limit=config.get("upstream_ws_connections", 0))
+    )
 
 
 async def cleanup_session(app: web.Application):
-    """Cleanup HTTP session on app shutdown."""
-    if "http_session" in app and app["http_session"]:
-        await app["http_session"].close()
+    """Cleanup upstream sessions on app shutdown."""
+    if app.get("chat_mux_pool"):
+        await app["chat_mux_pool"].close()
+    for key in ("http_session", "ws_session"):
+        if app.get(key):
+            await app[key].close()
 
 
 if __name__ == "__main__":
     # Configure structured logging
     configure_logging("api-gateway", os.getenv("LOG_LEVEL", "INFO"))
 
-    config = {
+    config: dict[str, Any] = {
         "auth_service_url": os.getenv("AUTH_SERVICE_URL", "http://auth-service:8081"),
         "profile_service_url": os.getenv(
             "PROFILE_SERVICE_URL", "http://profile-service:8082"
@@ -245,12 +329,29 @@ if __name__ == "__main__":
             "MEDIA_SERVICE_URL", "http://media-service:8084"
         ),
         "chat_service_url": os.getenv("CHAT_SERVICE_URL", "http://chat-service:8085"),
+        "chat_service_urls": [
+            url.strip()
+            for url in os.getenv("CHAT_SERVICE_URLS", "").split(",")
+            if url.strip()
+        ],
+        "chat_ws_balance_policy": os.getenv("CHAT_WS_BALANCE_POLICY", "rendezvous"),
+        "chat_ws_mode": os.getenv("CHAT_WS_MODE", "direct"),
+        "chat_ws_mux_connections": int(os.getenv("CHAT_WS_MUX_CONNECTIONS", "2")),
         "admin_service_url": os.getenv(
             "ADMIN_SERVICE_URL", "http://admin-service:8086"
         ),
         "notification_service_url": os.getenv(
             "NOTIFICATION_SERVICE_URL", "http://notification-service:8087"
         ),
+        "jwt_secret": os.getenv("JWT_SECRET"),
+        "request_budget_ms": int(os.getenv("REQUEST_BUDGET_MS", "30000")),
+        # Connection pool sizes towards the services (0 means unlimited)
+        "upstream_http_connections": int(
+            os.getenv("GATEWAY_UPSTREAM_HTTP_CONNECTIONS", "200")
+        ),
+        "upstream_ws_connections": int(
+            os.getenv("GATEWAY_UPSTREAM_WS_CONNECTIONS", "0")
+        ),
     }
 
     logger.info(
@@ -0,0 +1,61 @@
+"""Upstream selection for services with several instances."""
+
+import hashlib
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+POLICY_ROUND_ROBIN = "round_robin"
+POLICY_RENDEZVOUS = "rendezvous"
+
+SUPPORTED_POLICIES = (POLICY_ROUND_ROBIN, POLICY_RENDEZVOUS)
+
+
+class UpstreamSelector:
+    """Pick an upstream URL for a request.
+
+    ``rendezvous`` hashes a routing key (e.g. the conversation id) with every
+    upstream and takes the highest score, so all sockets of one conversation
+    land on the same instance and only keys of a removed instance move.
+    Requests without a key fall back to round-robin.
+    """
+
+    def __init__(self, urls: list[str], policy: str = POLICY_RENDEZVOUS):
+        """Initialize selector.
+
+        Args:
+            urls: Upstream base URLs
+            policy: Selection policy, one of SUPPORTED_POLICIES
+        """
+        if not urls:
+            raise ValueError("At least one upstream URL is required")
+        if policy not in SUPPORTED_POLICIES:
+            raise ValueError(f"Unknown upstream policy: {policy}")
+
+        self.urls = list(urls)
+        self.policy = policy
+        self._round_robin = itertools.cycle(self.urls)
+
+    def select(self, key: str | None = None) -> str:
+        """Select an upstream.
+
+        Args:
+            key: Routing key for sticky policies
+
+        Returns:
+            Upstream base URL
+        """
+        if len(self.urls) == 1:
+            return self.urls[0]
+
+        if self.policy == POLICY_RENDEZVOUS and key:
+            return max(self.urls, key=lambda url: self._score(url, key))
+
+        return next(self._round_robin)
+
+    @staticmethod
+    def _score(url: str, key: str) -> int:
+        """Rendezvous weight of an upstream for a key."""
+        digest = hashlib.blake2b(f"{url}|{key}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
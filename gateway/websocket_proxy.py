@@ -3,10 +3,55 @@
 import asyncio
 import logging
 
-from aiohttp import WSMsgType, web
+from aiohttp import ClientWebSocketResponse, WSMsgType, web
+
+from core.middleware.internal_identity import gateway_identity_headers
+from core.utils.ws_mux import (
+    MAX_CHANNEL_ID,
+    OP_BINARY,
+    OP_CLOSE,
+    OP_OPEN,
+    OP_TEXT,
+    pack_control,
+    pack_frame,
+    unpack_control,
+    unpack_frame,
+)
 
 logger = logging.getLogger(__name__)
 
+# Client headers passed on to the upstream; everything else (cookies, hop-by-hop
+# and handshake headers) stays at the gateway
+FORWARDED_WEBSOCKET_HEADERS = frozenset(
+    {
+        "authorization",
+        "accept-language",
+        "origin",
+        "user-agent",
+        "x-correlation-id",
+        "x-request-id",
+        "x-forwarded-for",
+        "x-real-ip",
+        "traceparent",
+        "tracestate",
+    }
+)
+
+
+def get_forwarded_headers(request: web.Request) -> dict[str, str]:
+    """Get the allowlisted client headers to send upstream."""
+    return {
+        name: value
+        for name, value in request.headers.items()
+        if name.lower() in FORWARDED_WEBSOCKET_HEADERS
+    }
+
+
+def get_requested_subprotocols(request: web.Request) -> tuple[str, ...]:
+    """Get subprotocols offered by the client, in preference order."""
+    header = request.headers.get("Sec-WebSocket-Protocol", "")
+    return tuple(proto.strip() for proto in header.split(",") if proto.strip())
+
 
 async def proxy_websocket(
     request: web.Request, target_url: str, path_override: str | None = None
@@ -31,12 +76,21 @@ async def proxy_websocket(
 
         logger.info(f"Proxying WebSocket: {request.url} -> {target_ws_url}")
 
-        # Create WebSocket connection to target service
-        async with request.app["http_session"].ws_connect(
-            target_ws_url, headers=dict(request.headers), timeout=30
+        # Create WebSocket connection to target service, offering the client's
+        # subprotocols so the upstream picks the encoding. The internal hop is
+        # left uncompressed; frames are relayed as-is without decoding.
+        async with request.app["ws_session"].ws_connect(
+            target_ws_url,
+            headers=get_forwarded_headers(request),
+            protocols=get_requested_subprotocols(request),
+            timeout=30,
         ) as target_ws:
-            # Create WebSocket response for client
-            ws = web.WebSocketResponse()
+            # Accept the client with the subprotocol the upstream selected;
+            # permessage-deflate is negotiated with the client on this hop
+            ws = web.WebSocketResponse(
+                protocols=(target_ws.protocol,) if target_ws.protocol else (),
+                compress=True,
+            )
             await ws.prepare(request)
 
             # Start bidirectional proxy
@@ -74,10 +128,13 @@ async def proxy_websocket(
                 finally:
                     await ws.close()
 
-            # Run both proxy directions concurrently
-            await asyncio.gather(
-                proxy_to_target(), proxy_to_client(), return_exceptions=True
-            )
+            # Run the client->target direction in a task and the other one in
+            # the handler itself, so each socket costs one extra coroutine
+            to_target = asyncio.create_task(proxy_to_target())
+            try:
+                await proxy_to_client()
+            finally:
+                await asyncio.gather(to_target, return_exceptions=True)
 
             return ws  # type: ignore[return-value]
 
@@ -92,3 +149,339 @@ def is_websocket_request(request: web.Request) -> bool:
         request.headers.get("Upgrade", "").lower() == "websocket"
         and request.headers.get("Connection", "").lower() == "upgrade"
     )
+
+
+class _ClientChannel:
+    """Client socket of a mux channel and the frames waiting for it."""
+
+    def __init__(self, ws: web.WebSocketResponse, max_pending: int):
+        self.ws = ws
+        self.pending: asyncio.Queue = asyncio.Queue(max_pending)
+        self.sender: asyncio.Task | None = None
+
+
+class MuxUpstream:
+    """One upstream WebSocket carrying many client channels.
+
+    A single reader task demultiplexes upstream frames by channel id into a
+    per-channel queue; each channel's sender task writes them to its client,
+    so a slow client only delays its own channel. Client frames are written
+    upstream directly by the handler serving that client.
+    """
+
+    def __init__(
+        self,
+        session,
+        url: str,
+        send_timeout: float = 5.0,
+        max_pending: int = 256,
+    ):
+        """Initialize upstream connection.
+
+        Args:
+            session: aiohttp ClientSession used for ws_connect
+            url: Upstream mux WebSocket URL
+            send_timeout: Seconds a slow client may block delivery before
+                its channel is closed
+            max_pending: Frames buffered per channel before a client that
+                cannot keep up is closed
+        """
+        self.session = session
+        self.url = url
+        self.send_timeout = send_timeout
+        self.max_pending = max_pending
+        self.ws: ClientWebSocketResponse | None = None
+        self.channels: dict[int, _ClientChannel] = {}
+        self._pending_opens: dict[int, asyncio.Future] = {}
+        self._next_channel_id = 0
+        self._reader: asyncio.Task | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the upstream socket is usable."""
+        return self.ws is not None and not self.ws.closed
+
+    async def connect(self):
+        """Open the upstream socket and start the reader task.
+
+        The chat service only accepts mux sockets opened by the gateway, so
+        the upgrade carries a gateway identity assertion.
+        """
+        self.ws = await self.session.ws_connect(
+            self.url, timeout=30, headers=gateway_identity_headers()
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"Mux upstream connected: {self.url}")
+
+    def _allocate_channel_id(self) -> int:
+        """Get an unused channel id."""
+        while True:
+            self._next_channel_id = (self._next_channel_id % MAX_CHANNEL_ID) + 1
+            if (
+                self._next_channel_id not in self.channels
+                and self._next_channel_id not in self._pending_opens
+            ):
+                return self._next_channel_id
+
+    async def open_channel(
+        self, open_data: dict, timeout: float = 10.0
+    ) -> tuple[int, dict]:
+        """Open a channel and wait for the upstream to accept or refuse it.
+
+        Returns:
+            Tuple of channel id and the upstream's OPEN/CLOSE reply with an
+            added "accepted" flag
+        """
+        channel_id = self._allocate_channel_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending_opens[channel_id] = future
+        try:
+            await self._socket().send_bytes(
+                pack_control(channel_id, OP_OPEN, open_data)
+            )
+            reply = await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            # The upstream may still accept the channel after we gave up
+            await self._send_close(channel_id)
+            raise
+        finally:
+            self._pending_opens.pop(channel_id, None)
+        return channel_id, reply
+
+    def attach(self, channel_id: int, client_ws: web.WebSocketResponse):
+        """Route upstream frames of a channel to a client socket."""
+        channel = _ClientChannel(client_ws, self.max_pending)
+        channel.sender = asyncio.create_task(self._deliver(channel_id, channel))
+        self.channels[channel_id] = channel
+
+    async def send(self, channel_id: int, opcode: int, payload: bytes = b""):
+        """Send a frame for a channel upstream."""
+        await self._socket().send_bytes(pack_frame(channel_id, opcode, payload))
+
+    def _socket(self) -> ClientWebSocketResponse:
+        """The upstream socket; raises ConnectionError if not connected."""
+        if self.ws is None:
+            raise ConnectionError(f"Mux upstream {self.url} is not connected")
+        return self.ws
+
+    async def _send_close(self, channel_id: int):
+        """Tell the upstream a channel is gone."""
+        if not self.is_open:
+            return
+        try:
+            await self.send(channel_id, OP_CLOSE)
+        except Exception as e:
+            logger.debug(f"Failed to send mux close for {channel_id}: {e}")
+
+    async def close_channel(self, channel_id: int):
+        """Detach a channel and tell the upstream it is gone.
+
+        The close is sent even for channels that were never attached, so an
+        upstream channel opened for a client that failed its handshake does
+        not leak.
+        """
+        channel = self.channels.pop(channel_id, None)
+        if (
+            channel is not None
+            and channel.sender is not None
+            and channel.sender is not asyncio.current_task()
+        ):
+            channel.sender.cancel()
+        await self._send_close(channel_id)
+
+    async def _drop(self, channel_id: int, channel: _ClientChannel, reason: str):
+        """Close a client that cannot keep up and its upstream channel."""
+        logger.warning(f"Dropping mux channel {channel_id}: {reason}")
+        if self.channels.get(channel_id) is channel:
+            del self.channels[channel_id]
+        asyncio.create_task(channel.ws.close())
+        await self._send_close(channel_id)
+
+    async def _deliver(self, channel_id: int, channel: _ClientChannel):
+        """Write a channel's upstream frames to its client in order."""
+        try:
+            while True:
+                opcode, payload = await channel.pending.get()
+                if opcode == OP_TEXT:
+                    await asyncio.wait_for(
+                        channel.ws.send_str(payload.decode()), self.send_timeout
+                    )
+                elif opcode == OP_BINARY:
+                    await asyncio.wait_for(
+                        channel.ws.send_bytes(payload), self.send_timeout
+                    )
+                elif opcode == OP_CLOSE:
+                    await channel.ws.close()
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._drop(channel_id, channel, str(e) or type(e).__name__)
+
+    async def _read_loop(self):
+        """Demultiplex upstream frames into per-channel queues."""
+        try:
+            async for msg in self.ws:
+                if msg.type != WSMsgType.BINARY:
+                    continue
+
+                try:
+                    channel_id, opcode, payload = unpack_frame(msg.data)
+                    if channel_id in self._pending_opens:
+                        reply = unpack_control(payload)
+                except ValueError as e:
+                    # A corrupt frame only costs that frame
+                    logger.warning(f"Dropping malformed mux frame: {e}")
+                    continue
+
+                if channel_id in self._pending_opens:
+                    future = self._pending_opens[channel_id]
+                    if not future.done():
+                        reply["accepted"] = opcode == OP_OPEN
+                        future.set_result(reply)
+                    continue
+
+                channel = self.channels.get(channel_id)
+                if channel is None:
+                    continue
+
+                if opcode == OP_CLOSE:
+                    self.channels.pop(channel_id, None)
+
+                try:
+                    channel.pending.put_nowait((opcode, payload))
+                except asyncio.QueueFull:
+                    channel.sender.cancel()
+                    asyncio.create_task(
+                        self._drop(channel_id, channel, "client too slow")
+                    )
+        except Exception as e:
+            logger.error(f"Mux upstream read error: {e}")
+        finally:
+            logger.warning(f"Mux upstream closed: {self.url}")
+            for future in self._pending_opens.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Mux upstream closed"))
+            channels, self.channels = self.channels, {}
+            for channel in channels.values():
+                channel.sender.cancel()
+                # 1012: service restart, clients should reconnect
+                asyncio.create_task(channel.ws.close(code=1012))
+
+    async def close(self):
+        """Close the upstream socket."""
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+class MuxPool:
+    """A few multiplexed upstream sockets per chat instance."""
+
+    def __init__(self, app: web.Application, connections_per_upstream: int = 2):
+        """Initialize pool.
+
+        Args:
+            app: Gateway application (provides the shared ws_session)
+            connections_per_upstream: Upstream sockets kept per instance
+        """
+        self.app = app
+        self.connections_per_upstream = connections_per_upstream
+        self._upstreams: dict[str, list[MuxUpstream]] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, mux_url: str) -> MuxUpstream:
+        """Get the least loaded open upstream socket for an instance."""
+        async with self._lock:
+            upstreams = [
+                upstream
+                for upstream in self._upstreams.get(mux_url, [])
+                if upstream.is_open
+            ]
+
+            if len(upstreams) < self.connections_per_upstream:
+                upstream = MuxUpstream(self.app["ws_session"], mux_url)
+                await upstream.connect()
+                upstreams.append(upstream)
+
+            self._upstreams[mux_url] = upstreams
+            return min(upstreams, key=lambda upstream: len(upstream.channels))
+
+    async def close(self):
+        """Close all upstream sockets."""
+        for upstreams in self._upstreams.values():
+            for upstream in upstreams:
+                await upstream.close()
+        self._upstreams = {}
+
+
+async def proxy_websocket_mux(
+    request: web.Request, pool: MuxPool, target_url: str, mux_path: str
+) -> web.Response:
+    """
+    Serve a client WebSocket over a shared multiplexed upstream socket.
+
+    The channel is opened (and authenticated by the upstream) before the
+    client handshake completes, so refused clients get a plain HTTP error.
+
+    Args:
+        request: Original WebSocket request
+        pool: Mux upstream pool
+        target_url: Base URL of the selected upstream instance
+        mux_path: Path of the upstream mux endpoint
+
+    Returns:
+        WebSocket response or error response
+    """
+    mux_url = f"{target_url}{mux_path}".replace("http://", "ws://").replace(
+        "https://", "wss://"
+    )
+
+    try:
+        upstream = await pool.acquire(mux_url)
+        channel_id, reply = await upstream.open_channel(
+            {
+                "token": request.headers.get("Authorization", "").removeprefix(
+                    "Bearer "
+                ),
+                "conversation_id": request.query.get("conversation_id"),
+                "protocols": list(get_requested_subprotocols(request)),
+                "correlation_id": request.get("correlation_id"),
+            }
+        )
+    except Exception as e:
+        logger.error(f"WebSocket mux open error: {e}")
+        return web.json_response({"error": "WebSocket connection failed"}, status=502)
+
+    if not reply["accepted"]:
+        return web.json_response(
+            {"error": reply.get("reason", "Connection refused")},
+            status=reply.get("status", 403),
+        )
+
+    protocol = reply.get("protocol")
+    ws = web.WebSocketResponse(protocols=(protocol,) if protocol else (), compress=True)
+    try:
+        await ws.prepare(request)
+    except Exception:
+        await upstream.close_channel(channel_id)
+        raise
+
+    upstream.attach(channel_id, ws)
+
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                await upstream.send(channel_id, OP_TEXT, msg.data.encode())
+            elif msg.type == WSMsgType.BINARY:
+                await upstream.send(channel_id, OP_BINARY, msg.data)
+            elif msg.type == WSMsgType.ERROR:
+                logger.error(f"WebSocket client error: {ws.exception()}")
+                break
+    except Exception as e:
+        logger.error(f"Error proxying to mux upstream: {e}")
+    finally:
+        await upstream.close_channel(channel_id)
+
+    return ws  # type: ignore[return-value]
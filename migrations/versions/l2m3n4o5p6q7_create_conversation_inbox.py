@@ -0,0 +1,86 @@
+"""Create conversation_inbox projection
+
+Revision ID: l2m3n4o5p6q7
+Revises: k1l2m3n4o5p6
+Create Date: 2025-01-27 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "l2m3n4o5p6q7"
+down_revision: str = "k1l2m3n4o5p6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create per-user conversation inbox and backfill it from conversations."""
+
+    op.create_table(
+        "conversation_inbox",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", sa.Integer(), nullable=False),
+        sa.Column("peer_user_id", sa.Integer(), nullable=False),
+        sa.Column("last_message_id", sa.Integer(), nullable=True),
+        sa.Column("last_message_sender_id", sa.Integer(), nullable=True),
+        sa.Column("last_message_preview", sa.String(200), nullable=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sort_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "conversation_id"),
+        sa.ForeignKeyConstraint(
+            ["conversation_id"], ["conversations.id"], ondelete="CASCADE"
+        ),
+    )
+
+    # Inbox page = one range scan in (user_id, sort_at DESC, conversation_id DESC)
+    op.create_index(
+        "idx_conversation_inbox_user_sort",
+        "conversation_inbox",
+        ["user_id", sa.text("sort_at DESC"), sa.text("conversation_id DESC")],
+    )
+    op.create_index(
+        "idx_conversation_inbox_user_unread",
+        "conversation_inbox",
+        ["user_id", sa.text("sort_at DESC"), sa.text("conversation_id DESC")],
+        postgresql_where=sa.text("unread_count > 0"),
+    )
+
+    # Backfill one row per participant from existing conversations
+    op.execute("""
+        INSERT INTO conversation_inbox (
+            user_id, conversation_id, peer_user_id, last_message_id,
+            last_message_sender_id, last_message_preview, unread_count, sort_at
+        )
+        SELECT
+            p.user_id,
+            c.id,
+            p.peer_user_id,
+            m.id,
+            m.sender_id,
+            LEFT(m.content, 200),
+            p.unread_count,
+            COALESCE(c.last_message_at, c.created_at)
+        FROM conversations c
+        CROSS JOIN LATERAL (
+            VALUES
+                (c.user1_id, c.user2_id, c.unread_count_user1),
+                (c.user2_id, c.user1_id, c.unread_count_user2)
+        ) AS p(user_id, peer_user_id, unread_count)
+        LEFT JOIN LATERAL (
+            SELECT id, sender_id, content
+            FROM messages
+            WHERE conversation_id = c.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        ) m ON TRUE
+        """)
+
+
+def downgrade():
+    """Drop conversation_inbox table."""
+    op.drop_index("idx_conversation_inbox_user_unread", table_name="conversation_inbox")
+    op.drop_index("idx_conversation_inbox_user_sort", table_name="conversation_inbox")
+    op.drop_table("conversation_inbox")
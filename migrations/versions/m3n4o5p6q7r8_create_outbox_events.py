@@ -0,0 +1,42 @@
+"""Create outbox_events table
+
+Revision ID: m3n4o5p6q7r8
+Revises: l2m3n4o5p6q7
+Create Date: 2025-01-28 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "m3n4o5p6q7r8"
+down_revision: str = "l2m3n4o5p6q7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the transactional outbox for domain events."""
+
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("aggregate_key", sa.String(100), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("correlation_id", sa.String(100), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    """Drop the outbox table."""
+
+    op.drop_table("outbox_events")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Telegram initData validation benchmark.
+
+Compares validate_telegram_webapp_init_data with TelegramInitDataValidator
+on a mix of users, each resending the same initData on every app open.
+
+Usage:
+    python scripts/benchmark_init_data.py [--users 1000] [--requests 100000]
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.utils.security import (  # noqa: E402
+    TelegramInitDataValidator,
+    validate_telegram_webapp_init_data,
+)
+
+BOT_TOKEN = "123456:benchmark-bot-token"
+
+
+def make_init_data(user_id: int, auth_date: int) -> str:
+    """Build initData signed the way Telegram signs it."""
+    fields = {
+        "auth_date": str(auth_date),
+        "query_id": f"AAH{user_id:010d}",
+        "user": json.dumps(
+            {
+                "id": user_id,
+                "first_name": "Bench",
+                "username": f"user{user_id}",
+                "language_code": "en",
+            }
+        ),
+    }
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(
+        secret_key, check_string.encode(), hashlib.sha256
+    ).hexdigest()
+    return urlencode(fields)
+
+
+def run(name: str, validate, sample: list[str]) -> dict:
+    """Time validation of every initData in ``sample``."""
+    start = time.perf_counter()
+    for init_data in sample:
+        validate(init_data)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "name": name,
+        "us_per_validation": elapsed / len(sample) * 1e6,
+        "validations_per_second": len(sample) / elapsed,
+    }
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # Keep "initData validated" info logs out of the timings
+    logging.disable(logging.INFO)
+
+    random.seed(42)
+    auth_date = int(time.time())
+    init_data = [make_init_data(user_id, auth_date) for user_id in range(args.users)]
+    sample = [random.choice(init_data) for _ in range(args.requests)]
+
+    uncached = TelegramInitDataValidator(BOT_TOKEN, cache_size=0)
+    cached = TelegramInitDataValidator(BOT_TOKEN)
+
+    results = [
+        run(
+            "function",
+            lambda data: validate_telegram_webapp_init_data(data, BOT_TOKEN),
+            sample,
+        ),
+        run("validator (no cache)", uncached.validate, sample),
+        run("validator (cached)", cached.validate, sample),
+    ]
+
+    print(f"{args.users} users, {args.requests} validations")
+    print(f"{'validation':<24}{'us/op':>10}{'ops/s':>14}")
+    for result in results:
+        print(
+            f"{result['name']:<24}{result['us_per_validation']:>10.1f}"
+            f"{result['validations_per_second']:>14.0f}"
+        )
+    print(f"cache: {cached.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Rate limiter benchmark.
+
+Compares the list-based RateLimiter with SlidingWindowRateLimiter on many
+active keys: time per check and memory held by the limiter.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py [--keys 100000] [--requests 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.utils.rate_limiter import SlidingWindowRateLimiter  # noqa: E402
+from core.utils.security import RateLimiter  # noqa: E402
+
+
+def run(limiter, keys: int, requests: int, max_requests: int) -> dict:
+    """Warm up every key, then time random checks."""
+    random.seed(42)
+    tracemalloc.start()
+
+    # Every key active: a few requests each
+    for key in range(keys):
+        for _ in range(min(5, max_requests)):
+            limiter.is_allowed(key)
+
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = [random.randrange(keys) for _ in range(requests)]
+    start = time.perf_counter()
+    for key in sample:
+        limiter.is_allowed(key)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "name": type(limiter).__name__,
+        "ns_per_check": elapsed / requests * 1e9,
+        "checks_per_second": requests / elapsed,
+        "memory_mb": memory / 1024 / 1024,
+    }
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--max-requests", type=int, default=50)
+    args = parser.parse_args()
+
+    results = [
+        run(
+            RateLimiter(max_requests=args.max_requests, window_seconds=60),
+            args.keys,
+            args.requests,
+            args.max_requests,
+        ),
+        run(
+            SlidingWindowRateLimiter(max_requests=args.max_requests, window_seconds=60),
+            args.keys,
+            args.requests,
+            args.max_requests,
+        ),
+    ]
+
+    print(f"{args.keys} active keys, {args.requests} checks")
+    print(f"{'limiter':<28}{'ns/check':>12}{'checks/s':>14}{'memory MB':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<28}{result['ns_per_check']:>12.0f}"
+            f"{result['checks_per_second']:>14.0f}{result['memory_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
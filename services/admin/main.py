@@ -23,6 +23,7 @@ from core.middleware.error_handling import setup_error_handling
 from core.middleware.jwt_middleware import admin_jwt_middleware
 from core.middleware.metrics_middleware import add_metrics_route
 from core.resilience.circuit_breaker import data_service_breaker
+from core.resilience.deadline import client_timeout, deadline_headers
 from core.resilience.retry import retry_data_service
 from core.utils.errors import StandardError
 from core.utils.logging import configure_logging
@@ -34,9 +35,11 @@ logger = logging.getLogger(__name__)
 async def _call_data_service(
     url: str, method: str = "GET", data: dict = None, params: dict = None
 ):
-    """Helper to call Data Service with retry logic."""
-    async with aiohttp.ClientSession() as session:
-        async with session.request(method, url, json=data, params=params) as resp:
+    """Helper to call Data Service with retry logic and the request budget."""
+    async with aiohttp.ClientSession(timeout=client_timeout(30)) as session:
+        async with session.request(
+            method, url, json=data, params=params, headers=deadline_headers()
+        ) as resp:
             resp.raise_for_status()
             return await resp.json()
 
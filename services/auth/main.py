@@ -8,7 +8,7 @@ independent of any specific platform.
 
 import logging
 
-from aiohttp import web
+from aiohttp import ClientSession, ClientTimeout, web
 
 from core.metrics.business_metrics import (
     JWT_TOKENS_CREATED,
@@ -18,6 +18,7 @@ from core.metrics.business_metrics import (
 from core.middleware.audit_logging import audit_log, log_security_event
 from core.middleware.error_handling import setup_error_handling
 from core.middleware.metrics_middleware import add_metrics_route
+from core.middleware.profiling import upstream_trace_config
 from core.middleware.rate_limiting import auth_rate_limiting_middleware
 from core.middleware.security_metrics import (
     record_auth_attempt,
@@ -25,13 +26,15 @@ from core.middleware.security_metrics import (
     record_security_event,
 )
 from core.middleware.telegram_security import telegram_security_middleware
+from core.resilience.deadline import client_timeout, deadline_headers
 from core.utils.logging import configure_logging
 from core.utils.security import (
+    TelegramInitDataValidator,
     ValidationError,
     generate_jwt_token,
     generate_token_pair,
     validate_jwt_token,
-    validate_telegram_webapp_init_data,
+    verified_token_cache,
 )
 
 logger = logging.getLogger(__name__)
@@ -52,13 +55,13 @@ async def validate_telegram_init_data(request: web.Request) -> web.Response:
         if not init_data:
             return web.json_response({"error": "Missing init_data"}, status=400)
 
-        # Get bot token from server environment (not from client!)
-        bot_token = request.app["config"].get("bot_token")
-        if not bot_token:
+        # Validator holds the server's bot token (never taken from the client!)
+        validator = request.app.get("init_data_validator")
+        if validator is None:
             return web.json_response({"error": "Bot token not configured"}, status=500)
 
         # Validate initData using server's bot token
-        user_data = validate_telegram_webapp_init_data(init_data, bot_token)
+        user_data = validator.validate(init_data)
         telegram_id = user_data.get("user", {}).get("id")
 
         # Generate JWT token pair (access + refresh)
@@ -76,32 +79,21 @@ async def validate_telegram_init_data(request: web.Request) -> web.Response:
             "is_premium": user_data.get("user", {}).get("is_premium", False),
         }
 
-        import aiohttp
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{data_service_url}/data/users/create_or_update", json=user_payload
-            ) as resp:
-                if resp.status != 200:
-                    logger.error(f"Failed to create/update user: {await resp.text()}")
-                    return web.json_response(
-                        {"error": "Failed to create user"}, status=500
-                    )
-                db_user = await resp.json()
-
-        # Try to get existing profile
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{data_service_url}/data/profiles/{db_user['id']}"
-            ) as resp:
-                profile = await resp.json() if resp.status == 200 else None
-
-        # Try to get preferences
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{data_service_url}/data/preferences/{db_user['id']}"
-            ) as resp:
-                preferences = await resp.json() if resp.status == 200 else None
+        # Upsert the user and load profile and preferences in one call
+        async with request.app["http_session"].post(
+            f"{data_service_url}/data/users/login",
+            json=user_payload,
+            headers=deadline_headers(),
+            timeout=client_timeout(10),
+        ) as resp:
+            if resp.status != 200:
+                logger.error(f"Failed to create/update user: {await resp.text()}")
+                return web.json_response({"error": "Failed to create user"}, status=500)
+            login_data = await resp.json()
+
+        db_user = login_data["user"]
+        profile = login_data["profile"]
+        preferences = login_data["preferences"]
 
         # Record successful authentication
         record_auth_attempt(
@@ -232,7 +224,7 @@ async def verify_token(request: web.Request) -> web.Response:
         token = auth_header.split(" ")[1]
         jwt_secret = request.app["config"].get("jwt_secret")
 
-        payload = validate_jwt_token(token, jwt_secret)
+        payload = verified_token_cache.validate(token, jwt_secret)
 
         return web.json_response({"valid": True, "user_id": payload.get("user_id")})
 
@@ -309,11 +301,29 @@ async def health_check(request: web.Request) -> web.Response:
     return web.json_response({"status": "healthy", "service": "auth"})
 
 
+async def startup_session(app: web.Application):
+    """Create the data-service HTTP session on app startup."""
+    app["http_session"] = ClientSession(
+        timeout=ClientTimeout(total=10, connect=3),
+        trace_configs=[upstream_trace_config()],
+    )
+
+
+async def cleanup_session(app: web.Application):
+    """Close the data-service HTTP session on app shutdown."""
+    if app.get("http_session"):
+        await app["http_session"].close()
+
+
 def create_app(config: dict) -> web.Application:
     """Create and configure the auth service application."""
     app = web.Application()
     app["config"] = config
 
+    # Derive the initData secret key once for the lifetime of the service
+    if config.get("bot_token"):
+        app["init_data_validator"] = TelegramInitDataValidator(config["bot_token"])
+
     # Setup error handling
     setup_error_handling(app, "auth-service")
 
@@ -339,6 +349,10 @@ def create_app(config: dict) -> web.Application:
     # Add metrics endpoint
     add_metrics_route(app, "auth-service")
 
+    # Reuse data-service connections across logins
+    app.on_startup.append(startup_session)
+    app.on_cleanup.append(cleanup_session)
+
     return app
 
 
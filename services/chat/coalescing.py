@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+"""Server-side coalescing of chatty WebSocket events.
+
+Typing indicators are debounced per (user, conversation) and read receipts are
+collapsed to the highest ``up_to_message_id`` and flushed in batches, so the
+backend load of a connection does not grow with keystrokes or scroll events.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class TypingDebouncer:
+    """Debounce and rate-limit typing indicators per user and conversation.
+
+    At most one frame per ``min_interval`` is forwarded for a key. A typing
+    frame passes when the typing state changes, or when the user is still
+    typing and ``refresh_interval`` has passed since the last forwarded
+    "typing" frame, so peers can expire stale indicators. A state change that
+    arrives within ``min_interval`` of the last forwarded frame is held and
+    forwarded by a trailing timer unless it is reverted before the timer
+    fires, so a "stopped typing" frame is delayed but never lost.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        refresh_interval: float = 3.0,
+        idle_timeout: float = 30.0,
+    ):
+        """Initialize debouncer.
+
+        Args:
+            min_interval: Minimum seconds between two forwarded frames per key
+            refresh_interval: Seconds after which an unchanged "typing" state
+                is forwarded again
+            idle_timeout: Seconds after which an untouched key is evicted
+        """
+        self.min_interval = min_interval
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        # Storage: {(user_id, conversation_id): (is_typing, last_forwarded_at)}
+        self._state: dict[tuple[Any, Any], tuple[bool, float]] = {}
+        # State changes waiting for min_interval to pass
+        self._held: dict[tuple[Any, Any], bool] = {}
+        self._timers: dict[tuple[Any, Any], asyncio.TimerHandle] = {}
+        self._sends: set[asyncio.Task] = set()
+        self._last_cleanup = time.monotonic()
+
+    def should_forward(
+        self, user_id: Any, conversation_id: Any, is_typing: bool
+    ) -> bool:
+        """Check whether a typing frame should be forwarded now.
+
+        A throttled state change is held; call :meth:`schedule_trailing` to
+        have it forwarded once ``min_interval`` has passed.
+
+        Args:
+            user_id: Typing user
+            conversation_id: Conversation the user is typing in
+            is_typing: Typing state reported by the client
+
+        Returns:
+            True if the frame should be broadcast, False if it is coalesced
+            or held
+        """
+        now = time.monotonic()
+        self._cleanup_idle(now)
+
+        key = (user_id, conversation_id)
+        previous = self._state.get(key)
+
+        if previous is None:
+            # Nothing to clear if the first frame we see is "stopped typing"
+            if not is_typing:
+                return False
+            self._state[key] = (True, now)
+            return True
+
+        was_typing, last_forwarded = previous
+        elapsed = now - last_forwarded
+
+        if is_typing == was_typing:
+            # Back to the forwarded state: a held change is moot
+            self._held.pop(key, None)
+            if not is_typing or elapsed < max(self.min_interval, self.refresh_interval):
+                return False
+        elif elapsed < self.min_interval:
+            self._held[key] = is_typing
+            return False
+
+        self._mark_forwarded(key, is_typing, now)
+        return True
+
+    def schedule_trailing(
+        self,
+        user_id: Any,
+        conversation_id: Any,
+        forward: Callable[[bool], Awaitable[Any]],
+    ) -> None:
+        """Forward a held state change once ``min_interval`` has passed.
+
+        Args:
+            user_id: Typing user
+            conversation_id: Conversation the user is typing in
+            forward: Async function broadcasting a typing state
+        """
+        key = (user_id, conversation_id)
+        if key not in self._held or key in self._timers:
+            return
+
+        _, last_forwarded = self._state[key]
+        delay = max(0.0, last_forwarded + self.min_interval - time.monotonic())
+        self._timers[key] = asyncio.get_running_loop().call_later(
+            delay, self._fire_trailing, key, forward
+        )
+
+    def forget(self, user_id: Any, conversation_id: Any) -> None:
+        """Drop state for a key (e.g. when the WebSocket closes)."""
+        key = (user_id, conversation_id)
+        self._state.pop(key, None)
+        self._held.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def _mark_forwarded(
+        self, key: tuple[Any, Any], is_typing: bool, now: float
+    ) -> None:
+        """Record a forwarded frame and cancel any trailing one."""
+        self._state[key] = (is_typing, now)
+        self._held.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def _fire_trailing(
+        self, key: tuple[Any, Any], forward: Callable[[bool], Awaitable[Any]]
+    ) -> None:
+        """Timer callback forwarding the held state, if still wanted."""
+        self._timers.pop(key, None)
+        is_typing = self._held.pop(key, None)
+        if is_typing is None or key not in self._state:
+            return
+
+        self._mark_forwarded(key, is_typing, time.monotonic())
+        task = asyncio.create_task(self._send_trailing(forward, is_typing))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def _send_trailing(
+        self, forward: Callable[[bool], Awaitable[Any]], is_typing: bool
+    ) -> None:
+        """Broadcast a trailing frame; the client may already be gone."""
+        try:
+            await forward(is_typing)
+        except Exception as e:
+            logger.debug(f"Failed to forward trailing typing frame: {e}")
+
+    def _cleanup_idle(self, now: float) -> None:
+        """Evict keys that have not been forwarded for ``idle_timeout``."""
+        if now - self._last_cleanup < self.idle_timeout:
+            return
+
+        cutoff = now - self.idle_timeout
+        for key in [k for k, (_, ts) in self._state.items() if ts < cutoff]:
+            if key not in self._timers:
+                del self._state[key]
+                self._held.pop(key, None)
+
+        self._last_cleanup = now
+
+
+class ReadReceiptBatcher:
+    """Collapse read receipts and flush them to the backend in batches.
+
+    For every (conversation, user) only the highest ``up_to_message_id`` is
+    kept. A background task flushes pending receipts every ``flush_interval``
+    seconds, or earlier once ``max_batch_size`` distinct keys are pending.
+
+    A batch rejected with one of ``permanent_errors`` is retried one receipt
+    at a time so a single bad receipt is dropped instead of blocking every
+    later flush; other failures re-queue the batch.
+    """
+
+    def __init__(
+        self,
+        flush_callback: Callable[[list[dict[str, Any]]], Awaitable[Any]],
+        flush_interval: float = 0.5,
+        max_batch_size: int = 100,
+        permanent_errors: tuple[type[BaseException], ...] = (),
+    ):
+        """Initialize batcher.
+
+        Args:
+            flush_callback: Async function receiving a list of
+                ``{"conversation_id", "user_id", "up_to_message_id"}`` dicts
+            flush_interval: Seconds between periodic flushes
+            max_batch_size: Pending keys that trigger an early flush
+            permanent_errors: Exceptions meaning the backend rejected the
+                receipts; retrying them unchanged cannot succeed
+        """
+        self.flush_callback = flush_callback
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.permanent_errors = permanent_errors
+        self._pending: dict[tuple[Any, Any], int] = {}
+        # Highest receipt accepted per key, used to drop stale/duplicate frames
+        self._watermarks: dict[tuple[Any, Any], int] = {}
+        self._flush_event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def add(self, conversation_id: Any, user_id: Any, up_to_message_id: int) -> bool:
+        """Record a read receipt.
+
+        Args:
+            conversation_id: Conversation ID
+            user_id: Reader user ID
+            up_to_message_id: Last message read by the user
+
+        Returns:
+            True if the receipt advanced the user's read position
+        """
+        key = (conversation_id, user_id)
+        up_to_message_id = int(up_to_message_id)
+
+        if up_to_message_id <= self._watermarks.get(key, 0):
+            return False
+
+        self._watermarks[key] = up_to_message_id
+        self._pending[key] = up_to_message_id
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_event.set()
+
+        return True
+
+    def forget(self, conversation_id: Any, user_id: Any) -> None:
+        """Drop the watermark for a key once its connection closes."""
+        if (conversation_id, user_id) not in self._pending:
+            self._watermarks.pop((conversation_id, user_id), None)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of receipts waiting to be flushed."""
+        return len(self._pending)
+
+    async def flush(self) -> None:
+        """Flush all pending receipts in a single batch."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        batch = [
+            {
+                "conversation_id": conversation_id,
+                "user_id": user_id,
+                "up_to_message_id": up_to_message_id,
+            }
+            for (conversation_id, user_id), up_to_message_id in pending.items()
+        ]
+
+        try:
+            await self.flush_callback(batch)
+            logger.debug(f"Flushed {len(batch)} read receipts")
+        except self.permanent_errors as e:
+            logger.warning(f"Read receipt batch rejected, retrying one by one: {e}")
+            await self._flush_individually(batch)
+        except Exception as e:
+            logger.error(f"Failed to flush read receipts: {e}")
+            self._requeue(batch)
+
+    async def _flush_individually(self, batch: list[dict[str, Any]]) -> None:
+        """Flush receipts one at a time, dropping the ones that are rejected."""
+        for index, receipt in enumerate(batch):
+            try:
+                await self.flush_callback([receipt])
+            except self.permanent_errors as e:
+                logger.warning(f"Dropping rejected read receipt {receipt}: {e}")
+            except Exception as e:
+                logger.error(f"Failed to flush read receipts: {e}")
+                self._requeue(batch[index:])
+                return
+
+    def _requeue(self, receipts: list[dict[str, Any]]) -> None:
+        """Re-queue failed receipts unless newer ones arrived meanwhile."""
+        for receipt in receipts:
+            key = (receipt["conversation_id"], receipt["user_id"])
+            if receipt["up_to_message_id"] > self._pending.get(key, 0):
+                self._pending[key] = receipt["up_to_message_id"]
+
+    async def _run(self) -> None:
+        """Background flush loop."""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_event.wait(), timeout=self.flush_interval
+                )
+            except TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+"""Chat side of gateway WebSocket multiplexing.
+
+The gateway carries many client sockets over a few ``/chat/ws/mux``
+connections. Each client is a channel that authenticates individually with
+its own access token in the OPEN frame.
+"""
+
+import asyncio
+import logging
+from collections.abc import Sequence
+from typing import Any
+
+from aiohttp import web
+
+from core.utils.ws_mux import (
+    OP_BINARY,
+    OP_CLOSE,
+    OP_OPEN,
+    OP_TEXT,
+    pack_control,
+    pack_frame,
+)
+from services.chat.protocol import (
+    SUPPORTED_SUBPROTOCOLS,
+    JsonCodec,
+    MsgpackCodec,
+    get_codec,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def select_subprotocol(offered: Sequence[str] | None) -> str | None:
+    """Pick the first client-offered subprotocol that chat supports."""
+    for protocol in offered or []:
+        if protocol in SUPPORTED_SUBPROTOCOLS:
+            return protocol
+    return None
+
+
+class MuxChannel:
+    """One client socket carried over a mux connection.
+
+    Provides the same ``send_json`` interface as ChatConnection so event
+    handlers work unchanged. Incoming frames are processed in order by a
+    per-channel worker so a slow handler only delays its own client.
+    """
+
+    def __init__(
+        self,
+        ws: web.WebSocketResponse,
+        channel_id: int,
+        user_id: Any,
+        conversation_id: Any,
+        protocol: str | None,
+        max_pending: int = 100,
+    ):
+        """Initialize channel.
+
+        Args:
+            ws: Mux WebSocket shared with the gateway
+            channel_id: Channel id assigned by the gateway
+            user_id: Authenticated user of this channel
+            conversation_id: Conversation the client joined
+            protocol: Negotiated subprotocol
+            max_pending: Frames buffered before the channel is closed
+        """
+        self.ws = ws
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.protocol = protocol
+        self.codec = get_codec(protocol)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.worker: asyncio.Task | None = None
+
+    async def send_json(self, payload: dict[str, Any]) -> None:
+        """Send an event to the client encoded with the negotiated codec."""
+        encoded = self.codec.encode(payload)
+        if self.codec.binary:
+            await self.ws.send_bytes(pack_frame(self.channel_id, OP_BINARY, encoded))
+        else:
+            await self.ws.send_bytes(
+                pack_frame(self.channel_id, OP_TEXT, encoded.encode())
+            )
+
+    def decode(self, opcode: int, payload: bytes) -> dict[str, Any]:
+        """Decode a relayed client frame into an event dict.
+
+        Raises:
+            ValueError: If the frame cannot be decoded into a dict
+        """
+        if opcode == OP_BINARY:
+            data = MsgpackCodec.decode(payload)
+        else:
+            data = JsonCodec.decode(payload)
+
+        if not isinstance(data, dict):
+            raise ValueError("Chat frame must be an object")
+
+        return data
+
+    async def accept(self) -> None:
+        """Confirm the channel to the gateway."""
+        await self.ws.send_bytes(
+            pack_control(self.channel_id, OP_OPEN, {"protocol": self.protocol})
+        )
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        """Ask the gateway to close the client socket."""
+        if not self.ws.closed:
+            await self.ws.send_bytes(
+                pack_control(
+                    self.channel_id, OP_CLOSE, {"code": code, "reason": reason}
+                )
+            )
+
+
+async def refuse_channel(
+    ws: web.WebSocketResponse, channel_id: int, status: int, reason: str
+) -> None:
+    """Refuse an OPEN; the gateway answers the client with an HTTP error."""
+    await ws.send_bytes(
+        pack_control(channel_id, OP_CLOSE, {"status": status, "reason": reason})
+    )
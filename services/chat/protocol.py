@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""Negotiated wire protocols for the chat WebSocket.
+
+Clients pick an encoding with the ``Sec-WebSocket-Protocol`` header:
+
+- ``dating.chat.v1.json``: JSON in text frames (the default when no
+  subprotocol is requested)
+- ``dating.chat.v1.msgpack``: MessagePack in binary frames
+
+permessage-deflate is negotiated separately by the WebSocket handshake and
+applies to both encodings.
+"""
+
+import json
+from typing import Any
+
+import msgpack
+from aiohttp import WSMessage, WSMsgType, web
+
+SUBPROTOCOL_JSON = "dating.chat.v1.json"
+SUBPROTOCOL_MSGPACK = "dating.chat.v1.msgpack"
+
+# Offered to clients; the first one listed by the client that we support wins
+SUPPORTED_SUBPROTOCOLS = (SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON)
+
+
+class JsonCodec:
+    """JSON over text frames."""
+
+    binary = False
+
+    @staticmethod
+    def encode(payload: dict[str, Any]) -> str:
+        """Encode an event as compact JSON."""
+        return json.dumps(payload, separators=(",", ":"))
+
+    @staticmethod
+    def decode(data: str | bytes) -> dict[str, Any]:
+        """Decode a JSON frame."""
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """MessagePack over binary frames."""
+
+    binary = True
+
+    @staticmethod
+    def encode(payload: dict[str, Any]) -> bytes:
+        """Encode an event as MessagePack."""
+        return msgpack.packb(payload, use_bin_type=True)
+
+    @staticmethod
+    def decode(data: str | bytes) -> dict[str, Any]:
+        """Decode a MessagePack frame."""
+        if isinstance(data, str):
+            data = data.encode()
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    SUBPROTOCOL_JSON: JsonCodec,
+    SUBPROTOCOL_MSGPACK: MsgpackCodec,
+}
+
+
+def get_codec(subprotocol: str | None):
+    """Get codec for a negotiated subprotocol (JSON if none was negotiated)."""
+    return CODECS.get(subprotocol or SUBPROTOCOL_JSON, JsonCodec)
+
+
+class ChatConnection:
+    """WebSocket wrapper that encodes and decodes frames with the negotiated codec.
+
+    Exposes ``send_json`` so event handlers stay encoding-agnostic.
+    """
+
+    def __init__(self, ws: web.WebSocketResponse):
+        """Initialize connection.
+
+        Args:
+            ws: Prepared WebSocket response
+        """
+        self.ws = ws
+        self.codec = get_codec(ws.ws_protocol)
+
+    @property
+    def protocol(self) -> str:
+        """Negotiated subprotocol."""
+        return self.ws.ws_protocol or SUBPROTOCOL_JSON
+
+    async def send_json(self, payload: dict[str, Any]) -> None:
+        """Send an event encoded with the negotiated codec."""
+        encoded = self.codec.encode(payload)
+        if self.codec.binary:
+            await self.ws.send_bytes(encoded)
+        else:
+            await self.ws.send_str(encoded)
+
+    def decode(self, msg: WSMessage) -> dict[str, Any]:
+        """Decode a TEXT or BINARY frame into an event dict.
+
+        Raises:
+            ValueError: If the frame cannot be decoded into a dict
+        """
+        if msg.type == WSMsgType.BINARY:
+            data = MsgpackCodec.decode(msg.data)
+        else:
+            data = JsonCodec.decode(msg.data)
+
+        if not isinstance(data, dict):
+            raise ValueError("Chat frame must be an object")
+
+        return data
+
+    async def close(self, *args, **kwargs):
+        """Close the underlying WebSocket."""
+        return await self.ws.close(*args, **kwargs)
@@ -22,6 +22,8 @@ from core.database import (
 )
 from core.middleware.error_handling import setup_error_handling
 from core.middleware.metrics_middleware import add_metrics_route
+from core.middleware.profiling import instrument_engine, stage
+from core.resilience.deadline import install_statement_timeout
 
 # from core.middleware.jwt_middleware import jwt_middleware
 from core.utils.logging import configure_logging
@@ -528,75 +530,210 @@ class DataService:
         return {"count": count}
 
     # Chat operations
-    async def get_conversations(self, user_id: int) -> list:
-        """Get user conversations."""
-        from sqlalchemy import or_, select
+    async def get_conversation_participants(
+        self, conversation_id: int
+    ) -> dict[str, Any] | None:
+        """Get the two participants of a conversation.
+
+        Args:
+            conversation_id: Conversation ID
+
+        Returns:
+            Dictionary with user1_id, user2_id and is_blocked, or None if the
+            conversation does not exist
+        """
+        from sqlalchemy import select
 
         from bot.db import Conversation
 
-        stmt = (
-            select(Conversation)
-            .where(
-                or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id)
-            )
-            .order_by(Conversation.last_message_at.desc())
+        result = await self.session.execute(
+            select(
+                Conversation.user1_id, Conversation.user2_id, Conversation.is_blocked
+            ).where(Conversation.id == conversation_id)
         )
+        row = result.first()
+        if row is None:
+            return None
+
+        return {
+            "conversation_id": conversation_id,
+            "user1_id": row.user1_id,
+            "user2_id": row.user2_id,
+            "is_blocked": row.is_blocked,
+        }
+
+    async def get_conversations(
+        self,
+        user_id: int,
+        limit: int = 20,
+        cursor: str | None = None,
+        with_unread_only: bool = False,
+    ) -> dict[str, Any]:
+        """Get a page of the user's conversation inbox.
+
+        Reads the per-user conversation_inbox projection ordered by
+        (sort_at, conversation_id) descending; the cursor is the position of
+        the last row of the previous page.
+
+        Args:
+            user_id: Inbox owner
+            limit: Page size
+            cursor: Opaque cursor returned as next_cursor by the previous page
+            with_unread_only: Only return conversations with unread messages
+
+        Returns:
+            Dict with conversations, has_more and next_cursor
+        """
+        from datetime import UTC, datetime
+
+        from sqlalchemy import select, tuple_
+
+        from bot.db import ConversationInbox
+
+        stmt = select(ConversationInbox).where(ConversationInbox.user_id == user_id)
+
+        if with_unread_only:
+            stmt = stmt.where(ConversationInbox.unread_count > 0)
+
+        if cursor:
+            # Cursor format: "<sort_at epoch microseconds>:<conversation_id>"
+            sort_at_us, conversation_id = (int(part) for part in cursor.split(":"))
+            sort_at = datetime.fromtimestamp(sort_at_us / 1_000_000, tz=UTC)
+            stmt = stmt.where(
+                tuple_(ConversationInbox.sort_at, ConversationInbox.conversation_id)
+                < tuple_(sort_at, conversation_id)
+            )
+
+        stmt = stmt.order_by(
+            ConversationInbox.sort_at.desc(), ConversationInbox.conversation_id.desc()
+        ).limit(limit + 1)
 
         result = await self.session.execute(stmt)
-        conversations = result.scalars().all()
+        rows = list(result.scalars().all())
 
-        return [
-            {
-                "id": conv.id,
-                "match_id": conv.match_id,
-                "user1_id": conv.user1_id,
-                "user2_id": conv.user2_id,
-                "last_message_at": (
-                    conv.last_message_at.isoformat() if conv.last_message_at else None
-                ),
-                "unread_count": (
-                    conv.unread_count_user1
-                    if conv.user1_id == user_id
-                    else conv.unread_count_user2
-                ),
-                "is_blocked": conv.is_blocked,
-                "created_at": conv.created_at.isoformat(),
-            }
-            for conv in conversations
-        ]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            sort_at_us = round(last.sort_at.timestamp() * 1_000_000)
+            next_cursor = f"{sort_at_us}:{last.conversation_id}"
+
+        return {
+            "conversations": [
+                {
+                    "id": row.conversation_id,
+                    "peer_user_id": row.peer_user_id,
+                    "last_message": (
+                        {
+                            "id": row.last_message_id,
+                            "sender_id": row.last_message_sender_id,
+                            "preview": row.last_message_preview,
+                        }
+                        if row.last_message_id
+                        else None
+                    ),
+                    "last_message_at": row.sort_at.isoformat(),
+                    "unread_count": row.unread_count,
+                }
+                for row in rows
+            ],
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        }
 
     async def get_messages(
-        self, conversation_id: int, limit: int = 50, offset: int = 0
-    ) -> list:
-        """Get messages for a conversation."""
-        from sqlalchemy import select
+        self,
+        conversation_id: int,
+        limit: int = 50,
+        before_id: int | None = None,
+        after_id: int | None = None,
+    ) -> dict[str, Any]:
+        """Get a page of messages for a conversation using keyset pagination.
+
+        Pages are addressed by a message ID cursor and resolved as a range
+        scan on the (conversation_id, created_at, id) index, so the cost of a
+        page does not depend on how far back it is.
+
+        Args:
+            conversation_id: Conversation ID
+            limit: Page size
+            before_id: Return messages older than this message
+            after_id: Return messages newer than this message
+
+        Returns:
+            Dict with messages (newest first), has_more and the
+            next_before_id/prev_after_id cursors
+        """
+        from sqlalchemy import select, tuple_
 
         from bot.db import Message
 
-        stmt = (
-            select(Message)
-            .where(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.desc())
-            .limit(limit)
-            .offset(offset)
-        )
+        position = tuple_(Message.created_at, Message.id)
 
-        result = await self.session.execute(stmt)
-        messages = result.scalars().all()
+        stmt = select(Message).where(Message.conversation_id == conversation_id)
 
-        return [
-            {
-                "id": msg.id,
-                "conversation_id": msg.conversation_id,
-                "sender_id": msg.sender_id,
-                "content": msg.content,
-                "content_type": msg.content_type,
-                "media_url": msg.media_url,
-                "is_read": msg.is_read,
-                "created_at": msg.created_at.isoformat(),
-            }
-            for msg in messages
-        ]
+        if after_id is not None:
+            cursor = (
+                select(Message.created_at)
+                .where(
+                    Message.id == after_id, Message.conversation_id == conversation_id
+                )
+                .scalar_subquery()
+            )
+            stmt = stmt.where(position > tuple_(cursor, after_id)).order_by(
+                Message.created_at.asc(), Message.id.asc()
+            )
+        else:
+            if before_id is not None:
+                cursor = (
+                    select(Message.created_at)
+                    .where(
+                        Message.id == before_id,
+                        Message.conversation_id == conversation_id,
+                    )
+                    .scalar_subquery()
+                )
+                stmt = stmt.where(position < tuple_(cursor, before_id))
+            stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc())
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.session.execute(stmt.limit(limit + 1))
+        messages = list(result.scalars().all())
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        if after_id is not None:
+            messages.reverse()
+            # Paging forward: everything up to after_id is older history
+            older_exists = bool(messages)
+        else:
+            older_exists = has_more
+
+        # prev_after_id is always set so clients can poll for newer messages
+        next_before_id = messages[-1].id if messages and older_exists else None
+        prev_after_id = messages[0].id if messages else after_id
+
+        return {
+            "messages": [
+                {
+                    "id": msg.id,
+                    "conversation_id": msg.conversation_id,
+                    "sender_id": msg.sender_id,
+                    "content": msg.content,
+                    "content_type": msg.content_type,
+                    "media_url": msg.media_url,
+                    "is_read": msg.is_read,
+                    "created_at": msg.created_at.isoformat(),
+                }
+                for msg in messages
+            ],
+            "has_more": has_more,
+            "next_before_id": next_before_id,
+            "prev_after_id": prev_after_id,
+        }
 
     async def create_message(
         self,
@@ -604,33 +741,407 @@ class DataService:
         sender_id: int,
         content: str,
         content_type: str = "text",
+        idempotency_key: str | None = None,
     ) -> dict[str, Any]:
-        """Create a new message."""
-        from datetime import datetime
+        """Create a new message.
+
+        A retried request with the same idempotency key returns the message
+        stored by the first attempt instead of creating a duplicate.
+        """
+        from sqlalchemy import select
 
         from bot.db import Message
 
-        message = Message(
-            conversation_id=conversation_id,
-            sender_id=sender_id,
-            content=content,
-            content_type=content_type,
-            created_at=datetime.utcnow(),
+        created = await self.create_messages_batch(
+            [
+                {
+                    "conversation_id": conversation_id,
+                    "sender_id": sender_id,
+                    "content": content,
+                    "content_type": content_type,
+                    "idempotency_key": idempotency_key,
+                }
+            ]
         )
-
-        self.session.add(message)
-        await self.session.commit()
-        await self.session.refresh(message)
+        if created:
+            return created[0]
+
+        result = await self.session.execute(
+            select(Message).where(
+                Message.conversation_id == conversation_id,
+                Message.sender_id == sender_id,
+                Message.idempotency_key == idempotency_key,
+            )
+        )
+        message = result.scalar_one()
 
         return {
             "id": message.id,
+            "message_id": message.id,
             "conversation_id": message.conversation_id,
             "sender_id": message.sender_id,
             "content": message.content,
             "content_type": message.content_type,
+            "idempotency_key": message.idempotency_key,
             "created_at": message.created_at.isoformat(),
         }
 
+    async def create_messages_batch(
+        self, messages: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Insert many messages and update their conversations in one transaction.
+
+        Messages are written with a single multi-row INSERT ... RETURNING.
+        Items whose idempotency key was already stored are skipped, so a
+        redelivered batch is harmless. ``Conversation.last_message_at`` and
+        the recipients' unread counters are then bumped with one executemany
+        UPDATE grouped by (conversation, sender). A ``message.sent`` outbox
+        event per inserted message is written in the same transaction.
+
+        Args:
+            messages: List of {"conversation_id", "sender_id", "content",
+                "content_type", "idempotency_key", "created_at"} dicts;
+                ``created_at`` is an optional ISO timestamp of acceptance
+
+        Returns:
+            The inserted messages, in insertion order
+        """
+        from datetime import UTC, datetime, timedelta
+
+        from sqlalchemy import DateTime, Integer, bindparam, case, func, update
+        from sqlalchemy.dialects.postgresql import insert
+
+        from bot.db import Conversation, Message, OutboxEvent
+
+        if not messages:
+            return []
+
+        now = datetime.now(UTC)
+        rows = []
+        for item in messages:
+            created_at = item.get("created_at")
+            idempotency_key = item.get("idempotency_key")
+            rows.append(
+                {
+                    "conversation_id": int(item["conversation_id"]),
+                    "sender_id": int(item["sender_id"]),
+                    "content": item["content"],
+                    "content_type": item.get("content_type") or "text",
+                    "idempotency_key": idempotency_key,
+                    "idempotency_expires_at": (
+                        (now + timedelta(hours=24)).replace(tzinfo=None)
+                        if idempotency_key
+                        else None
+                    ),
+                    "created_at": (
+                        datetime.fromisoformat(created_at) if created_at else now
+                    ),
+                }
+            )
+
+        stmt = (
+            insert(Message)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="unique_message_idempotency")
+            .returning(
+                Message.id,
+                Message.conversation_id,
+                Message.sender_id,
+                Message.content,
+                Message.content_type,
+                Message.idempotency_key,
+                Message.created_at,
+            )
+        )
+        result = await self.session.execute(stmt)
+        inserted = sorted(result.all(), key=lambda row: row.id)
+
+        # Aggregate per (conversation, sender) for the counter update
+        groups: dict[tuple[int, int], dict[str, Any]] = {}
+        for row in inserted:
+            group = groups.setdefault(
+                (row.conversation_id, row.sender_id),
+                {
+                    "b_conversation_id": row.conversation_id,
+                    "b_sender_id": row.sender_id,
+                    "b_count": 0,
+                    "b_last_message_at": row.created_at,
+                    "b_last_message_id": row.id,
+                    "b_preview": row.content[:200],
+                },
+            )
+            group["b_count"] += 1
+            group["b_last_message_at"] = max(group["b_last_message_at"], row.created_at)
+            # Rows are sorted by id, so the last one seen is the newest
+            group["b_last_message_id"] = row.id
+            group["b_preview"] = row.content[:200]
+
+        if groups:
+            conversations = Conversation.__table__
+            last_message_at = bindparam(
+                "b_last_message_at", type_=DateTime(timezone=True)
+            )
+            count = bindparam("b_count", type_=Integer)
+            sender_id = bindparam("b_sender_id", type_=Integer)
+
+            await self.session.execute(
+                update(conversations)
+                .where(conversations.c.id == bindparam("b_conversation_id"))
+                .values(
+                    last_message_at=func.greatest(
+                        func.coalesce(conversations.c.last_message_at, last_message_at),
+                        last_message_at,
+                    ),
+                    # Messages from one participant are unread for the other
+                    unread_count_user1=conversations.c.unread_count_user1
+                    + case((conversations.c.user1_id == sender_id, 0), else_=count),
+                    unread_count_user2=conversations.c.unread_count_user2
+                    + case((conversations.c.user2_id == sender_id, 0), else_=count),
+                ),
+                list(groups.values()),
+            )
+
+            await self._apply_messages_to_inbox(list(groups.values()))
+
+            # message.sent events commit atomically with the messages
+            await self.session.execute(
+                insert(OutboxEvent).values(
+                    [
+                        {
+                            "event_type": "message.sent",
+                            "aggregate_key": f"conversation:{row.conversation_id}",
+                            "payload": {
+                                "conversation_id": row.conversation_id,
+                                "sender_id": row.sender_id,
+                                "content": row.content,
+                                "content_type": row.content_type,
+                                "message_id": row.id,
+                                "client_message_id": row.idempotency_key,
+                                "sent_at": row.created_at.isoformat(),
+                            },
+                        }
+                        for row in inserted
+                    ]
+                )
+            )
+
+        await self.session.commit()
+
+        return [
+            {
+                "id": row.id,
+                "message_id": row.id,
+                "conversation_id": row.conversation_id,
+                "sender_id": row.sender_id,
+                "content": row.content,
+                "content_type": row.content_type,
+                "idempotency_key": row.idempotency_key,
+                "created_at": row.created_at.isoformat(),
+            }
+            for row in inserted
+        ]
+
+    async def _apply_messages_to_inbox(self, groups: list[dict[str, Any]]) -> None:
+        """Fold newly inserted messages into both participants' inbox rows.
+
+        Args:
+            groups: Per (conversation, sender) aggregates built by
+                create_messages_batch
+        """
+        from sqlalchemy import (
+            DateTime,
+            Integer,
+            String,
+            bindparam,
+            case,
+            func,
+            literal_column,
+            select,
+            union_all,
+            update,
+        )
+        from sqlalchemy.dialects.postgresql import insert
+
+        from bot.db import Conversation, ConversationInbox
+
+        conversation_ids = {group["b_conversation_id"] for group in groups}
+
+        # Create missing inbox rows for both participants
+        participants = union_all(
+            select(
+                Conversation.user1_id.label("user_id"),
+                Conversation.id.label("conversation_id"),
+                Conversation.user2_id.label("peer_user_id"),
+                func.coalesce(
+                    Conversation.last_message_at, Conversation.created_at
+                ).label("sort_at"),
+            ).where(Conversation.id.in_(conversation_ids)),
+            select(
+                Conversation.user2_id,
+                Conversation.id,
+                Conversation.user1_id,
+                func.coalesce(Conversation.last_message_at, Conversation.created_at),
+            ).where(Conversation.id.in_(conversation_ids)),
+        ).subquery()
+        await self.session.execute(
+            insert(ConversationInbox)
+            .from_select(
+                ["user_id", "conversation_id", "peer_user_id", "sort_at"],
+                select(participants),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "conversation_id"])
+        )
+
+        inbox = ConversationInbox.__table__
+        last_message_id = bindparam("b_last_message_id", type_=Integer)
+        is_newer = func.coalesce(inbox.c.last_message_id, literal_column("0")) < (
+            last_message_id
+        )
+
+        await self.session.execute(
+            update(inbox)
+            .where(inbox.c.conversation_id == bindparam("b_conversation_id"))
+            .values(
+                last_message_id=case(
+                    (is_newer, last_message_id), else_=inbox.c.last_message_id
+                ),
+                last_message_sender_id=case(
+                    (is_newer, bindparam("b_sender_id", type_=Integer)),
+                    else_=inbox.c.last_message_sender_id,
+                ),
+                last_message_preview=case(
+                    (is_newer, bindparam("b_preview", type_=String)),
+                    else_=inbox.c.last_message_preview,
+                ),
+                sort_at=func.greatest(
+                    inbox.c.sort_at,
+                    bindparam("b_last_message_at", type_=DateTime(timezone=True)),
+                ),
+                unread_count=inbox.c.unread_count
+                + case(
+                    (inbox.c.user_id == bindparam("b_sender_id", type_=Integer), 0),
+                    else_=bindparam("b_count", type_=Integer),
+                ),
+            ),
+            groups,
+        )
+
+    async def update_read_states(self, receipts: list[dict[str, Any]]) -> int:
+        """Apply a batch of read receipts in one transaction.
+
+        Each receipt moves the reader's position forward only (never back),
+        marks the other participant's messages up to it as read and resets the
+        reader's unread counter on the conversation.
+
+        Args:
+            receipts: List of {"conversation_id", "user_id", "up_to_message_id"}
+
+        Returns:
+            Number of receipts applied
+        """
+        from sqlalchemy import and_, case, func, or_, select, update
+        from sqlalchemy.dialects.postgresql import insert
+
+        from bot.db import (
+            Conversation,
+            ConversationInbox,
+            Message,
+            ParticipantReadState,
+        )
+
+        # Keep only the highest receipt per (conversation, user)
+        latest: dict[tuple[int, int], int] = {}
+        for receipt in receipts:
+            key = (int(receipt["conversation_id"]), int(receipt["user_id"]))
+            latest[key] = max(latest.get(key, 0), int(receipt["up_to_message_id"]))
+
+        if not latest:
+            return 0
+
+        rows = [
+            {
+                "conversation_id": conversation_id,
+                "user_id": user_id,
+                "last_read_message_id": up_to_message_id,
+            }
+            for (conversation_id, user_id), up_to_message_id in latest.items()
+        ]
+
+        stmt = insert(ParticipantReadState).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["conversation_id", "user_id"],
+            set_={
+                "last_read_message_id": func.greatest(
+                    ParticipantReadState.last_read_message_id,
+                    stmt.excluded.last_read_message_id,
+                ),
+                "last_read_at": func.now(),
+            },
+        )
+        await self.session.execute(stmt)
+
+        await self.session.execute(
+            update(Message)
+            .where(
+                or_(
+                    *[
+                        and_(
+                            Message.conversation_id == conversation_id,
+                            Message.sender_id != user_id,
+                            Message.id <= up_to_message_id,
+                            Message.is_read.is_(False),
+                        )
+                        for (
+                            conversation_id,
+                            user_id,
+                        ), up_to_message_id in latest.items()
+                    ]
+                )
+            )
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+
+        # Recount what is still unread for each reader
+        for (conversation_id, user_id), _ in latest.items():
+            unread = (
+                select(func.count(Message.id))
+                .where(
+                    Message.conversation_id == conversation_id,
+                    Message.sender_id != user_id,
+                    Message.is_read.is_(False),
+                )
+                .scalar_subquery()
+            )
+            await self.session.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    unread_count_user1=case(
+                        (Conversation.user1_id == user_id, unread),
+                        else_=Conversation.unread_count_user1,
+                    ),
+                    unread_count_user2=case(
+                        (Conversation.user2_id == user_id, unread),
+                        else_=Conversation.unread_count_user2,
+                    ),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.execute(
+                update(ConversationInbox)
+                .where(
+                    ConversationInbox.user_id == user_id,
+                    ConversationInbox.conversation_id == conversation_id,
+                )
+                .values(unread_count=unread)
+                .execution_options(synchronize_session=False)
+            )
+
+        await self.session.commit()
+
+        return len(latest)
+
     # Notifications operations
     async def create_notification(
         self,
@@ -1155,7 +1666,8 @@ async def find_candidates_handler(request: web.Request) -> web.Response:
                 user_id, limit, cursor, **filters
             )
 
-        return web.json_response(result)
+        with stage("serialization"):
+            return web.json_response(result)
 
     except ValueError:
         return web.json_response({"error": "Invalid parameters"}, status=400)
@@ -1279,6 +1791,67 @@ async def create_or_update_user_handler(request: web.Request) -> web.Response:
         return web.json_response({"error": str(e)}, status=500)
 
 
+async def login_user_handler(request: web.Request) -> web.Response:
+    """Upsert a user and load everything needed at login.
+
+    POST /data/users/login
+    Body: same as /data/users/create_or_update
+
+    The user upsert, profile and notification preferences lookup run in a
+    single transaction. Profile and preferences are null for new users.
+    """
+    try:
+        data = await request.json()
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session, session.begin():
+            from sqlalchemy import select
+
+            from bot.repository import ProfileRepository
+            from services.data.models.notification_preferences import (
+                NotificationPreferences,
+            )
+
+            repository = ProfileRepository(session)
+            user = await repository.create_or_update_user(
+                tg_id=data["tg_id"],
+                username=data.get("username"),
+                first_name=data.get("first_name"),
+                language_code=data.get("language_code"),
+                is_premium=data.get("is_premium", False),
+            )
+
+            profile = await DataService(session).get_profile(user.id)
+
+            result = await session.execute(
+                select(NotificationPreferences).where(
+                    NotificationPreferences.user_id == user.id
+                )
+            )
+            preferences = result.scalar_one_or_none()
+
+            return web.json_response(
+                {
+                    "user": {
+                        "id": user.id,
+                        "tg_id": user.tg_id,
+                        "username": user.username,
+                        "first_name": user.first_name,
+                        "last_name": data.get("last_name"),
+                        "created_at": user.created_at.isoformat(),
+                        "updated_at": user.updated_at.isoformat(),
+                    },
+                    "profile": profile,
+                    "preferences": preferences.to_dict() if preferences else None,
+                }
+            )
+    except KeyError:
+        return web.json_response({"error": "tg_id is required"}, status=400)
+    except Exception as e:
+        logger.error(f"Error logging in user: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
 async def health_handler(request: web.Request) -> web.Response:
     """Health check endpoint."""
     from core.health import comprehensive_health_check
@@ -1619,8 +2192,8 @@ async def get_notification_preferences_handler(request: web.Request) -> web.Resp
         user_id = request.match_info["user_id"]
 
         # Get database session
-        session_factory = request.app["session_factory"]
-        async with session_factory() as session:
+        session_maker = request.app["session_maker"]
+        async with session_maker() as session:
             from sqlalchemy import select
 
             from services.data.models.notification_preferences import (
@@ -1662,12 +2235,13 @@ async def update_notification_preferences_handler(request: web.Request) -> web.R
         data = await request.json()
 
         # Get database session
-        session_factory = request.app["session_factory"]
-        async with session_factory() as session:
-            from datetime import datetime
+        session_maker = request.app["session_maker"]
+        async with session_maker() as session:
+            from datetime import datetime, time
 
-            from sqlalchemy import select
+            from sqlalchemy import insert, select
 
+            from bot.db import OutboxEvent
             from services.data.models.notification_preferences import (
                 NotificationPreferences,
             )
@@ -1686,10 +2260,21 @@ async def update_notification_preferences_handler(request: web.Request) -> web.R
 
             # Update preferences
             for key, value in data.items():
+                if key in ("quiet_hours_start", "quiet_hours_end") and value:
+                    value = time.fromisoformat(value)
                 if hasattr(preferences, key):
                     setattr(preferences, key, value)
 
             preferences.updated_at = datetime.utcnow()
+
+            # Notification service caches preferences until told otherwise
+            await session.execute(
+                insert(OutboxEvent).values(
+                    event_type="preferences.updated",
+                    aggregate_key=f"user:{user_id}",
+                    payload={"user_id": user_id},
+                )
+            )
             await session.commit()
 
             return web.json_response(preferences.to_dict())
@@ -1707,6 +2292,288 @@ async def update_notification_preferences_handler(request: web.Request) -> web.R
         )
 
 
+async def create_message_handler(request: web.Request) -> web.Response:
+    """Create a message in a conversation.
+
+    POST /data/chat/conversations/{conversation_id}/messages
+    Body: {"sender_id": 123, "content": "...", "content_type": "text",
+           "idempotency_key": "optional"}
+    """
+    try:
+        conversation_id = int(request.match_info["conversation_id"])
+        data = await request.json()
+        sender_id = data.get("sender_id")
+        content = data.get("content")
+
+        if not sender_id or not content:
+            return web.json_response(
+                {"error": "sender_id and content are required"}, status=400
+            )
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            result = await data_service.create_message(
+                conversation_id,
+                int(sender_id),
+                content,
+                data.get("content_type", "text"),
+                data.get("idempotency_key"),
+            )
+
+        return web.json_response(result, status=201)
+
+    except ValueError:
+        return web.json_response({"error": "Invalid parameters"}, status=400)
+    except Exception as e:
+        logger.error(f"Error creating message: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def get_conversation_participants_handler(
+    request: web.Request,
+) -> web.Response:
+    """Get the participants of a conversation.
+
+    GET /data/chat/conversations/{conversation_id}/participants
+    """
+    try:
+        conversation_id = int(request.match_info["conversation_id"])
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            result = await data_service.get_conversation_participants(conversation_id)
+
+        if result is None:
+            return web.json_response({"error": "Conversation not found"}, status=404)
+
+        return web.json_response(result)
+
+    except ValueError:
+        return web.json_response({"error": "Invalid conversation_id"}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting conversation participants: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def get_conversations_handler(request: web.Request) -> web.Response:
+    """Get a page of a user's conversation inbox.
+
+    GET /data/chat/conversations?user_id=123&limit=20&cursor=...&with_unread_only=true
+    """
+    try:
+        user_id = int(request.query.get("user_id", 0))
+        limit = min(int(request.query.get("limit", 20)), 100)
+        cursor = request.query.get("cursor")
+        with_unread_only = (
+            request.query.get("with_unread_only", "false").lower() == "true"
+        )
+
+        if not user_id:
+            return web.json_response({"error": "user_id is required"}, status=400)
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            result = await data_service.get_conversations(
+                user_id, limit, cursor, with_unread_only
+            )
+
+        return web.json_response(result)
+
+    except ValueError:
+        return web.json_response({"error": "Invalid parameters"}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting conversations: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def get_messages_handler(request: web.Request) -> web.Response:
+    """Get a page of messages for a conversation.
+
+    GET /data/chat/conversations/{conversation_id}/messages?limit=50&before_id=123
+    """
+    try:
+        conversation_id = int(request.match_info["conversation_id"])
+        limit = min(int(request.query.get("limit", 50)), 100)
+        before_id = request.query.get("before_id")
+        after_id = request.query.get("after_id")
+
+        if limit < 1:
+            return web.json_response({"error": "limit must be positive"}, status=400)
+
+        if before_id and after_id:
+            return web.json_response(
+                {"error": "before_id and after_id are mutually exclusive"}, status=400
+            )
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            result = await data_service.get_messages(
+                conversation_id,
+                limit,
+                before_id=int(before_id) if before_id else None,
+                after_id=int(after_id) if after_id else None,
+            )
+
+        return web.json_response(result)
+
+    except ValueError:
+        return web.json_response({"error": "Invalid parameters"}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting messages: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def update_read_state_handler(request: web.Request) -> web.Response:
+    """Update read state of one participant.
+
+    PUT /data/chat/conversations/{conversation_id}/read-state
+    Body: {"user_id": 123, "up_to_message_id": 456}
+    """
+    try:
+        conversation_id = int(request.match_info["conversation_id"])
+        data = await request.json()
+        user_id = data.get("user_id")
+        up_to_message_id = data.get("up_to_message_id")
+
+        if not user_id or not up_to_message_id:
+            return web.json_response(
+                {"error": "user_id and up_to_message_id are required"}, status=400
+            )
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            await data_service.update_read_states(
+                [
+                    {
+                        "conversation_id": conversation_id,
+                        "user_id": user_id,
+                        "up_to_message_id": up_to_message_id,
+                    }
+                ]
+            )
+
+        return web.json_response({"success": True})
+
+    except ValueError:
+        return web.json_response({"error": "Invalid parameters"}, status=400)
+    except Exception as e:
+        logger.error(f"Error updating read state: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def update_read_states_batch_handler(request: web.Request) -> web.Response:
+    """Apply a batch of coalesced read receipts.
+
+    PUT /data/chat/read-states
+    Body: {"receipts": [{"conversation_id": 1, "user_id": 2, "up_to_message_id": 3}]}
+    """
+    try:
+        data = await request.json()
+        receipts = data.get("receipts") or []
+
+        for receipt in receipts:
+            if not all(
+                receipt.get(field)
+                for field in ("conversation_id", "user_id", "up_to_message_id")
+            ):
+                return web.json_response(
+                    {
+                        "error": "conversation_id, user_id and up_to_message_id are required"
+                    },
+                    status=400,
+                )
+
+        session_maker = request.app["session_maker"]
+
+        async with session_maker() as session:
+            data_service = DataService(session)
+            applied = await data_service.update_read_states(receipts)
+
+        return web.json_response({"applied": applied})
+
+    except ValueError:
+        return web.json_response({"error": "Invalid parameters"}, status=400)
+    except Exception as e:
+        logger.error(f"Error applying read receipts: {e}", exc_info=True)
+        return web.json_response({"error": "Internal server error"}, status=500)
+
+
+async def start_message_ingest(app: web.Application) -> None:
+    """Start consuming the write-behind chat message queue."""
+    from sqlalchemy.exc import DataError, IntegrityError
+
+    from core.messaging.ingest import BatchedQueueConsumer
+
+    session_maker = app["session_maker"]
+
+    async def persist_batch(items: list[dict[str, Any]]) -> None:
+        async with session_maker() as session:
+            data_service = DataService(session)
+            created = await data_service.create_messages_batch(items)
+        logger.debug(f"Persisted {len(created)} of {len(items)} queued messages")
+
+    consumer = BatchedQueueConsumer(
+        app["config"]["rabbitmq_url"],
+        persist_batch,
+        batch_size=app["config"].get("message_ingest_batch_size", 200),
+        # Rows the database refuses will never succeed on redelivery
+        permanent_errors=(IntegrityError, DataError, ValueError, KeyError, TypeError),
+    )
+    await consumer.connect()
+    await consumer.start_consuming()
+    app["message_ingest_consumer"] = consumer
+    logger.info("Message ingest consumer started")
+
+
+async def stop_message_ingest(app: web.Application) -> None:
+    """Flush and stop the write-behind chat message consumer."""
+    consumer = app.get("message_ingest_consumer")
+    if consumer:
+        await consumer.close()
+        logger.info("Message ingest consumer stopped")
+
+
+async def start_outbox_relay(app: web.Application) -> None:
+    """Start relaying transactional outbox events to RabbitMQ."""
+    from core.messaging.publisher import EventPublisher
+    from services.data.outbox import OutboxRelay
+
+    publisher = EventPublisher(
+        app["config"]["rabbitmq_url"],
+        serializer=app["config"].get("event_serializer", "json"),
+    )
+
+    # The relay connects in the background, so startup does not need RabbitMQ
+    relay = OutboxRelay(
+        app["session_maker"],
+        publisher,
+        batch_size=app["config"].get("outbox_batch_size", 500),
+    )
+    await relay.start()
+    app["outbox_publisher"] = publisher
+    app["outbox_relay"] = relay
+    logger.info("Outbox relay started")
+
+
+async def stop_outbox_relay(app: web.Application) -> None:
+    """Stop the outbox relay; pending events are relayed after restart."""
+    relay = app.get("outbox_relay")
+    if relay:
+        await relay.stop()
+        await app["outbox_publisher"].close()
+        logger.info("Outbox relay stopped")
+
+
 def create_app(config: dict) -> web.Application:
     """Create and configure the Data Service application."""
     app = web.Application()
@@ -1722,6 +2589,8 @@ def create_app(config: dict) -> web.Application:
         pool_size=pool_config["pool_size"],
         max_overflow=pool_config["max_overflow"],
     )
+    instrument_engine(engine)
+    install_statement_timeout(engine)
     async_session_maker = create_session_factory(engine)
 
     # Store session maker for creating data service instances
@@ -1731,7 +2600,14 @@ def create_app(config: dict) -> web.Application:
     # Setup standard middleware stack (no auth for data service)
     from core.middleware.standard_stack import setup_standard_middleware_stack
 
-    setup_standard_middleware_stack(app, "data-service", use_auth=False, use_audit=True)
+    # Never admit more concurrent requests than the pool can serve
+    setup_standard_middleware_stack(
+        app,
+        "data-service",
+        use_auth=False,
+        use_audit=True,
+        max_concurrency=pool_config["pool_size"] + pool_config["max_overflow"],
+    )
 
     # Add metrics endpoint
     add_metrics_route(app, "data-service")
@@ -1751,6 +2627,7 @@ def create_app(config: dict) -> web.Application:
     app.router.add_get("/data/users", list_users_handler)
     app.router.add_put("/data/users/{user_id}", update_user_handler)
     app.router.add_post("/data/users/create_or_update", create_or_update_user_handler)
+    app.router.add_post("/data/users/login", login_user_handler)
 
     # Statistics routes
     app.router.add_get("/data/stats", get_stats_handler)
@@ -1765,6 +2642,24 @@ def create_app(config: dict) -> web.Application:
     app.router.add_post("/data/interactions", create_interaction_handler)
     app.router.add_get("/data/matches", get_matches_handler)
 
+    # Chat routes
+    app.router.add_get("/data/chat/conversations", get_conversations_handler)
+    app.router.add_get(
+        "/data/chat/conversations/{conversation_id}/participants",
+        get_conversation_participants_handler,
+    )
+    app.router.add_get(
+        "/data/chat/conversations/{conversation_id}/messages", get_messages_handler
+    )
+    app.router.add_post(
+        "/data/chat/conversations/{conversation_id}/messages", create_message_handler
+    )
+    app.router.add_put(
+        "/data/chat/conversations/{conversation_id}/read-state",
+        update_read_state_handler,
+    )
+    app.router.add_put("/data/chat/read-states", update_read_states_batch_handler)
+
     # Moderation routes
     app.router.add_get("/moderation/queue", get_moderation_queue_handler)
     app.router.add_post(
@@ -1782,6 +2677,18 @@ def create_app(config: dict) -> web.Application:
         update_notification_preferences_handler,
     )
 
+    # Write-behind chat message ingestion
+    if config.get("message_ingest_mode") == "write_behind" and config.get(
+        "rabbitmq_url"
+    ):
+        app.on_startup.append(start_message_ingest)
+        app.on_cleanup.append(stop_message_ingest)
+
+    # Transactional outbox relay
+    if config.get("rabbitmq_url") and config.get("outbox_relay_enabled", True):
+        app.on_startup.append(start_outbox_relay)
+        app.on_cleanup.append(stop_outbox_relay)
+
     return app
 
 
@@ -1802,6 +2709,13 @@ async def main():
         ),
         "data_service_host": os.getenv("DATA_SERVICE_HOST", "0.0.0.0"),
         "data_service_port": int(os.getenv("DATA_SERVICE_PORT", "8088")),
+        "rabbitmq_url": os.getenv("RABBITMQ_URL"),
+        "message_ingest_mode": os.getenv("CHAT_MESSAGE_INGEST_MODE", "sync"),
+        "message_ingest_batch_size": int(os.getenv("MESSAGE_INGEST_BATCH_SIZE", "200")),
+        "event_serializer": os.getenv("EVENT_SERIALIZER", "json"),
+        "outbox_relay_enabled": os.getenv("OUTBOX_RELAY_ENABLED", "true").lower()
+        == "true",
+        "outbox_batch_size": int(os.getenv("OUTBOX_BATCH_SIZE", "500")),
     }
 
     # Create and run the aiohttp application
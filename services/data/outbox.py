@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+"""Relay publishing transactional outbox events to RabbitMQ.
+
+Domain changes write their events to ``outbox_events`` in the same
+transaction, so an event exists if and only if the change committed. The
+relay drains the table in id order:
+
+* one relay is active at a time (Postgres advisory lock), so events are read
+  in commit order even with several data service replicas;
+* events with the same aggregate key are published one after another, events
+  of different keys concurrently;
+* rows are deleted only after the broker confirmed them, in the same
+  transaction that locked them. A crash in between republishes the event with
+  the same message id (``outbox-<id>``), which consumers deduplicate.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any
+
+from prometheus_client import Counter, Gauge
+
+from core.messaging.publisher import EventPublisher
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_xact_lock
+OUTBOX_RELAY_LOCK_ID = 0x6F7574626F78
+
+OUTBOX_EVENTS_RELAYED = Counter(
+    "outbox_events_relayed_total", "Outbox events confirmed by the broker"
+)
+OUTBOX_RELAY_FAILURES = Counter(
+    "outbox_relay_failures_total", "Outbox events that failed to publish"
+)
+OUTBOX_BATCH_SIZE = Gauge(
+    "outbox_relay_batch_size", "Outbox events picked up in the last relay batch"
+)
+
+
+class OutboxRelay:
+    """Publishes committed outbox events through the event publisher."""
+
+    def __init__(
+        self,
+        session_maker,
+        publisher: EventPublisher,
+        batch_size: int = 500,
+        poll_interval: float = 0.5,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        """Initialize relay.
+
+        Args:
+            session_maker: Async SQLAlchemy session factory
+            publisher: Event publisher (publisher confirms enabled); connected
+                by the relay loop, so RabbitMQ may be down at startup
+            batch_size: Maximum events relayed per transaction
+            poll_interval: Seconds to wait when the outbox is empty
+            reconnect_delay: Initial backoff between connection attempts
+            max_reconnect_delay: Upper bound of the connection backoff
+        """
+        self.session_maker = session_maker
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the background relay loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the relay loop; unpublished events stay in the outbox."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _connect(self) -> None:
+        """Connect the publisher, retrying with exponential backoff."""
+        delay = self.reconnect_delay
+        while self.publisher.exchange is None:
+            try:
+                await self.publisher.connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(
+                    f"RabbitMQ unavailable, outbox relay retrying in {delay:.0f}s"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _run(self) -> None:
+        """Relay batches until the outbox is empty, then poll."""
+        while True:
+            # Events keep accumulating in the outbox while the broker is down
+            await self._connect()
+            try:
+                relayed = await self.relay_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}", exc_info=True)
+                relayed = 0
+
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of outbox events.
+
+        Returns:
+            Number of events confirmed and removed from the outbox
+        """
+        from sqlalchemy import delete, func, select
+
+        from bot.db import OutboxEvent
+
+        async with self.session_maker() as session:
+            async with session.begin():
+                leader = await session.scalar(
+                    select(func.pg_try_advisory_xact_lock(OUTBOX_RELAY_LOCK_ID))
+                )
+                if not leader:
+                    return 0
+
+                result = await session.execute(
+                    select(OutboxEvent)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                events = list(result.scalars().all())
+                OUTBOX_BATCH_SIZE.set(len(events))
+                if not events:
+                    return 0
+
+                published = await self.publish_events(events)
+                if published:
+                    await session.execute(
+                        delete(OutboxEvent).where(OutboxEvent.id.in_(published))
+                    )
+
+        return len(published)
+
+    async def publish_events(self, events: list[Any]) -> list[int]:
+        """Publish events, keeping per-key order.
+
+        Each aggregate key is published sequentially and stops at its first
+        failure, so a later event never overtakes an earlier one of the same
+        key. Keys are published concurrently.
+
+        Args:
+            events: Outbox rows sorted by id
+
+        Returns:
+            Ids of the events the broker confirmed
+        """
+        streams: dict[Any, list[Any]] = defaultdict(list)
+        for event in events:
+            streams[event.aggregate_key or f"event:{event.id}"].append(event)
+
+        results = await asyncio.gather(
+            *(self._publish_stream(stream) for stream in streams.values())
+        )
+        return [event_id for stream_ids in results for event_id in stream_ids]
+
+    async def _publish_stream(self, stream: list[Any]) -> list[int]:
+        """Publish the events of one key in order until one fails."""
+        published = []
+        for event in stream:
+            ok = await self.publisher.publish_event(
+                event.event_type,
+                event.payload,
+                correlation_id=event.correlation_id,
+                message_id=f"outbox-{event.id}",
+            )
+            if not ok:
+                OUTBOX_RELAY_FAILURES.inc()
+                break
+            published.append(event.id)
+
+        OUTBOX_EVENTS_RELAYED.inc(len(published))
+        return published
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""Durable store for notification digests that were not sent yet.
+
+Events are acknowledged to RabbitMQ as soon as they are added to a digest, so
+the digest itself has to survive a restart. Each pending digest is kept in a
+local SQLite database until the bot confirmed it (or it was dropped) and is
+loaded back into the scheduler on startup.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    notification_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    latest TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class DigestStore:
+    """SQLite-backed store of pending digests.
+
+    SQLite calls are short and run in a worker thread so they never block the
+    event loop.
+    """
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the digest database.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    async def save(self, digest: dict[str, Any]) -> None:
+        """Insert or replace a digest.
+
+        Args:
+            digest: Dictionary with id, user_id, notification_type, count,
+                latest, due_at (Unix time) and attempts
+        """
+        row = (
+            digest["id"],
+            digest["user_id"],
+            digest["notification_type"],
+            digest["count"],
+            json.dumps(digest["latest"]),
+            digest["due_at"],
+            digest["attempts"],
+        )
+
+        def upsert() -> None:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO digests (id, user_id, "
+                    "notification_type, count, latest, due_at, attempts) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+
+        await asyncio.to_thread(upsert)
+
+    async def delete(self, digest_ids: list[str]) -> None:
+        """Remove sent or dropped digests in one transaction."""
+        if not digest_ids:
+            return
+
+        def delete() -> None:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "DELETE FROM digests WHERE id = ?",
+                    [(digest_id,) for digest_id in digest_ids],
+                )
+
+        await asyncio.to_thread(delete)
+
+    async def load(self) -> list[dict[str, Any]]:
+        """Get all stored digests, oldest due first."""
+
+        def select() -> list[dict[str, Any]]:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, user_id, notification_type, count, latest, due_at, "
+                    "attempts FROM digests ORDER BY due_at"
+                ).fetchall()
+            return [
+                {
+                    "id": row[0],
+                    "user_id": row[1],
+                    "notification_type": row[2],
+                    "count": row[3],
+                    "latest": json.loads(row[4]),
+                    "due_at": row[5],
+                    "attempts": row[6],
+                }
+                for row in rows
+            ]
+
+        return await asyncio.to_thread(select)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
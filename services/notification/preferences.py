@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+"""Cached, precompiled notification preferences.
+
+Preferences are fetched from the data service once per user and kept in a
+compiled form: notification types become a frozenset and quiet hours become
+minute-of-day ranges in the user's time zone, so checking a notification is a
+few integer comparisons. Entries expire after a TTL and are dropped early
+when the data service publishes ``preferences.updated``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Preference field controlling each notification type, with its default
+TYPE_FIELDS = {
+    "new_match": ("new_matches", True),
+    "new_message": ("new_messages", True),
+    "super_like": ("super_likes", True),
+    "like": ("likes", True),
+    "profile_view": ("profile_views", False),
+    "verification_update": ("verification_updates", True),
+    "marketing": ("marketing", False),
+    "reminder": ("reminders", True),
+}
+
+PREFERENCE_CACHE_LOOKUPS = Counter(
+    "notification_preference_cache_total",
+    "Notification preference cache lookups",
+    ["result"],
+)
+
+
+def parse_minute_of_day(value: str) -> int:
+    """Parse "HH:MM" or "HH:MM:SS" into minutes since midnight.
+
+    Raises:
+        ValueError: If the value is not a valid time of day
+    """
+    parts = value.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time of day: {value}")
+
+    hours, minutes = int(parts[0]), int(parts[1])
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time of day: {value}")
+
+    return hours * 60 + minutes
+
+
+def compile_quiet_hours(
+    start: str | None, end: str | None
+) -> tuple[tuple[int, int], ...]:
+    """Turn a quiet-hours window into half-open minute ranges.
+
+    A window crossing midnight (e.g. 22:00-07:00) becomes two ranges.
+    """
+    if not start or not end:
+        return ()
+
+    start_minute = parse_minute_of_day(start)
+    end_minute = parse_minute_of_day(end)
+
+    if start_minute == end_minute:
+        return ()
+    if start_minute < end_minute:
+        return ((start_minute, end_minute),)
+    return ((start_minute, MINUTES_PER_DAY), (0, end_minute))
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPreferences:
+    """Notification preferences ready for cheap evaluation."""
+
+    push_enabled: bool = True
+    enabled_types: frozenset[str] = frozenset(
+        name for name, (_, default) in TYPE_FIELDS.items() if default
+    )
+    quiet_ranges: tuple[tuple[int, int], ...] = ()
+    tz: ZoneInfo = ZoneInfo("UTC")
+
+    @classmethod
+    def from_dict(cls, preferences: dict[str, Any]) -> CompiledPreferences:
+        """Compile the preferences document returned by the data service."""
+        try:
+            tz = ZoneInfo(preferences.get("timezone") or "UTC")
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = ZoneInfo("UTC")
+
+        try:
+            quiet_ranges = compile_quiet_hours(
+                preferences.get("quiet_hours_start"),
+                preferences.get("quiet_hours_end"),
+            )
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid quiet hours: {e}")
+            quiet_ranges = ()
+
+        return cls(
+            push_enabled=bool(preferences.get("push_enabled", True)),
+            enabled_types=frozenset(
+                name
+                for name, (field, default) in TYPE_FIELDS.items()
+                if preferences.get(field, default)
+            ),
+            quiet_ranges=quiet_ranges,
+            tz=tz,
+        )
+
+    def is_quiet(self, now: datetime | None = None) -> bool:
+        """Check whether ``now`` (default: current time) is in quiet hours."""
+        if not self.quiet_ranges:
+            return False
+
+        local = (now or datetime.now(self.tz)).astimezone(self.tz)
+        minute = local.hour * 60 + local.minute
+        return any(start <= minute < end for start, end in self.quiet_ranges)
+
+    def quiet_until(self, now: datetime | None = None) -> datetime | None:
+        """Return when the current quiet period ends, or None if not quiet."""
+        if not self.quiet_ranges:
+            return None
+
+        local = (now or datetime.now(self.tz)).astimezone(self.tz)
+        minute = local.hour * 60 + local.minute
+        for start, end in self.quiet_ranges:
+            if start <= minute < end:
+                # A window crossing midnight continues in the range from 0
+                if end == MINUTES_PER_DAY:
+                    end += next(
+                        (e for s, e in self.quiet_ranges if s == 0 and e != end), 0
+                    )
+                return local.replace(second=0, microsecond=0) + timedelta(
+                    minutes=end - minute
+                )
+        return None
+
+    def type_enabled(self, notification_type: str) -> bool:
+        """Check the channel and per-type switches, ignoring quiet hours."""
+        if not self.push_enabled:
+            return False
+        # Unknown types are allowed, as before
+        return (
+            notification_type in self.enabled_types
+            or notification_type not in TYPE_FIELDS
+        )
+
+    def allows(self, notification_type: str, now: datetime | None = None) -> bool:
+        """Check if a notification of this type may be sent now."""
+        return self.type_enabled(notification_type) and not self.is_quiet(now)
+
+
+DEFAULT_PREFERENCES = CompiledPreferences()
+
+
+class PreferenceCache:
+    """TTL cache of compiled preferences with single-flight loading.
+
+    Concurrent lookups of the same missing user share one fetch, so a burst
+    of events for one user costs at most one data service call.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[dict[str, Any] | None]],
+        ttl: float = 300.0,
+        error_ttl: float = 30.0,
+        max_size: int = 100000,
+    ):
+        """Initialize cache.
+
+        Args:
+            fetch: Coroutine returning the preferences document of a user, or
+                None if it could not be loaded
+            ttl: Seconds a loaded entry stays valid
+            error_ttl: Seconds defaults are used after a failed load
+            max_size: Maximum cached users (least recently used are evicted)
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, CompiledPreferences]] = (
+            OrderedDict()
+        )
+        self._loading: dict[str, asyncio.Future] = {}
+
+    async def get(self, user_id: str) -> CompiledPreferences:
+        """Get compiled preferences of a user."""
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            PREFERENCE_CACHE_LOOKUPS.labels(result="hit").inc()
+            return entry[1]
+
+        pending = self._loading.get(user_id)
+        if pending:
+            PREFERENCE_CACHE_LOOKUPS.labels(result="coalesced").inc()
+            return await asyncio.shield(pending)
+
+        PREFERENCE_CACHE_LOOKUPS.labels(result="miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        try:
+            compiled, ttl = await self._load(user_id)
+            # Skip caching if the user was invalidated while loading
+            if self._loading.get(user_id) is future:
+                self._store(user_id, compiled, ttl)
+            future.set_result(compiled)
+            return compiled
+        finally:
+            if not future.done():
+                future.set_result(DEFAULT_PREFERENCES)
+            if self._loading.get(user_id) is future:
+                del self._loading[user_id]
+
+    async def get_many(self, user_ids: Iterable[str]) -> dict[str, CompiledPreferences]:
+        """Get compiled preferences of several users.
+
+        Each distinct user is looked up once and misses are loaded
+        concurrently.
+        """
+        unique = list(dict.fromkeys(user_ids))
+        results = await asyncio.gather(*(self.get(user_id) for user_id in unique))
+        return dict(zip(unique, results, strict=True))
+
+    async def _load(self, user_id: str) -> tuple[CompiledPreferences, float]:
+        """Fetch and compile preferences, falling back to defaults.
+
+        Returns:
+            Compiled preferences and how long to cache them
+        """
+        try:
+            document = await self.fetch(user_id)
+        except Exception as e:
+            logger.warning(f"Error loading notification preferences for {user_id}: {e}")
+            document = None
+
+        if document is None:
+            # Allow notifications by default, retry the load soon
+            return DEFAULT_PREFERENCES, self.error_ttl
+
+        return CompiledPreferences.from_dict(document), self.ttl
+
+    def _store(self, user_id: str, compiled: CompiledPreferences, ttl: float):
+        """Cache an entry and evict the least recently used ones."""
+        self._entries[user_id] = (time.monotonic() + ttl, compiled)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's entry so the next lookup reloads it."""
+        self._entries.pop(str(user_id), None)
+        self._loading.pop(str(user_id), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+"""Notification scheduler: per-user digests and rate-limited dispatch.
+
+Notifications are not sent as they arrive. Each (user, type) pair collects
+events for ``window`` seconds and is then sent as one digest ("5 new likes").
+Digests that fall into the user's quiet hours are deferred until the quiet
+period ends instead of being dropped. Ready digests are dispatched to the bot
+by a bounded worker pool that respects Telegram's send limits through a
+global and a per-chat token bucket; failed sends are retried with backoff.
+
+With a ``DigestStore`` every digest is persisted until the bot accepted it,
+so events acknowledged to RabbitMQ are not lost on restart.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from prometheus_client import Counter, Gauge
+
+from services.notification.digest_store import DigestStore
+from services.notification.preferences import PreferenceCache
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_SCHEDULED = Counter(
+    "notification_scheduler_events_total",
+    "Notification events accepted by the scheduler",
+    ["notification_type"],
+)
+NOTIFICATIONS_DISPATCHED = Counter(
+    "notification_scheduler_dispatched_total",
+    "Notification digests handed to the bot",
+    ["notification_type", "result"],
+)
+NOTIFICATIONS_PENDING = Gauge(
+    "notification_scheduler_pending", "Digests waiting for their window or quiet hours"
+)
+
+
+class TokenBucket:
+    """Token bucket refilling ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how long the caller must wait for it."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_idle(self) -> bool:
+        """Whether the bucket is full again and can be forgotten."""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class Digest:
+    """Events of one type for one user, sent as a single notification."""
+
+    user_id: int
+    notification_type: str
+    due_at: float
+    count: int = 0
+    latest: dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+
+    @property
+    def key(self) -> tuple[int, str]:
+        """The (user, notification type) pair the digest collects."""
+        return (self.user_id, self.notification_type)
+
+    def payload(self) -> dict[str, Any]:
+        """Payload for the bot: the latest event plus the aggregated count."""
+        return {**self.latest, "count": self.count}
+
+    def to_record(self) -> dict[str, Any]:
+        """Serializable form with ``due_at`` as Unix time."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "notification_type": self.notification_type,
+            "count": self.count,
+            "latest": self.latest,
+            "due_at": time.time() + (self.due_at - time.monotonic()),
+            "attempts": self.attempts,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict[str, Any]) -> Digest:
+        """Rebuild a digest stored with ``to_record``."""
+        return cls(
+            record["user_id"],
+            record["notification_type"],
+            time.monotonic() + (record["due_at"] - time.time()),
+            count=record["count"],
+            latest=record["latest"],
+            id=record["id"],
+            attempts=record["attempts"],
+        )
+
+
+class NotificationScheduler:
+    """Aggregates notifications per user and dispatches them to the bot."""
+
+    def __init__(
+        self,
+        send: Callable[[int, str, dict[str, Any], str], Awaitable[bool]],
+        preferences: PreferenceCache,
+        window: float = 5.0,
+        workers: int = 16,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_pending: int = 100000,
+        store: DigestStore | None = None,
+        max_attempts: int = 5,
+        retry_delay: float = 30.0,
+    ):
+        """Initialize scheduler.
+
+        Args:
+            send: Coroutine delivering a digest as (user_id, type, payload,
+                digest_id), returning True on success; the digest id stays
+                the same across retries
+            preferences: Cache of compiled user preferences
+            window: Seconds events are collected before a digest is sent
+            workers: Concurrent bot calls
+            global_rate: Messages per second across all chats (Telegram ~30)
+            chat_rate: Messages per second to one chat (Telegram ~1)
+            chat_burst: Messages one chat may receive back to back
+            max_pending: Digests held before new users are dropped
+            store: Durable store for unsent digests; in memory only if None
+            max_attempts: Send attempts before a digest is given up
+            retry_delay: Seconds before the first retry, doubled per attempt
+        """
+        self.send = send
+        self.preferences = preferences
+        self.window = window
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_pending = max_pending
+        self.store = store
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.pending: dict[tuple[int, str], Digest] = {}
+        self.ready: asyncio.Queue[Digest] = asyncio.Queue(maxsize=workers * 4)
+        self._tasks: list[asyncio.Task] = []
+
+    async def schedule(
+        self, user_id: int, notification_type: str, data: dict[str, Any]
+    ) -> bool:
+        """Add an event to the user's digest for this notification type.
+
+        Returns once the digest is stored, so the event may be acknowledged.
+
+        Returns:
+            False if the scheduler is full and the event was dropped
+
+        Raises:
+            Exception: If the digest could not be stored; the event is not
+                counted and should be retried
+        """
+        key = (int(user_id), notification_type)
+        digest = self.pending.get(key)
+        created = digest is None
+        if digest is None:
+            if len(self.pending) >= self.max_pending:
+                logger.warning(f"Notification scheduler full, dropping {key}")
+                return False
+            digest = Digest(
+                int(user_id), notification_type, time.monotonic() + self.window
+            )
+            self.pending[key] = digest
+
+        previous = digest.latest
+        digest.count += 1
+        digest.latest = data
+        try:
+            await self._save(digest)
+        except Exception:
+            digest.count -= 1
+            digest.latest = previous
+            if created and digest.count == 0 and self.pending.get(key) is digest:
+                del self.pending[key]
+            raise
+
+        NOTIFICATIONS_SCHEDULED.labels(notification_type=notification_type).inc()
+        NOTIFICATIONS_PENDING.set(len(self.pending))
+        return True
+
+    async def start(self) -> None:
+        """Reload stored digests and start the window timer and workers."""
+        if self.store:
+            for record in await self.store.load():
+                digest = Digest.from_record(record)
+                merged = self._restore(digest)
+                if merged is not digest:
+                    await self._save(merged)
+                    await self._forget(digest)
+            NOTIFICATIONS_PENDING.set(len(self.pending))
+            logger.info(f"Loaded {len(self.pending)} stored notification digests")
+
+        self._tasks = [asyncio.create_task(self._release_loop())]
+        self._tasks += [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop background tasks.
+
+        Unsent digests stay in the store and are sent after a restart;
+        without a store they are discarded.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if not self.store and (self.pending or not self.ready.empty()):
+            logger.warning(
+                f"Discarding {len(self.pending) + self.ready.qsize()} "
+                "unsent notification digests"
+            )
+
+    async def _release_loop(self) -> None:
+        """Move digests whose window closed to the dispatch queue."""
+        tick = min(1.0, self.window / 5) or 0.1
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self.release_due()
+            except Exception as e:
+                logger.error(f"Notification release failed: {e}", exc_info=True)
+
+    async def release_due(self) -> None:
+        """Release due digests, deferring those in quiet hours."""
+        now = time.monotonic()
+        due = [digest for digest in self.pending.values() if digest.due_at <= now]
+        if not due:
+            self._forget_idle_chats()
+            return
+
+        # One concurrent lookup per distinct user instead of one per digest
+        preferences = await self.preferences.get_many(
+            str(digest.user_id) for digest in due
+        )
+
+        for digest in due:
+            if self.pending.get(digest.key) is not digest:
+                continue
+            user_preferences = preferences[str(digest.user_id)]
+
+            if not user_preferences.type_enabled(digest.notification_type):
+                del self.pending[digest.key]
+                await self._forget(digest)
+                NOTIFICATIONS_DISPATCHED.labels(
+                    notification_type=digest.notification_type, result="skipped"
+                ).inc()
+                continue
+
+            resume_at = user_preferences.quiet_until()
+            if resume_at:
+                # Keep collecting until quiet hours are over
+                delay = (resume_at - datetime.now(UTC)).total_seconds()
+                digest.due_at = time.monotonic() + max(delay, self.window)
+                await self._save(digest)
+                continue
+
+            del self.pending[digest.key]
+            await self.ready.put(digest)
+
+        NOTIFICATIONS_PENDING.set(len(self.pending))
+        self._forget_idle_chats()
+
+    async def _worker(self) -> None:
+        """Send ready digests within the global and per-chat limits."""
+        while True:
+            digest = await self.ready.get()
+            try:
+                await self._throttle(digest.user_id)
+                ok = await self.send(
+                    digest.user_id,
+                    digest.notification_type,
+                    digest.payload(),
+                    digest.id,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error sending {digest.notification_type} notification "
+                    f"to user {digest.user_id}: {e}"
+                )
+                ok = False
+
+            try:
+                if ok:
+                    await self._forget(digest)
+                else:
+                    await self._retry(digest)
+            except Exception as e:
+                logger.error(f"Failed to update stored digest {digest.id}: {e}")
+
+            NOTIFICATIONS_DISPATCHED.labels(
+                notification_type=digest.notification_type,
+                result="sent" if ok else "failed",
+            ).inc()
+
+    async def _retry(self, digest: Digest) -> None:
+        """Put a digest whose send failed back with exponential backoff."""
+        digest.attempts += 1
+        if digest.attempts >= self.max_attempts:
+            logger.error(
+                f"Giving up {digest.notification_type} notification to user "
+                f"{digest.user_id} after {digest.attempts} attempts"
+            )
+            await self._forget(digest)
+            return
+
+        digest.due_at = time.monotonic() + self.retry_delay * 2 ** (digest.attempts - 1)
+        merged = self._restore(digest)
+        await self._save(merged)
+        if merged is not digest:
+            await self._forget(digest)
+
+    def _restore(self, digest: Digest) -> Digest:
+        """Add a digest to pending, folding it into a newer one of its key.
+
+        Returns:
+            The pending digest now holding the events
+        """
+        current = self.pending.get(digest.key)
+        if current is None:
+            self.pending[digest.key] = digest
+            return digest
+
+        # The newer digest keeps its latest event and its window
+        current.count += digest.count
+        current.due_at = min(current.due_at, digest.due_at)
+        return current
+
+    async def _save(self, digest: Digest) -> None:
+        """Store a digest's current state."""
+        if self.store:
+            await self.store.save(digest.to_record())
+
+    async def _forget(self, digest: Digest) -> None:
+        """Remove a sent or dropped digest from the store."""
+        if self.store:
+            await self.store.delete([digest.id])
+
+    async def _throttle(self, user_id: int) -> None:
+        """Wait until both the chat and the global bucket allow a send."""
+        bucket = self.chat_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[user_id] = bucket
+
+        delay = bucket.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+        delay = self.global_bucket.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _forget_idle_chats(self) -> None:
+        """Drop per-chat buckets that are full again."""
+        for user_id in [u for u, b in self.chat_buckets.items() if b.is_idle()]:
+            del self.chat_buckets[user_id]
@@ -27,6 +27,7 @@ from core.middleware.error_handling import setup_error_handling
 from core.middleware.metrics_middleware import add_metrics_route
 from core.middleware.standard_stack import setup_standard_middleware_stack
 from core.resilience.circuit_breaker import data_service_breaker
+from core.resilience.deadline import client_timeout
 from core.resilience.retry import retry_data_service
 from core.utils.logging import configure_logging
 from core.utils.validation import validate_profile_data
@@ -86,7 +87,8 @@ async def _call_data_service(
             request=request,
         )
 
-    async with aiohttp.ClientSession() as session:
+    # Never wait longer than the caller's remaining budget
+    async with aiohttp.ClientSession(timeout=client_timeout(30)) as session:
         async with session.request(method, url, json=data, headers=headers) as resp:
             if resp.status >= 400:
                 raise ExternalServiceError(
@@ -0,0 +1,77 @@
+"""Tests for the auth login fast path."""
+
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.utils.security import TelegramInitDataValidator
+from services.auth.main import validate_telegram_init_data
+
+pytestmark = [
+    pytest.mark.unit,
+    pytest.mark.filterwarnings("ignore::aiohttp.web_exceptions.NotAppKeyWarning"),
+]
+
+BOT_TOKEN = "123456:test-bot-token"
+
+
+def make_init_data(user: dict) -> str:
+    """Build initData signed the way Telegram signs it."""
+    fields = {"auth_date": str(int(time.time())), "user": json.dumps(user)}
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(
+        secret_key, check_string.encode(), hashlib.sha256
+    ).hexdigest()
+    return urlencode(fields)
+
+
+async def test_login_uses_single_data_service_call():
+    """Login upserts and loads profile and preferences in one request."""
+    calls = []
+
+    async def data_login(request: web.Request) -> web.Response:
+        calls.append((request.method, request.path, await request.json()))
+        return web.json_response(
+            {
+                "user": {"id": 7, "tg_id": 1001, "username": "alice"},
+                "profile": {"user_id": 7, "name": "Alice"},
+                "preferences": None,
+            }
+        )
+
+    data_app = web.Application()
+    data_app.router.add_route("*", "/{tail:.*}", data_login)
+
+    async with TestServer(data_app) as data_server:
+        auth_app = web.Application()
+        auth_app["init_data_validator"] = TelegramInitDataValidator(BOT_TOKEN)
+        auth_app["config"] = {
+            "jwt_secret": "test-secret",
+            "data_service_url": str(data_server.make_url("")).rstrip("/"),
+        }
+        auth_app.router.add_post("/auth/validate", validate_telegram_init_data)
+
+        async with ClientSession() as http_session:
+            auth_app["http_session"] = http_session
+            async with TestClient(TestServer(auth_app)) as client:
+                init_data = make_init_data({"id": 1001, "username": "alice"})
+                resp = await client.post(
+                    "/auth/validate", json={"init_data": init_data}
+                )
+                body = await resp.json()
+
+    assert resp.status == 200
+    assert [(method, path) for method, path, _ in calls] == [
+        ("POST", "/data/users/login")
+    ]
+    assert calls[0][2]["tg_id"] == 1001
+    assert body["user"]["id"] == 7
+    assert body["profile"] == {"user_id": 7, "name": "Alice"}
+    assert body["preferences"] is None
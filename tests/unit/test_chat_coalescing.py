@@ -0,0 +1,209 @@
+"""Tests for chat typing/read-receipt coalescing."""
+
+import asyncio
+
+import pytest
+
+from services.chat import main as chat_main
+from services.chat.coalescing import ReadReceiptBatcher, TypingDebouncer
+
+pytestmark = pytest.mark.unit
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class TestTypingDebouncer:
+    """Test typing indicator debouncing."""
+
+    def test_forwards_state_changes_only(self, monkeypatch):
+        """Repeated "typing" frames are dropped until the state changes."""
+        now = [100.0]
+        monkeypatch.setattr("services.chat.coalescing.time.monotonic", lambda: now[0])
+        debouncer = TypingDebouncer(min_interval=1.0, refresh_interval=3.0)
+
+        assert debouncer.should_forward(1, 10, True) is True
+        now[0] += 0.1
+        assert debouncer.should_forward(1, 10, True) is False
+        now[0] += 1.0
+        assert debouncer.should_forward(1, 10, True) is False
+        assert debouncer.should_forward(1, 10, False) is True
+
+    def test_state_flips_are_rate_limited(self, monkeypatch):
+        """Alternating states within min_interval are held, not forwarded."""
+        now = [100.0]
+        monkeypatch.setattr("services.chat.coalescing.time.monotonic", lambda: now[0])
+        debouncer = TypingDebouncer(min_interval=1.0, refresh_interval=3.0)
+
+        assert debouncer.should_forward(1, 10, True) is True
+        for _ in range(5):
+            now[0] += 0.1
+            assert debouncer.should_forward(1, 10, False) is False
+            now[0] += 0.1
+            assert debouncer.should_forward(1, 10, True) is False
+        now[0] += 0.1
+        assert debouncer.should_forward(1, 10, False) is True
+
+    async def test_quick_stop_is_sent_trailing(self):
+        """Stopping right after starting still clears the indicator."""
+        debouncer = TypingDebouncer(min_interval=0.05, refresh_interval=3.0)
+        sent = []
+
+        async def forward(is_typing):
+            sent.append(is_typing)
+
+        assert debouncer.should_forward(1, 10, True) is True
+        assert debouncer.should_forward(1, 10, False) is False
+        debouncer.schedule_trailing(1, 10, forward)
+        debouncer.schedule_trailing(1, 10, forward)
+
+        await asyncio.sleep(0.1)
+        assert sent == [False]
+        assert debouncer.should_forward(1, 10, False) is False
+
+    async def test_reverted_change_is_not_sent(self):
+        """A held change undone before the timer fires is discarded."""
+        debouncer = TypingDebouncer(min_interval=0.05, refresh_interval=3.0)
+        sent = []
+
+        async def forward(is_typing):
+            sent.append(is_typing)
+
+        debouncer.should_forward(1, 10, True)
+        debouncer.should_forward(1, 10, False)
+        debouncer.schedule_trailing(1, 10, forward)
+        debouncer.should_forward(1, 10, True)
+
+        await asyncio.sleep(0.1)
+        assert sent == []
+
+    def test_refreshes_long_typing(self, monkeypatch):
+        """A user who keeps typing is re-announced after refresh_interval."""
+        now = [100.0]
+        monkeypatch.setattr("services.chat.coalescing.time.monotonic", lambda: now[0])
+        debouncer = TypingDebouncer(min_interval=1.0, refresh_interval=3.0)
+
+        assert debouncer.should_forward(1, 10, True) is True
+        now[0] += 3.5
+        assert debouncer.should_forward(1, 10, True) is True
+
+    def test_initial_stop_is_dropped(self):
+        """A "stopped typing" frame with no prior state is not forwarded."""
+        debouncer = TypingDebouncer()
+        assert debouncer.should_forward(1, 10, False) is False
+
+
+class TestReadReceiptBatcher:
+    """Test read receipt batching."""
+
+    async def test_collapses_to_highest_message_id(self):
+        """Only the highest receipt per conversation/user is flushed."""
+        flushed = []
+
+        async def flush_callback(batch):
+            flushed.append(batch)
+
+        batcher = ReadReceiptBatcher(flush_callback)
+
+        assert batcher.add(10, 1, 5) is True
+        assert batcher.add(10, 1, 9) is True
+        assert batcher.add(10, 1, 7) is False
+        assert batcher.add(11, 2, 3) is True
+
+        await batcher.flush()
+
+        assert len(flushed) == 1
+        assert sorted(flushed[0], key=lambda r: r["conversation_id"]) == [
+            {"conversation_id": 10, "user_id": 1, "up_to_message_id": 9},
+            {"conversation_id": 11, "user_id": 2, "up_to_message_id": 3},
+        ]
+        assert batcher.pending_count == 0
+
+    async def test_failed_flush_is_requeued(self):
+        """Receipts are kept when the backend call fails."""
+
+        async def flush_callback(batch):
+            raise RuntimeError("data service down")
+
+        batcher = ReadReceiptBatcher(flush_callback)
+        batcher.add(10, 1, 5)
+
+        await batcher.flush()
+
+        assert batcher.pending_count == 1
+
+    async def test_stop_flushes_pending(self):
+        """Stopping the background task flushes what is left."""
+        flushed = []
+
+        async def flush_callback(batch):
+            flushed.extend(batch)
+
+        batcher = ReadReceiptBatcher(flush_callback, flush_interval=60)
+        batcher.start()
+        batcher.add(10, 1, 5)
+
+        await batcher.stop()
+
+        assert flushed == [{"conversation_id": 10, "user_id": 1, "up_to_message_id": 5}]
+
+    async def test_rejected_receipt_is_dropped_alone(self):
+        """A receipt the backend rejects does not block the others."""
+        flushed = []
+
+        async def flush_callback(batch):
+            if any(r["conversation_id"] == 99 for r in batch):
+                raise ValueError("rejected")
+            flushed.extend(batch)
+
+        batcher = ReadReceiptBatcher(flush_callback, permanent_errors=(ValueError,))
+        batcher.add(10, 1, 5)
+        batcher.add(99, 1, 7)
+        batcher.add(11, 2, 3)
+
+        await batcher.flush()
+
+        assert sorted(r["conversation_id"] for r in flushed) == [10, 11]
+        assert batcher.pending_count == 0
+
+        batcher.add(12, 1, 4)
+        await batcher.flush()
+        assert flushed[-1]["conversation_id"] == 12
+
+
+class TestReadEventValidation:
+    """Test read receipts are validated before they are batched."""
+
+    @pytest.mark.parametrize(
+        "conversation_id, up_to_message_id", [(None, 5), ("abc", 5), (10, "x")]
+    )
+    async def test_invalid_ids_are_not_queued(
+        self, monkeypatch, conversation_id, up_to_message_id
+    ):
+        """Missing or non-numeric IDs get an error instead of being queued."""
+        batcher = ReadReceiptBatcher(lambda batch: None)
+        monkeypatch.setattr(chat_main, "read_receipt_batcher", batcher)
+        ws = FakeSocket()
+
+        await chat_main.handle_read_event(
+            ws, {"up_to_message_id": up_to_message_id}, 1, conversation_id
+        )
+
+        assert batcher.pending_count == 0
+        assert ws.sent[-1]["type"] == "error"
+
+    async def test_string_ids_are_coerced(self, monkeypatch):
+        """Numeric strings from the query string are queued as integers."""
+        batcher = ReadReceiptBatcher(lambda batch: None)
+        monkeypatch.setattr(chat_main, "read_receipt_batcher", batcher)
+        ws = FakeSocket()
+
+        await chat_main.handle_read_event(ws, {"up_to_message_id": "7"}, 1, "10")
+
+        assert batcher._pending == {(10, 1): 7}
+        assert ws.sent[-1]["type"] == "message.read"
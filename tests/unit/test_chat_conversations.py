@@ -0,0 +1,24 @@
+"""Tests for the chat-service conversation inbox endpoint."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from services.chat.main import get_conversations
+
+pytestmark = pytest.mark.unit
+
+
+async def test_unread_filter_forwarded_as_string():
+    """with_unread_only reaches the data service as a value yarl accepts."""
+    request = Mock()
+    request.query = {"user_id": "123", "with_unread_only": "true"}
+
+    with patch("services.chat.main._call_data_service") as mock_call:
+        mock_call.return_value = {"conversations": []}
+        response = await get_conversations(request)
+
+    assert response.status == 200
+    params = mock_call.call_args.kwargs["params"]
+    assert params["with_unread_only"] == "true"
+    assert not any(isinstance(value, bool) for value in params.values())
@@ -0,0 +1,153 @@
+"""Tests for chat WebSocket subprotocol negotiation and codecs."""
+
+import json
+from unittest.mock import AsyncMock, Mock
+
+import msgpack
+import pytest
+from aiohttp import WSMessage, WSMsgType, web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+
+from gateway.websocket_proxy import get_requested_subprotocols
+from services.chat.mux import select_subprotocol
+from services.chat.protocol import (
+    SUBPROTOCOL_JSON,
+    SUBPROTOCOL_MSGPACK,
+    SUPPORTED_SUBPROTOCOLS,
+    ChatConnection,
+)
+
+pytestmark = pytest.mark.unit
+
+EVENT = {"type": "message", "content": "привет", "conversation_id": 7}
+
+
+def make_connection(protocol):
+    ws = Mock()
+    ws.ws_protocol = protocol
+    ws.send_str = AsyncMock()
+    ws.send_bytes = AsyncMock()
+    return ChatConnection(ws)
+
+
+class TestChatConnection:
+    """Test encoding and decoding with the negotiated codec."""
+
+    @pytest.mark.parametrize("protocol", [None, SUBPROTOCOL_JSON])
+    async def test_json_mode_sends_text(self, protocol):
+        """JSON is the default and goes out as compact text frames."""
+        conn = make_connection(protocol)
+
+        await conn.send_json(EVENT)
+
+        assert conn.protocol == SUBPROTOCOL_JSON
+        conn.ws.send_bytes.assert_not_called()
+        sent = conn.ws.send_str.call_args.args[0]
+        assert json.loads(sent) == EVENT
+        assert " " not in sent.replace(EVENT["content"], "")
+
+    async def test_msgpack_mode_sends_binary(self):
+        """MessagePack goes out as binary frames."""
+        conn = make_connection(SUBPROTOCOL_MSGPACK)
+
+        await conn.send_json(EVENT)
+
+        assert conn.protocol == SUBPROTOCOL_MSGPACK
+        conn.ws.send_str.assert_not_called()
+        sent = conn.ws.send_bytes.call_args.args[0]
+        assert msgpack.unpackb(sent, raw=False) == EVENT
+
+    @pytest.mark.parametrize("protocol", [SUBPROTOCOL_JSON, SUBPROTOCOL_MSGPACK])
+    def test_decode_by_frame_type(self, protocol):
+        """Frames are decoded by their type, whatever was negotiated."""
+        conn = make_connection(protocol)
+
+        text = WSMessage(WSMsgType.TEXT, json.dumps(EVENT), None)
+        binary = WSMessage(WSMsgType.BINARY, msgpack.packb(EVENT), None)
+
+        assert conn.decode(text) == EVENT
+        assert conn.decode(binary) == EVENT
+
+    @pytest.mark.parametrize(
+        "msg",
+        [
+            WSMessage(WSMsgType.TEXT, "[1, 2]", None),
+            WSMessage(WSMsgType.TEXT, "not json", None),
+            WSMessage(WSMsgType.BINARY, msgpack.packb("text"), None),
+        ],
+    )
+    def test_decode_rejects_non_objects(self, msg):
+        """Frames that are not an object raise ValueError."""
+        conn = make_connection(SUBPROTOCOL_JSON)
+
+        with pytest.raises(ValueError):
+            conn.decode(msg)
+
+
+class TestSubprotocolSelection:
+    """Test how the gateway and chat agree on a subprotocol."""
+
+    def test_requested_subprotocols_keep_client_order(self):
+        """The gateway forwards offered subprotocols in the client's order."""
+        request = make_mocked_request(
+            "GET",
+            "/v1/chat/ws",
+            headers={
+                "Sec-WebSocket-Protocol": f"{SUBPROTOCOL_JSON} , {SUBPROTOCOL_MSGPACK},"
+            },
+        )
+
+        assert get_requested_subprotocols(request) == (
+            SUBPROTOCOL_JSON,
+            SUBPROTOCOL_MSGPACK,
+        )
+
+    def test_no_requested_subprotocols(self):
+        """A client without the header offers nothing."""
+        request = make_mocked_request("GET", "/v1/chat/ws")
+
+        assert get_requested_subprotocols(request) == ()
+
+    def test_select_first_supported(self):
+        """The first offered subprotocol that chat supports wins."""
+        offered = ["graphql-ws", SUBPROTOCOL_JSON, SUBPROTOCOL_MSGPACK]
+
+        assert select_subprotocol(offered) == SUBPROTOCOL_JSON
+
+    @pytest.mark.parametrize("offered", [None, [], ["graphql-ws"]])
+    def test_select_nothing_supported(self, offered):
+        """Without a supported offer no subprotocol is selected."""
+        assert select_subprotocol(offered) is None
+
+    async def test_handshake_picks_encoding(self):
+        """A client asking for MessagePack gets binary frames back."""
+
+        async def handler(request):
+            ws = web.WebSocketResponse(protocols=SUPPORTED_SUBPROTOCOLS)
+            await ws.prepare(request)
+            conn = ChatConnection(ws)
+            async for msg in ws:
+                await conn.send_json(conn.decode(msg))
+            return ws
+
+        app = web.Application()
+        app.router.add_get("/ws", handler)
+
+        async with TestClient(TestServer(app)) as client:
+            async with client.ws_connect(
+                "/ws", protocols=(SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON)
+            ) as ws:
+                assert ws.protocol == SUBPROTOCOL_MSGPACK
+                await ws.send_bytes(msgpack.packb(EVENT))
+                reply = await ws.receive()
+
+            assert reply.type == WSMsgType.BINARY
+            assert msgpack.unpackb(reply.data, raw=False) == EVENT
+
+            async with client.ws_connect("/ws") as ws:
+                assert ws.protocol is None
+                await ws.send_str(json.dumps(EVENT))
+                reply = await ws.receive()
+
+            assert reply.type == WSMsgType.TEXT
+            assert json.loads(reply.data) == EVENT
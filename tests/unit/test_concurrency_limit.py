@@ -0,0 +1,118 @@
+"""Tests for the adaptive concurrency limiter."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.middleware.concurrency_limit import (
+    CRITICAL,
+    LOW,
+    NORMAL,
+    AdaptiveConcurrencyLimiter,
+    concurrency_limit_middleware,
+    request_priority,
+)
+
+pytestmark = [
+    pytest.mark.unit,
+    pytest.mark.filterwarnings("ignore::aiohttp.web_exceptions.NotAppKeyWarning"),
+]
+
+
+class TestGradient:
+    """Test limit adjustment from latency samples."""
+
+    def test_rising_latency_shrinks_limit(self):
+        """Latency well above the baseline lowers the limit."""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=50, min_limit=2)
+        limiter.in_flight = 50
+        for _ in range(20):
+            limiter.on_sample(0.01)
+        healthy = limiter.limit
+
+        for _ in range(50):
+            limiter.on_sample(0.1)
+        assert limiter.limit < healthy / 2
+        assert limiter.limit >= 2
+
+    def test_idle_limit_does_not_grow(self):
+        """Fast requests far below the limit do not raise it."""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=20)
+        for _ in range(100):
+            limiter.on_sample(0.01)
+        assert limiter.limit == 20
+
+    def test_failures_halve_gradient(self):
+        """Failed requests reduce the limit even at normal latency."""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=20)
+        limiter.on_sample(0.01, failed=True)
+        assert limiter.limit < 20
+
+
+class TestAdmission:
+    """Test priority shares and queueing."""
+
+    async def test_low_priority_shed_first(self):
+        """Low priority only gets half the limit; critical gets all of it."""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4, queue_timeout=0)
+        assert await limiter.acquire(LOW)
+        assert await limiter.acquire(LOW)
+        assert not await limiter.acquire(LOW)
+        assert await limiter.acquire(NORMAL)
+        assert await limiter.acquire(CRITICAL)
+        assert not await limiter.acquire(CRITICAL)
+        assert limiter.get_stats()["shed"] == 2
+
+    async def test_queued_request_admitted_on_release(self):
+        """A waiting request takes the slot freed by another."""
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", initial_limit=1, min_limit=1, queue_timeout=1.0
+        )
+        assert await limiter.acquire(CRITICAL)
+
+        waiting = asyncio.create_task(limiter.acquire(CRITICAL))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+
+        limiter.release()
+        assert await waiting
+        assert limiter.in_flight == 1
+        assert limiter.queue_depth == 0
+
+    def test_route_priorities(self):
+        """Auth and chat are critical, admin and stats are low."""
+        assert request_priority("/auth/validate") == CRITICAL
+        assert request_priority("/data/chat/conversations") == CRITICAL
+        assert request_priority("/data/stats") == LOW
+        assert request_priority("/data/profiles/1") == NORMAL
+
+
+async def test_middleware_returns_503_when_overloaded():
+    """Requests over the limit fail fast with Retry-After."""
+    release = asyncio.Event()
+
+    async def slow(request: web.Request) -> web.Response:
+        await release.wait()
+        return web.json_response({"ok": True})
+
+    app = web.Application(middlewares=[concurrency_limit_middleware])
+    app["concurrency_limiter"] = AdaptiveConcurrencyLimiter(
+        "test", initial_limit=1, min_limit=1, queue_timeout=0
+    )
+    app.router.add_get("/data/profiles/1", slow)
+    app.router.add_get("/health", slow)
+
+    async with TestClient(TestServer(app)) as client:
+        first = asyncio.create_task(client.get("/data/profiles/1"))
+        while app["concurrency_limiter"].in_flight == 0:
+            await asyncio.sleep(0.01)
+
+        shed = await client.get("/data/profiles/1")
+        assert shed.status == 503
+        assert shed.headers["Retry-After"] == "1"
+
+        release.set()
+        assert (await client.get("/health")).status == 200
+        assert (await first).status == 200
@@ -0,0 +1,105 @@
+"""Tests for request deadline propagation."""
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+
+from core.resilience.deadline import (
+    DEADLINE_HEADER,
+    client_timeout,
+    deadline_headers,
+    remaining,
+    reset_deadline,
+    set_deadline,
+    setup_deadlines,
+    statement_timeout_ms,
+    stop_on_deadline,
+)
+
+pytestmark = [
+    pytest.mark.unit,
+    pytest.mark.filterwarnings("ignore::aiohttp.web_exceptions.NotAppKeyWarning"),
+]
+
+
+class TestDeadlineContext:
+    """Test helpers reading the current deadline."""
+
+    def test_no_deadline(self):
+        """Without a deadline nothing is capped or forwarded."""
+        assert remaining() is None
+        assert deadline_headers() == {}
+        assert statement_timeout_ms() is None
+        assert client_timeout(30).total == 30
+
+    def test_budget_caps_timeouts(self):
+        """The remaining budget bounds client and statement timeouts."""
+        token = set_deadline(2.0)
+        try:
+            assert 1900 < int(deadline_headers()[DEADLINE_HEADER]) <= 2000
+            assert client_timeout(30).total <= 2.0
+            assert 1850 < statement_timeout_ms(margin_ms=50) <= 1950
+        finally:
+            reset_deadline(token)
+        assert remaining() is None
+
+    async def test_retries_stop_when_budget_runs_out(self):
+        """A retry whose backoff would outlast the budget is skipped."""
+        calls = []
+
+        @retry(
+            stop=stop_after_attempt(3) | stop_on_deadline(),
+            wait=wait_fixed(1),
+            retry=retry_if_exception_type(ConnectionError),
+            reraise=True,
+        )
+        async def flaky():
+            calls.append(1)
+            raise ConnectionError()
+
+        token = set_deadline(0.5)
+        try:
+            with pytest.raises(ConnectionError):
+                await flaky()
+        finally:
+            reset_deadline(token)
+        assert len(calls) == 1
+
+
+class TestDeadlineMiddleware:
+    """Test budgets received and passed on over HTTP."""
+
+    async def test_budget_header_propagates_and_exhausted_is_rejected(self):
+        """Services start from the received budget; zero budget gets 504."""
+
+        async def handler(request: web.Request) -> web.Response:
+            return web.json_response(deadline_headers())
+
+        app = web.Application()
+        setup_deadlines(app)
+        app.router.add_get("/work", handler)
+
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.get("/work", headers={DEADLINE_HEADER: "1500"})
+            assert 1400 < int((await resp.json())[DEADLINE_HEADER]) <= 1500
+
+            resp = await client.get("/work")
+            assert await resp.json() == {}
+
+            resp = await client.get("/work", headers={DEADLINE_HEADER: "0"})
+            assert resp.status == 504
+
+    async def test_default_budget_caps_client_budget(self):
+        """The gateway's default budget bounds what clients ask for."""
+
+        async def handler(request: web.Request) -> web.Response:
+            return web.json_response(deadline_headers())
+
+        app = web.Application()
+        setup_deadlines(app, default_budget=1.0)
+        app.router.add_get("/work", handler)
+
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.get("/work", headers={DEADLINE_HEADER: "60000"})
+            assert int((await resp.json())[DEADLINE_HEADER]) <= 1000
@@ -0,0 +1,75 @@
+"""Tests for the bot notification delivery queue."""
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.delivery_queue import DeliveryQueue, DeliverySender
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = DeliveryQueue(str(tmp_path / "queue.sqlite3"))
+    yield queue
+    queue.close()
+
+
+class TestDeliveryQueue:
+    """Test idempotent enqueueing and sending."""
+
+    async def test_idempotency_key_deduplicates(self, queue):
+        """The same key is only queued once."""
+        assert await queue.enqueue(1, "like", {"name": "A"}, "key-1") is True
+        assert await queue.enqueue(1, "like", {"name": "A"}, "key-1") is False
+        assert await queue.size() == 1
+
+    async def test_delivered_key_still_deduplicates(self, tmp_path):
+        """A delivered key is rejected until its tombstone expires."""
+        queue = DeliveryQueue(str(tmp_path / "queue.sqlite3"), tombstone_ttl=0)
+        sent = []
+
+        async def send(chat_id, kind, payload):
+            sent.append(payload)
+
+        await queue.enqueue(1, "like", {"name": "A"}, "key-1")
+        await DeliverySender(queue, send).send_batch()
+
+        assert await queue.size() == 0
+        assert await queue.enqueue(1, "like", {"name": "A"}, "key-1") is False
+        assert await queue.due(10) == []
+
+        assert await queue.purge() == 1
+        assert await queue.enqueue(1, "like", {"name": "A"}, "key-1") is True
+        assert sent == [{"name": "A"}]
+        queue.close()
+
+    async def test_one_message_per_chat_per_batch(self, queue):
+        """A second message to the same chat waits for the chat interval."""
+        sent = []
+
+        async def send(chat_id, kind, payload):
+            sent.append((chat_id, payload["n"]))
+
+        await queue.enqueue(1, "like", {"n": 1})
+        await queue.enqueue(1, "like", {"n": 2})
+        await queue.enqueue(2, "like", {"n": 3})
+
+        sender = DeliverySender(queue, send, chat_interval=60)
+        assert await sender.send_batch() == 2
+
+        assert sent == [(1, 1), (2, 3)]
+        assert await queue.size() == 1
+
+    async def test_retry_after_keeps_notification(self, queue):
+        """A Telegram flood-wait reschedules instead of dropping."""
+
+        async def send(chat_id, kind, payload):
+            raise TelegramRetryAfter(method=None, message="Flood", retry_after=5)
+
+        await queue.enqueue(1, "match", {})
+        sender = DeliverySender(queue, send)
+        await sender.send_batch()
+
+        assert await queue.size() == 1
+        assert await queue.due(10) == []
@@ -0,0 +1,111 @@
+"""Tests for the batching event publisher."""
+
+import pytest
+
+from core.messaging.publisher import BatchingEventPublisher
+from core.messaging.serialization import decode_event
+
+pytestmark = pytest.mark.unit
+
+
+class FakeExchange:
+    """Exchange stand-in recording published routing keys."""
+
+    def __init__(self, fail_keys=()):
+        self.published = []
+        self.message_ids = []
+        self.fail_keys = set(fail_keys)
+
+    async def publish(self, message, routing_key):
+        if routing_key in self.fail_keys:
+            raise ConnectionError("broker unavailable")
+        self.message_ids.append(message.message_id)
+        self.published.append(
+            (routing_key, decode_event(message.body, message.content_type))
+        )
+
+
+class TestBatchingEventPublisher:
+    """Test outbox batching and retry."""
+
+    async def test_publish_is_buffered(self):
+        """publish_event only queues; flush_batch publishes in order."""
+        publisher = BatchingEventPublisher("amqp://unused", batch_size=10)
+        publisher.exchange = FakeExchange()
+
+        assert await publisher.publish_event("match.created", {"n": 1}) is True
+        assert await publisher.publish_event("message.sent", {"n": 2}) is True
+        assert publisher.exchange.published == []
+
+        assert await publisher.flush_batch() is True
+
+        assert publisher.exchange.published == [
+            ("match.created", {"n": 1}),
+            ("message.sent", {"n": 2}),
+        ]
+        assert not publisher.outbox
+
+    async def test_failed_events_are_requeued_at_head(self):
+        """The first failed event and everything after it go back in order."""
+        publisher = BatchingEventPublisher("amqp://unused", batch_size=10)
+        publisher.exchange = FakeExchange(fail_keys={"like.created"})
+
+        await publisher.publish_event("match.created", {"n": 1})
+        await publisher.publish_event("like.created", {"n": 2})
+        await publisher.publish_event("message.sent", {"n": 3})
+
+        assert await publisher.flush_batch() is False
+
+        assert publisher.exchange.published == [
+            ("match.created", {"n": 1}),
+            ("message.sent", {"n": 3}),
+        ]
+        assert [event[0] for event in publisher.outbox] == [
+            "like.created",
+            "message.sent",
+        ]
+
+    async def test_message_id_is_kept_across_retries(self):
+        """A given message_id is published; generated ones survive a retry."""
+        publisher = BatchingEventPublisher("amqp://unused", batch_size=10)
+        publisher.exchange = FakeExchange(fail_keys={"like.created"})
+
+        await publisher.publish_event("match.created", {"n": 1}, message_id="m-1")
+        await publisher.publish_event("like.created", {"n": 2})
+        assert await publisher.flush_batch() is False
+        generated = publisher.outbox[0][3]
+
+        publisher.exchange.fail_keys.clear()
+        assert await publisher.flush_batch() is True
+
+        assert publisher.exchange.message_ids == ["m-1", generated]
+
+    async def test_unencodable_event_is_dropped(self):
+        """An event that cannot be serialized does not block the outbox."""
+        publisher = BatchingEventPublisher("amqp://unused", batch_size=10)
+        publisher.exchange = FakeExchange()
+
+        await publisher.publish_event("match.created", {"at": object()})
+        await publisher.publish_event("message.sent", {"n": 2})
+
+        assert await publisher.flush_batch() is True
+
+        assert publisher.exchange.published == [("message.sent", {"n": 2})]
+        assert not publisher.outbox
+
+    async def test_full_outbox_drops_new_events(self):
+        """Events beyond max_outbox_size are rejected."""
+        publisher = BatchingEventPublisher("amqp://unused", max_outbox_size=1)
+
+        assert await publisher.publish_event("a.b", {}) is True
+        assert await publisher.publish_event("a.c", {}) is False
+
+    async def test_msgpack_serializer(self):
+        """msgpack-encoded events decode back to the same payload."""
+        publisher = BatchingEventPublisher("amqp://unused", serializer="msgpack")
+        publisher.exchange = FakeExchange()
+
+        await publisher.publish_event("match.created", {"user_id_1": 1})
+        await publisher.flush_batch()
+
+        assert publisher.exchange.published == [("match.created", {"user_id_1": 1})]
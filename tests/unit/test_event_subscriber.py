@@ -0,0 +1,224 @@
+"""Tests for the event subscriber worker pool."""
+
+import asyncio
+
+import pytest
+
+from core.messaging.serialization import encode_event
+from core.messaging.subscriber import RETRY_COUNT_HEADER, EventSubscriber
+
+pytestmark = pytest.mark.unit
+
+
+class FakeMessage:
+    """Incoming message stand-in recording how it was settled."""
+
+    def __init__(self, routing_key, data, message_id=None, headers=None):
+        self.routing_key = routing_key
+        self.body, self.content_type = encode_event(data)
+        self.message_id = message_id
+        self.headers = headers or {}
+        self.timestamp = None
+        self.type = None
+        self.acked = False
+
+    @classmethod
+    def redelivery_of(cls, published):
+        """The delivery a republished copy arrives as from the queue."""
+        routing_key, message = published
+        redelivered = cls(routing_key, {}, message.message_id, dict(message.headers))
+        redelivered.body = message.body
+        redelivered.content_type = message.content_type
+        redelivered.type = message.type
+        return redelivered
+
+    async def ack(self):
+        self.acked = True
+
+    async def nack(self, requeue=True):
+        pass
+
+
+class FakeDefaultExchange:
+    """Default exchange stand-in recording republished messages."""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message))
+
+
+class FakeQueue:
+    """Queue stand-in recording bindings and its consumer."""
+
+    def __init__(self, name):
+        self.name = name
+        self.bindings = set()
+        self.consumer = None
+
+    async def bind(self, exchange, routing_key):
+        self.bindings.add(routing_key)
+
+    async def unbind(self, exchange, routing_key):
+        self.bindings.discard(routing_key)
+
+    async def consume(self, callback):
+        self.consumer = callback
+
+
+class FakeChannel:
+    def __init__(self):
+        self.default_exchange = FakeDefaultExchange()
+        self.declared = []
+
+    async def declare_queue(self, name=None, **kwargs):
+        queue = FakeQueue(name)
+        self.declared.append((queue, kwargs))
+        return queue
+
+
+def make_subscriber(**kwargs):
+    subscriber = EventSubscriber("amqp://unused", "test-service", **kwargs)
+    subscriber.channel = FakeChannel()
+    subscriber._worker_queues = [asyncio.Queue() for _ in range(subscriber.workers)]
+    return subscriber
+
+
+class TestEventSubscriber:
+    """Test ordering, retries and deduplication."""
+
+    def test_same_key_goes_to_same_worker(self):
+        """Events with one ordering key always land on one worker."""
+        subscriber = make_subscriber(workers=8)
+        subscriber.register_handler(
+            "message.sent", None, ordering_key="conversation_id"
+        )
+
+        workers = {
+            subscriber._select_worker("message.sent", {"conversation_id": 42})
+            for _ in range(20)
+        }
+
+        assert len(workers) == 1
+
+    async def test_failure_is_retried_then_dead_lettered(self):
+        """Failures are republished with a retry count, then dead-lettered."""
+        subscriber = make_subscriber(max_retries=2, retry_delay=0)
+
+        async def failing(data, correlation_id=None):
+            raise RuntimeError("boom")
+
+        subscriber.register_handler("match.created", failing)
+        exchange = subscriber.channel.default_exchange
+
+        first = FakeMessage("match.created", {"n": 1})
+        await subscriber._run(first, lambda: failing({}))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert exchange.published[-1][0] == "test-service.events"
+        assert exchange.published[-1][1].headers[RETRY_COUNT_HEADER] == 1
+        assert first.acked
+
+        retried = FakeMessage.redelivery_of(exchange.published[-1])
+        assert retried.routing_key == "test-service.events"
+        retried.headers[RETRY_COUNT_HEADER] = 2
+        await subscriber._run(retried, lambda: failing({}))
+        dead_key, dead = exchange.published[-1]
+        assert dead_key == "test-service.events.dead"
+        assert dead.headers["x-original-routing-key"] == "match.created"
+        assert retried.acked
+
+    async def test_retried_event_reaches_its_handler(self):
+        """A retry arriving under the queue name is routed by its event type."""
+        subscriber = make_subscriber(workers=1, retry_delay=0)
+        received = []
+        attempts = []
+
+        async def flaky(data, correlation_id=None):
+            attempts.append(data)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            received.append(data)
+
+        subscriber.register_handler("match.created", flaky)
+        worker = asyncio.create_task(subscriber._worker(subscriber._worker_queues[0]))
+        exchange = subscriber.channel.default_exchange
+
+        await subscriber._process_message(FakeMessage("match.created", {"n": 1}))
+        while not exchange.published:
+            await asyncio.sleep(0)
+
+        retried = FakeMessage.redelivery_of(exchange.published[-1])
+        await subscriber._process_message(retried)
+        while not retried.acked:
+            await asyncio.sleep(0)
+        worker.cancel()
+
+        assert received == [{"n": 1}]
+
+    async def test_duplicate_message_id_is_skipped(self):
+        """A redelivered message id is acked without calling the handler."""
+        subscriber = make_subscriber()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+
+        for _ in range(2):
+            await subscriber._run(FakeMessage("x", {}, message_id="m-1"), handler)
+
+        assert calls == [1]
+
+    async def test_poison_event_does_not_fail_its_batch(self):
+        """Only the event that fails on its own is retried."""
+        subscriber = make_subscriber(retry_delay=0)
+        handled = []
+
+        async def handler(items):
+            if any(item["n"] == 2 for item in items):
+                raise RuntimeError("poison")
+            handled.extend(item["n"] for item in items)
+
+        subscriber.register_batch_handler("match.created", handler, max_batch=10)
+        route = subscriber.batch_routes["match.created"]
+        messages = [FakeMessage("match.created", {"n": n}) for n in (1, 2, 3)]
+        route.buffer = [(message, {"n": n}) for n, message in enumerate(messages, 1)]
+
+        await subscriber._flush_batch(route)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert handled == [1, 3]
+        assert [m.acked for m in messages] == [True, True, True]
+        retried = subscriber.channel.default_exchange.published
+        assert len(retried) == 1
+        assert retried[0][1].headers[RETRY_COUNT_HEADER] == 1
+
+    async def test_broadcast_events_use_a_private_queue(self):
+        """Broadcast patterns move from the shared queue to an exclusive one."""
+        subscriber = make_subscriber()
+        subscriber.queue = FakeQueue("test-service.events")
+        subscriber.queue.bindings.add("preferences.updated")
+        received = []
+
+        async def invalidate(data, correlation_id=None):
+            received.append(data)
+
+        async def on_match(data, correlation_id=None):
+            pass
+
+        subscriber.register_handler("match.created", on_match)
+        subscriber.register_broadcast_handler("preferences.updated", invalidate)
+        await subscriber.start_consuming()
+        await subscriber.close()
+
+        private, options = subscriber.channel.declared[0]
+        assert options == {"exclusive": True, "auto_delete": True}
+        assert private.bindings == {"preferences.updated"}
+        assert subscriber.queue.bindings == {"match.created"}
+
+        message = FakeMessage("preferences.updated", {"user_id": 7})
+        await private.consumer(message)
+        assert received == [{"user_id": 7}]
+        assert message.acked
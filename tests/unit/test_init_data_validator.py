@@ -0,0 +1,92 @@
+"""Tests for TelegramInitDataValidator."""
+
+import hashlib
+import hmac
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+from core.utils.security import (
+    TelegramInitDataValidator,
+    ValidationError,
+    validate_telegram_webapp_init_data,
+)
+
+pytestmark = pytest.mark.unit
+
+BOT_TOKEN = "123456:test-bot-token"
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_init_data(auth_date: int, user: dict, bot_token: str = BOT_TOKEN) -> str:
+    """Build initData signed the way Telegram signs it."""
+    fields = {"auth_date": str(auth_date), "user": json.dumps(user)}
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(
+        secret_key, check_string.encode(), hashlib.sha256
+    ).hexdigest()
+    return urlencode(fields)
+
+
+class TestTelegramInitDataValidator:
+    """Test validation and result caching."""
+
+    def test_signature_and_age(self):
+        """Valid data passes; another bot's token or stale data fail."""
+        clock = FakeClock(1_700_000_100.0)
+        init_data = make_init_data(1_700_000_000, {"id": 42, "first_name": "A"})
+        validator = TelegramInitDataValidator(BOT_TOKEN, clock=clock)
+
+        result = validator.validate(init_data)
+        assert result["user"] == {"id": 42, "first_name": "A"}
+
+        with pytest.raises(ValidationError):
+            TelegramInitDataValidator("other-token", clock=clock).validate(init_data)
+        with pytest.raises(ValidationError, match="too old"):
+            validate_telegram_webapp_init_data(init_data, BOT_TOKEN, max_age_seconds=0)
+
+    def test_repeated_init_data_is_cached(self):
+        """Resent initData is served from cache until the cache TTL."""
+        clock = FakeClock(1_700_000_100.0)
+        init_data = make_init_data(1_700_000_000, {"id": 42})
+        validator = TelegramInitDataValidator(BOT_TOKEN, cache_ttl=60, clock=clock)
+
+        first = validator.validate(init_data)
+        first["user"] = "mutated"
+        assert validator.validate(init_data)["user"] == {"id": 42}
+        assert validator.get_stats()["hits"] == 1
+
+        clock.now += 61
+        validator.validate(init_data)
+        assert validator.get_stats()["misses"] == 2
+
+    def test_cache_respects_auth_date_age(self):
+        """A cached result is not served past the initData's max age."""
+        clock = FakeClock(1_700_000_000.0 + 3590)
+        init_data = make_init_data(1_700_000_000, {"id": 42})
+        validator = TelegramInitDataValidator(BOT_TOKEN, cache_ttl=60, clock=clock)
+
+        validator.validate(init_data)
+        clock.now += 20
+        with pytest.raises(ValidationError, match="too old"):
+            validator.validate(init_data)
+
+    def test_tampered_data_with_cached_hash_is_rejected(self):
+        """Reusing a cached hash and auth_date with other fields fails."""
+        clock = FakeClock(1_700_000_100.0)
+        init_data = make_init_data(1_700_000_000, {"id": 42})
+        validator = TelegramInitDataValidator(BOT_TOKEN, clock=clock)
+        validator.validate(init_data)
+
+        tampered = init_data.replace("42", "43")
+        with pytest.raises(ValidationError, match="HMAC"):
+            validator.validate(tampered)
@@ -0,0 +1,115 @@
+"""Tests for signed internal identity propagation."""
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from core.middleware import internal_identity
+from core.middleware.internal_identity import (
+    INTERNAL_IDENTITY_HEADER,
+    InternalIdentitySigner,
+)
+from core.middleware.jwt_middleware import jwt_middleware
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestInternalIdentitySigner:
+    """Test signing, tampering, expiry and key rotation."""
+
+    def test_roundtrip_and_tampering(self):
+        """A signed assertion verifies; changing the user breaks it."""
+        signer = InternalIdentitySigner("secret", clock=FakeClock(1000.0))
+        value = signer.sign(42, "access", expires_at=2000)
+
+        assert signer.verify(value) == {
+            "user_id": 42,
+            "token_type": "access",
+            "exp": 1030,
+        }
+        assert signer.verify(value.replace(".42.", ".43.")) is None
+        assert (
+            InternalIdentitySigner("other", clock=FakeClock(1000.0)).verify(value)
+            is None
+        )
+
+    def test_expiry_and_key_windows(self):
+        """Assertions expire with their TTL and old key windows are refused."""
+        clock = FakeClock(3590.0)
+        signer = InternalIdentitySigner("secret", ttl=30, key_period=3600, clock=clock)
+        value = signer.sign(42)
+
+        clock.now = 3610.0  # next key window, still within the TTL
+        assert signer.verify(value) is not None
+        clock.now = 3621.0
+        assert signer.verify(value) is None
+
+
+class TestJwtMiddlewareIdentity:
+    """Test that services accept the gateway's assertion."""
+
+    async def test_identity_header_replaces_jwt(self, monkeypatch):
+        """A valid assertion authenticates without an Authorization header."""
+        monkeypatch.setenv("INTERNAL_IDENTITY_KEY", "secret")
+        monkeypatch.setattr(internal_identity, "_signer", None)
+        value = internal_identity.get_identity_signer().sign(42)
+
+        async def handler(request):
+            return web.json_response({"user_id": request["user_id"]})
+
+        request = make_mocked_request(
+            "GET", "/profiles/me", headers={INTERNAL_IDENTITY_HEADER: value}
+        )
+        response = await jwt_middleware(request, handler)
+
+        assert response.status == 200
+        assert request["user_id"] == 42
+        assert internal_identity.identity_headers(request) == {
+            INTERNAL_IDENTITY_HEADER: value
+        }
+
+    async def test_mux_requires_gateway_identity(self, monkeypatch):
+        """Only the gateway may open the chat mux socket."""
+        monkeypatch.setenv("INTERNAL_IDENTITY_KEY", "secret")
+        monkeypatch.setattr(internal_identity, "_signer", None)
+        user_value = internal_identity.get_identity_signer().sign(42)
+
+        async def handler(request):
+            return web.json_response({})
+
+        def mux_request(headers):
+            return make_mocked_request("GET", "/chat/ws/mux", headers=headers)
+
+        assert (await jwt_middleware(mux_request({}), handler)).status == 403
+        assert (
+            await jwt_middleware(
+                mux_request({INTERNAL_IDENTITY_HEADER: user_value}), handler
+            )
+        ).status == 403
+        response = await jwt_middleware(
+            mux_request(internal_identity.gateway_identity_headers()), handler
+        )
+        assert response.status == 200
+
+    async def test_gateway_identity_is_not_a_user(self, monkeypatch):
+        """A gateway assertion does not authenticate ordinary endpoints."""
+        monkeypatch.setenv("INTERNAL_IDENTITY_KEY", "secret")
+        monkeypatch.setattr(internal_identity, "_signer", None)
+
+        async def handler(request):
+            return web.json_response({})
+
+        request = make_mocked_request(
+            "GET", "/profiles/me", headers=internal_identity.gateway_identity_headers()
+        )
+        response = await jwt_middleware(request, handler)
+
+        assert response.status == 401
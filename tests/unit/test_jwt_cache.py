@@ -0,0 +1,76 @@
+"""Tests for the verified JWT cache."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from core.middleware.security_metrics import (
+    flush_jwt_validations,
+    record_jwt_validation,
+)
+from core.utils.security import (
+    ValidationError,
+    VerifiedTokenCache,
+    generate_jwt_token,
+)
+
+pytestmark = pytest.mark.unit
+
+SECRET = "test-secret-key-with-at-least-32-bytes"
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVerifiedTokenCache:
+    """Test caching, expiry and key separation."""
+
+    def test_repeated_token_is_verified_once(self):
+        """Second validation is a cache hit with an independent payload."""
+        cache = VerifiedTokenCache()
+        token = generate_jwt_token(42, SECRET)
+
+        first = cache.validate(token, SECRET)
+        first["user_id"] = 0
+        second = cache.validate(token, SECRET)
+
+        assert second["user_id"] == 42
+        assert cache.get_stats()["hits"] == 1
+
+    def test_entry_expires_with_token(self):
+        """A cached token is re-verified once past its exp claim."""
+        token = generate_jwt_token(42, SECRET)
+        clock = FakeClock(0.0)
+        cache = VerifiedTokenCache(clock=clock)
+        payload = cache.validate(token, SECRET)
+
+        clock.now = payload["exp"] + 1
+        with pytest.raises(ValidationError):
+            cache.validate(token + "x", SECRET)
+        cache.validate(token, SECRET)
+
+        assert cache.get_stats()["misses"] == 3
+
+    def test_other_secret_is_not_served_from_cache(self):
+        """A token cached under one secret still fails under another."""
+        cache = VerifiedTokenCache()
+        token = generate_jwt_token(42, SECRET)
+        cache.validate(token, SECRET)
+
+        with pytest.raises(ValidationError):
+            cache.validate(token, "another-secret-key-with-32-bytes-or-more")
+
+    def test_successes_are_counted_in_bulk(self):
+        """Successful validations reach the counter on flush."""
+        labels = {"service": "cache-test", "result": "success", "token_type": "access"}
+        before = REGISTRY.get_sample_value("jwt_validations_total", labels) or 0
+
+        for _ in range(3):
+            record_jwt_validation("cache-test", "success")
+        flush_jwt_validations()
+
+        assert REGISTRY.get_sample_value("jwt_validations_total", labels) == before + 3
@@ -0,0 +1,83 @@
+"""Tests for head and tail sampling of request logs."""
+
+import logging
+
+import pytest
+
+from core.utils.log_sampling import LogSampler, TailSamplingFilter
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def sampled_logger():
+    sampler = LogSampler(default_rate=0.0)
+    handler = ListHandler()
+    handler.addFilter(TailSamplingFilter(sampler))
+    log = logging.getLogger("tests.log_sampling")
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    yield sampler, log, handler
+    log.removeHandler(handler)
+
+
+class TestLogSampler:
+    """Test sampling decisions, tail buffering and the line budget."""
+
+    def test_head_sampling_is_consistent_per_trace(self):
+        """The same trace gets the same decision; route rates apply."""
+        sampler = LogSampler(default_rate=0.25, route_rates={"/health": 0.0})
+        traces = [f"{i:032x}" for i in range(2000)]
+
+        decisions = [sampler.head_sampled(t, "/profiles/1") for t in traces]
+        assert decisions == [sampler.head_sampled(t, "/profiles/1") for t in traces]
+        assert 0.2 < sum(decisions) / len(traces) < 0.3
+        assert not any(sampler.head_sampled(t, "/health/ready") for t in traces)
+
+    def test_tail_buffer_keeps_only_failed_requests(self, sampled_logger):
+        """Buffered records are dropped for fast successes, written for errors."""
+        sampler, log, handler = sampled_logger
+
+        buffer, token = sampler.start_buffer()
+        log.info("fast request")
+        sampler.finish_buffer(buffer, token, keep=sampler.tail_keep(200, 5))
+
+        buffer, token = sampler.start_buffer()
+        log.info("failed request")
+        log.warning("warned immediately")
+        sampler.finish_buffer(buffer, token, keep=sampler.tail_keep(503, 5))
+
+        assert handler.messages == ["warned immediately", "failed request"]
+        assert sampler.dropped_requests == 1
+
+    def test_rates_scale_down_to_line_budget(self):
+        """Writing twice the budget halves the sampling factor."""
+        clock = FakeClock(0.0)
+        sampler = LogSampler(
+            target_lines_per_second=10, adjust_interval=10, clock=clock
+        )
+        for _ in range(199):
+            sampler.count_line()
+        clock.now = 10.0
+        sampler.count_line()
+
+        assert sampler.factor == pytest.approx(0.5)
+        assert sampler.rate_for("/any") == pytest.approx(0.5)
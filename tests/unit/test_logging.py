@@ -0,0 +1,93 @@
+"""Tests for queued JSON logging."""
+
+import io
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from core.utils.logging import JsonFormatter, QueueLogHandler
+
+pytestmark = pytest.mark.unit
+
+
+def make_record(message, *args, **extra):
+    record = logging.makeLogRecord(
+        {"name": "test", "levelno": logging.INFO, "levelname": "INFO"}
+    )
+    record.msg = message
+    record.args = args
+    record.__dict__.update(extra)
+    return record
+
+
+class TestQueueLogHandler:
+    """Test background writing and the drop policy."""
+
+    def test_records_are_written_as_json(self):
+        """Queued records are formatted with their arguments and extras."""
+        stream = io.StringIO()
+        handler = QueueLogHandler(stream, flush_interval=0.01)
+        handler.setFormatter(JsonFormatter())
+
+        handler.emit(make_record("user %s", 42, event_type="login", ignored=1))
+        handler.close()
+
+        entry = json.loads(stream.getvalue())
+        assert entry["message"] == "user 42"
+        assert entry["event_type"] == "login"
+        assert "ignored" not in entry
+
+    def test_full_queue_drops_and_reports(self):
+        """Records beyond max_size are counted and reported once written."""
+        stream = io.StringIO()
+        handler = QueueLogHandler(stream, max_size=2, flush_interval=60)
+        handler.setFormatter(JsonFormatter())
+
+        for i in range(5):
+            handler.emit(make_record(f"record {i}"))
+        assert handler.dropped == 3
+        handler.close()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["message"] for line in lines[:2]] == ["record 0", "record 1"]
+        assert lines[2]["event_type"] == "log_records_dropped"
+        assert lines[2]["dropped_total"] == 3
+
+    def test_block_policy_waits_without_deadlock(self):
+        """Blocked emitters resume as the writer drains a slow stream."""
+
+        class SlowStream(io.StringIO):
+            def write(self, data):
+                time.sleep(0.01)
+                return super().write(data)
+
+        stream = SlowStream()
+        handler = QueueLogHandler(
+            stream, max_size=2, batch_size=2, flush_interval=0.01, policy="block"
+        )
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger("test.queue.block")
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        def emit_many():
+            for i in range(20):
+                logger.warning("record %s", i)
+
+        threads = [threading.Thread(target=emit_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        try:
+            assert not any(thread.is_alive() for thread in threads)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        assert handler.dropped == 0
+        assert len(stream.getvalue().splitlines()) == 80
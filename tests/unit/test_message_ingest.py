@@ -0,0 +1,152 @@
+"""Tests for write-behind message ingestion."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core.exceptions import ForbiddenError, NotFoundError, ValidationError
+from core.messaging.ingest import BatchedQueueConsumer
+from services.chat import main as chat_main
+
+pytestmark = pytest.mark.unit
+
+
+class FakeDelivery:
+    def __init__(self, item):
+        self.body = json.dumps(item).encode()
+        self.headers = {}
+        self.message_id = str(item.get("id"))
+        self.content_type = "application/json"
+        self.settled = None
+
+    async def ack(self, multiple=False):
+        self.settled = "ack"
+
+    async def nack(self, requeue=True):
+        self.settled = "requeue" if requeue else "nack"
+
+    async def reject(self, requeue=False):
+        self.settled = "reject"
+
+
+class FakeExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, json.loads(message.body)))
+
+
+def make_consumer(handler, **kwargs):
+    consumer = BatchedQueueConsumer("amqp://unused", handler, **kwargs)
+    consumer.channel = SimpleNamespace(default_exchange=FakeExchange())
+    return consumer
+
+
+class TestBatchFailure:
+    """Test settling a batch the handler rejected."""
+
+    async def test_bad_item_dead_lettered_rest_persisted(self):
+        """Only the item failing on its own is dead-lettered."""
+        persisted = []
+
+        async def handler(items):
+            if any(item["content_type"] == "video" for item in items):
+                raise ValueError("valid_content_type")
+            persisted.extend(item["id"] for item in items)
+
+        consumer = make_consumer(handler)
+        items = [
+            {"id": 1, "content_type": "text"},
+            {"id": 2, "content_type": "video"},
+            {"id": 3, "content_type": "text"},
+        ]
+        deliveries = [FakeDelivery(item) for item in items]
+        consumer._buffer = list(deliveries)
+
+        await consumer.flush()
+
+        assert persisted == [1, 3]
+        assert [d.settled for d in deliveries] == ["ack", "ack", "ack"]
+        assert consumer.channel.default_exchange.published == [
+            ("chat.message_ingest.dead", items[1])
+        ]
+
+    async def test_transient_failure_requeues_remaining_items(self):
+        """A transient error requeues the failing item and all after it."""
+        calls = []
+
+        async def handler(items):
+            calls.append([item["id"] for item in items])
+            if len(items) > 1 or items[0]["id"] == 2:
+                raise ConnectionError("database unavailable")
+
+        consumer = make_consumer(handler, retry_delay=0)
+        deliveries = [FakeDelivery({"id": i}) for i in (1, 2, 3)]
+        consumer._buffer = list(deliveries)
+
+        await consumer.flush()
+
+        assert calls == [[1, 2, 3], [1], [2]]
+        assert [d.settled for d in deliveries] == ["ack", "requeue", "requeue"]
+        assert consumer.channel.default_exchange.published == []
+
+    async def test_requeue_backs_off_until_success(self, monkeypatch):
+        """Repeated transient failures wait longer before each requeue."""
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr("core.messaging.ingest.asyncio.sleep", fake_sleep)
+        down = [True]
+
+        async def handler(items):
+            if down[0]:
+                raise ConnectionError("database unavailable")
+
+        consumer = make_consumer(handler, retry_delay=1.0, max_retry_delay=3.0)
+        for _ in range(4):
+            consumer._buffer = [FakeDelivery({"id": 1})]
+            await consumer.flush()
+        down[0] = False
+        consumer._buffer = [FakeDelivery({"id": 1})]
+        await consumer.flush()
+        down[0] = True
+        consumer._buffer = [FakeDelivery({"id": 1})]
+        await consumer.flush()
+
+        assert delays == [1.0, 2.0, 3.0, 3.0, 1.0]
+
+
+class TestWriteBehindValidation:
+    """Test checks made before a message is accepted with 202."""
+
+    @pytest.fixture(autouse=True)
+    def participants(self, monkeypatch):
+        async def fake_participants(conversation_id):
+            if conversation_id == 5:
+                return {"user1_id": 10, "user2_id": 20, "is_blocked": False}
+            if conversation_id == 7:
+                return {"user1_id": 10, "user2_id": 20, "is_blocked": True}
+            return None
+
+        monkeypatch.setattr(
+            chat_main, "_get_conversation_participants", fake_participants
+        )
+
+    async def test_valid_message(self):
+        """A participant's text message passes with a normalized ID."""
+        assert await chat_main._validate_message("5", "20", "text") == 5
+
+    async def test_rejected_messages(self):
+        """Unknown types, conversations and senders are refused."""
+        with pytest.raises(ValidationError):
+            await chat_main._validate_message(5, 10, "video")
+        with pytest.raises(NotFoundError):
+            await chat_main._validate_message(6, 10, "text")
+        with pytest.raises(ForbiddenError):
+            await chat_main._validate_message(5, 30, "text")
+        with pytest.raises(ForbiddenError):
+            await chat_main._validate_message(7, 10, "text")
@@ -0,0 +1,181 @@
+"""Tests for keyset pagination of conversation messages in the data service."""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.db import Message
+from services.data.main import DataService, get_messages_handler
+
+pytestmark = pytest.mark.unit
+
+CONVERSATION_ID = 1
+OTHER_CONVERSATION_ID = 2
+
+
+@pytest.fixture
+async def session_maker():
+    """In-memory database holding twelve messages in one conversation.
+
+    Messages 5 and 6 share a timestamp so the id tie-breaker is exercised.
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Message.__table__.create)
+
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+    start = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+    async with maker() as session:
+        for message_id in range(1, 13):
+            offset = min(message_id, 5) if message_id <= 6 else message_id - 1
+            session.add(
+                Message(
+                    id=message_id,
+                    conversation_id=CONVERSATION_ID,
+                    sender_id=100 + message_id % 2,
+                    content=f"message {message_id}",
+                    created_at=start + timedelta(minutes=offset),
+                )
+            )
+        session.add(
+            Message(
+                id=13,
+                conversation_id=OTHER_CONVERSATION_ID,
+                sender_id=200,
+                content="elsewhere",
+                created_at=start + timedelta(minutes=30),
+            )
+        )
+        await session.commit()
+
+    yield maker
+    await engine.dispose()
+
+
+async def get_page(session_maker, conversation_id=CONVERSATION_ID, **kwargs):
+    async with session_maker() as session:
+        return await DataService(session).get_messages(conversation_id, **kwargs)
+
+
+def ids(page):
+    return [message["id"] for message in page["messages"]]
+
+
+class TestGetMessages:
+    """Test DataService.get_messages paging."""
+
+    async def test_first_page_is_newest_first(self, session_maker):
+        """Without a cursor the newest messages come first."""
+        page = await get_page(session_maker, limit=5)
+
+        assert ids(page) == [12, 11, 10, 9, 8]
+        assert page["has_more"] is True
+        assert page["next_before_id"] == 8
+        assert page["prev_after_id"] == 12
+
+    async def test_before_id_walks_back_to_the_start(self, session_maker):
+        """Following next_before_id visits every message exactly once."""
+        seen = []
+        page = await get_page(session_maker, limit=5)
+        seen.extend(ids(page))
+        while page["next_before_id"] is not None:
+            page = await get_page(
+                session_maker, limit=5, before_id=page["next_before_id"]
+            )
+            seen.extend(ids(page))
+
+        assert seen == list(range(12, 0, -1))
+        assert page["has_more"] is False
+        assert page["next_before_id"] is None
+
+    async def test_before_id_breaks_timestamp_ties_by_id(self, session_maker):
+        """Messages sharing a timestamp are split by id, not skipped."""
+        page = await get_page(session_maker, limit=2, before_id=6)
+
+        assert ids(page) == [5, 4]
+
+    async def test_after_id_returns_newer_messages(self, session_maker):
+        """after_id pages forward but keeps newest-first order."""
+        page = await get_page(session_maker, limit=3, after_id=4)
+
+        assert ids(page) == [7, 6, 5]
+        assert page["has_more"] is True
+        assert page["prev_after_id"] == 7
+        # Everything up to after_id is older history
+        assert page["next_before_id"] == 5
+
+    async def test_after_id_at_the_newest_message(self, session_maker):
+        """Polling past the newest message keeps the cursor in place."""
+        page = await get_page(session_maker, limit=5, after_id=12)
+
+        assert page["messages"] == []
+        assert page["has_more"] is False
+        assert page["next_before_id"] is None
+        assert page["prev_after_id"] == 12
+
+    async def test_exact_page_has_no_more(self, session_maker):
+        """A page that ends on the oldest message reports has_more False."""
+        page = await get_page(session_maker, limit=12)
+
+        assert len(page["messages"]) == 12
+        assert page["has_more"] is False
+        assert page["next_before_id"] is None
+
+    async def test_cursor_from_another_conversation(self, session_maker):
+        """A cursor outside the conversation does not leak or shift the page."""
+        before = await get_page(session_maker, limit=5, before_id=13)
+        after = await get_page(session_maker, limit=5, after_id=13)
+
+        for page in (before, after):
+            assert page["messages"] == []
+            assert page["has_more"] is False
+            assert page["next_before_id"] is None
+        assert after["prev_after_id"] == 13
+
+        other = await get_page(
+            session_maker, conversation_id=OTHER_CONVERSATION_ID, before_id=12
+        )
+        assert other["messages"] == []
+
+
+class TestGetMessagesHandler:
+    """Test query validation in the messages endpoint."""
+
+    @pytest.mark.parametrize("limit", ["0", "-5"])
+    async def test_rejects_non_positive_limit(self, limit):
+        """limit <= 0 is rejected before the database is touched."""
+        request = Mock()
+        request.match_info = {"conversation_id": str(CONVERSATION_ID)}
+        request.query = {"limit": limit}
+        request.app = {"session_maker": Mock()}
+
+        response = await get_messages_handler(request)
+
+        assert response.status == 400
+        request.app["session_maker"].assert_not_called()
+
+    async def test_rejects_both_cursors(self):
+        """before_id and after_id cannot be combined."""
+        request = Mock()
+        request.match_info = {"conversation_id": str(CONVERSATION_ID)}
+        request.query = {"before_id": "5", "after_id": "3"}
+        request.app = {"session_maker": Mock()}
+
+        response = await get_messages_handler(request)
+
+        assert response.status == 400
+
+    async def test_pages_through_the_handler(self, session_maker):
+        """Cursor query parameters reach the data layer as integers."""
+        request = Mock()
+        request.match_info = {"conversation_id": str(CONVERSATION_ID)}
+        request.query = {"limit": "3", "before_id": "4"}
+        request.app = {"session_maker": session_maker}
+
+        response = await get_messages_handler(request)
+
+        assert response.status == 200
+        assert b'"next_before_id": null' in response.body
+        assert b'"id": 3' in response.body
@@ -0,0 +1,105 @@
+"""Tests for route-template HTTP metrics."""
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from prometheus_client import REGISTRY
+
+from core.middleware.metrics_middleware import (
+    LabelCardinalityGuard,
+    add_metrics_route,
+    metrics_middleware,
+    trace_exemplar,
+)
+from core.middleware.tracing import tracing_middleware
+
+pytestmark = [
+    pytest.mark.unit,
+    pytest.mark.filterwarnings("ignore::aiohttp.web_exceptions.NotAppKeyWarning"),
+]
+
+
+def request_count(endpoint):
+    value = REGISTRY.get_sample_value(
+        "http_requests_total",
+        {
+            "method": "GET",
+            "endpoint": endpoint,
+            "status_code": "200" if endpoint != "unmatched" else "404",
+            "service": "metrics-test",
+        },
+    )
+    return value or 0
+
+
+@pytest.fixture
+async def client():
+    async def profile(request):
+        return web.json_response({"user_id": request.match_info["user_id"]})
+
+    app = web.Application(middlewares=[tracing_middleware, metrics_middleware])
+    app.router.add_get("/profiles/{user_id}", profile)
+    add_metrics_route(app, "metrics-test")
+
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+class TestMetricsMiddleware:
+    """Test endpoint labels, the cardinality guard and OpenMetrics output."""
+
+    async def test_paths_are_labelled_by_route_template(self, client):
+        """Different IDs share one series; unknown paths share another."""
+        before = request_count("/profiles/{user_id}")
+        unmatched_before = request_count("unmatched")
+
+        for path in ("/profiles/1", "/profiles/2", "/nope/1", "/nope/2"):
+            await client.get(path)
+
+        assert request_count("/profiles/{user_id}") == before + 2
+        assert request_count("unmatched") == unmatched_before + 2
+
+    async def test_openmetrics_is_negotiated(self, client):
+        """Scrapers asking for OpenMetrics get it (with exemplar support)."""
+        response = await client.get(
+            "/metrics", headers={"Accept": "application/openmetrics-text"}
+        )
+        body = await response.text()
+
+        assert response.headers["Content-Type"].startswith(
+            "application/openmetrics-text"
+        )
+        assert body.rstrip().endswith("# EOF")
+
+    def test_guard_caps_distinct_values(self):
+        """Values past the cap collapse into one overflow label."""
+        guard = LabelCardinalityGuard(max_values=2)
+
+        assert [guard(v) for v in ("a", "b", "c", "a")] == ["a", "b", "other", "a"]
+        assert guard.overflowed == 1
+
+    async def test_oversized_trace_id_does_not_fail_request(self, client):
+        """A client-supplied trace ID too long for an exemplar is ignored."""
+        await client.get("/profiles/0")
+        active = {"service": "metrics-test"}
+        active_before = REGISTRY.get_sample_value("http_requests_active", active)
+        before = request_count("/profiles/{user_id}")
+
+        response = await client.get("/profiles/1", headers={"X-Trace-ID": "a" * 200})
+
+        assert response.status == 200
+        assert request_count("/profiles/{user_id}") == before + 1
+        assert REGISTRY.get_sample_value("http_requests_active", active) == (
+            active_before
+        )
+
+    def test_trace_exemplar(self):
+        """Hex trace IDs and short values are kept, long ones dropped."""
+        trace_id = "0af7651916cd43dd8448eb211c80319c"
+
+        assert trace_exemplar(trace_id) == {"trace_id": trace_id}
+        assert trace_exemplar("req-42") == {"trace_id": "req-42"}
+        assert trace_exemplar("a" * 101) is None
+        assert trace_exemplar(None) is None
@@ -0,0 +1,122 @@
+"""Tests for the gateway's multiplexed upstream socket."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import WSMsgType
+
+from core.utils.ws_mux import OP_CLOSE, OP_TEXT, pack_frame, unpack_frame
+from gateway.websocket_proxy import MuxUpstream
+
+pytestmark = pytest.mark.unit
+
+
+class FakeUpstreamSocket:
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+        self.incoming: asyncio.Queue = asyncio.Queue()
+
+    async def send_bytes(self, data):
+        self.sent.append(unpack_frame(data)[:2])
+
+    def feed(self, data: bytes):
+        self.incoming.put_nowait(SimpleNamespace(type=WSMsgType.BINARY, data=data))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        msg = await self.incoming.get()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+    async def close(self):
+        self.closed = True
+        self.incoming.put_nowait(None)
+
+
+class FakeClient:
+    def __init__(self, stalled=False):
+        self.received = []
+        self.closed = False
+        self.stalled = stalled
+
+    async def send_str(self, data):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        self.received.append(data)
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+async def make_upstream(**kwargs):
+    upstream = MuxUpstream(None, "ws://chat/mux", **kwargs)
+    upstream.ws = FakeUpstreamSocket()
+    upstream._reader = asyncio.create_task(upstream._read_loop())
+    return upstream
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_slow_client_does_not_stall_other_channels():
+    """A stalled client is closed alone; other channels keep flowing."""
+    upstream = await make_upstream(send_timeout=0.05)
+    slow, fast = FakeClient(stalled=True), FakeClient()
+    upstream.attach(1, slow)
+    upstream.attach(2, fast)
+
+    upstream.ws.feed(pack_frame(1, OP_TEXT, b"to-slow"))
+    upstream.ws.feed(pack_frame(2, OP_TEXT, b"to-fast"))
+    await settle()
+    assert fast.received == ["to-fast"]
+
+    await asyncio.sleep(0.1)
+    assert slow.closed
+    assert 1 not in upstream.channels
+    assert (1, OP_CLOSE) in upstream.ws.sent
+
+    await upstream.close()
+
+
+async def test_malformed_frame_is_skipped():
+    """A frame too short to parse does not tear down the upstream."""
+    upstream = await make_upstream()
+    client = FakeClient()
+    upstream.attach(1, client)
+
+    upstream.ws.feed(b"\x00")
+    upstream.ws.feed(pack_frame(1, OP_TEXT, b"still here"))
+    await settle()
+
+    assert client.received == ["still here"]
+    assert not client.closed
+    await upstream.close()
+
+
+async def test_close_sent_for_unattached_channel():
+    """Closing a channel that was never attached still notifies upstream."""
+    upstream = await make_upstream()
+
+    await upstream.close_channel(7)
+
+    assert upstream.ws.sent == [(7, OP_CLOSE)]
+    await upstream.close()
+
+
+async def test_open_timeout_closes_channel_upstream():
+    """An OPEN nobody answered in time is closed upstream."""
+    upstream = await make_upstream()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await upstream.open_channel({"token": "t"}, timeout=0.01)
+
+    channel_id = upstream.ws.sent[0][0]
+    assert upstream.ws.sent[-1] == (channel_id, OP_CLOSE)
+    await upstream.close()
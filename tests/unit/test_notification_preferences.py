@@ -0,0 +1,78 @@
+"""Tests for compiled notification preferences and their cache."""
+
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from services.notification.preferences import (
+    CompiledPreferences,
+    PreferenceCache,
+    compile_quiet_hours,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class TestCompiledPreferences:
+    """Test preference compilation."""
+
+    def test_quiet_hours_across_midnight(self):
+        """A window crossing midnight splits into two minute ranges."""
+        assert compile_quiet_hours("22:00:00", "07:00") == (
+            (22 * 60, 24 * 60),
+            (0, 7 * 60),
+        )
+
+    def test_allows_respects_quiet_hours_and_types(self):
+        """Quiet hours and disabled types block notifications."""
+        preferences = CompiledPreferences.from_dict(
+            {
+                "new_matches": True,
+                "new_messages": False,
+                "quiet_hours_start": "22:00:00",
+                "quiet_hours_end": "07:00:00",
+                "timezone": "UTC",
+            }
+        )
+        noon = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+        night = datetime(2025, 1, 1, 23, 30, tzinfo=UTC)
+
+        assert preferences.allows("new_match", noon)
+        assert not preferences.allows("new_message", noon)
+        assert not preferences.allows("new_match", night)
+
+
+class TestPreferenceCache:
+    """Test caching, single-flight loading and invalidation."""
+
+    async def test_concurrent_lookups_share_one_fetch(self):
+        """A burst for one user triggers a single fetch."""
+        calls = []
+
+        async def fetch(user_id):
+            calls.append(user_id)
+            await asyncio.sleep(0)
+            return {"new_matches": False}
+
+        cache = PreferenceCache(fetch)
+        results = await asyncio.gather(*(cache.get("1") for _ in range(10)))
+
+        assert calls == ["1"]
+        assert not any(result.allows("new_match") for result in results)
+
+    async def test_invalidate_reloads(self):
+        """Invalidated users are fetched again."""
+        calls = []
+
+        async def fetch(user_id):
+            calls.append(user_id)
+            return {}
+
+        cache = PreferenceCache(fetch)
+        await cache.get("1")
+        await cache.get("1")
+        cache.invalidate("1")
+        await cache.get("1")
+
+        assert calls == ["1", "1"]
@@ -0,0 +1,136 @@
+"""Tests for the notification scheduler."""
+
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from services.notification.digest_store import DigestStore
+from services.notification.preferences import PreferenceCache
+from services.notification.scheduler import NotificationScheduler, TokenBucket
+
+pytestmark = pytest.mark.unit
+
+
+def make_scheduler(preferences, send=None, **kwargs):
+    async def fetch(user_id):
+        return preferences
+
+    async def sent(user_id, notification_type, payload, digest_id):
+        return True
+
+    return NotificationScheduler(
+        send or sent, PreferenceCache(fetch), window=0, **kwargs
+    )
+
+
+class TestNotificationScheduler:
+    """Test digesting and quiet-hour deferral."""
+
+    async def test_events_are_aggregated_per_user_and_type(self):
+        """Five likes for one user become one digest with a count."""
+        scheduler = make_scheduler({})
+        for n in range(5):
+            await scheduler.schedule(42, "like", {"name": f"user {n}"})
+
+        await scheduler.release_due()
+
+        digest = scheduler.ready.get_nowait()
+        assert digest.payload() == {"name": "user 4", "count": 5}
+        assert scheduler.ready.empty()
+
+    async def test_quiet_hours_defer_instead_of_drop(self):
+        """Digests during quiet hours stay pending."""
+        now = datetime.now(UTC)
+        scheduler = make_scheduler(
+            {
+                "quiet_hours_start": (now - timedelta(hours=1)).strftime("%H:%M"),
+                "quiet_hours_end": (now + timedelta(hours=1)).strftime("%H:%M"),
+            }
+        )
+        await scheduler.schedule(42, "new_match", {"matched_user_id": 7})
+
+        await scheduler.release_due()
+
+        assert scheduler.ready.empty()
+        assert scheduler.pending[(42, "new_match")].due_at > time.monotonic()
+
+    async def test_disabled_type_is_skipped(self):
+        """Digests of disabled types are dropped at release."""
+        scheduler = make_scheduler({"likes": False})
+        await scheduler.schedule(42, "like", {})
+
+        await scheduler.release_due()
+
+        assert scheduler.ready.empty()
+        assert not scheduler.pending
+
+
+class TestDigestPersistence:
+    """Test that unsent digests survive restarts and failed sends."""
+
+    async def test_unsent_digests_survive_restart(self, tmp_path):
+        """Digests pending or waiting for dispatch are reloaded on start."""
+        store = DigestStore(str(tmp_path / "digests.sqlite3"))
+        scheduler = make_scheduler({}, store=store, workers=0)
+        await scheduler.schedule(42, "like", {"name": "a"})
+        await scheduler.schedule(42, "like", {"name": "b"})
+        await scheduler.schedule(7, "new_match", {"matched_user_id": 42})
+        await scheduler.release_due()
+        await scheduler.stop()
+
+        restarted = make_scheduler({}, store=store, workers=0)
+        await restarted.start()
+        await restarted.stop()
+
+        like = restarted.pending[(42, "like")]
+        assert like.payload() == {"name": "b", "count": 2}
+        assert (7, "new_match") in restarted.pending
+        store.close()
+
+    async def test_failed_send_is_retried_with_same_id(self, tmp_path):
+        """A failed digest goes back to pending and is removed once sent."""
+        store = DigestStore(str(tmp_path / "digests.sqlite3"))
+        attempts = []
+
+        async def flaky(user_id, notification_type, payload, digest_id):
+            attempts.append(digest_id)
+            return len(attempts) > 1
+
+        scheduler = make_scheduler({}, send=flaky, store=store, retry_delay=0)
+        await scheduler.schedule(42, "like", {})
+        await scheduler.start()
+        while len(attempts) < 2 or await store.load():
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+        assert attempts[0] == attempts[1]
+        assert not scheduler.pending
+        store.close()
+
+    async def test_failed_store_write_is_not_counted(self):
+        """An event whose digest could not be stored is rolled back."""
+
+        class BrokenStore:
+            async def save(self, record):
+                raise OSError("disk full")
+
+        scheduler = make_scheduler({}, store=BrokenStore())
+
+        with pytest.raises(OSError):
+            await scheduler.schedule(42, "like", {})
+
+        assert not scheduler.pending
+
+
+class TestTokenBucket:
+    """Test the send-rate token bucket."""
+
+    def test_burst_then_wait(self):
+        """Requests beyond capacity must wait for a refill."""
+        bucket = TokenBucket(rate=1.0, capacity=2)
+
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
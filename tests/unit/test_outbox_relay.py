@@ -0,0 +1,91 @@
+"""Tests for the data service outbox relay."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from services.data.outbox import OutboxRelay
+
+pytestmark = pytest.mark.unit
+
+
+class FakePublisher:
+    """Publisher stand-in failing selected outbox ids."""
+
+    def __init__(self, fail_ids=()):
+        self.published = []
+        self.fail_ids = set(fail_ids)
+
+    async def publish_event(
+        self, event_type, data, correlation_id=None, message_id=None
+    ):
+        if message_id in self.fail_ids:
+            return False
+        self.published.append(message_id)
+        return True
+
+
+def make_event(event_id, key):
+    return SimpleNamespace(
+        id=event_id,
+        event_type="message.sent",
+        aggregate_key=key,
+        payload={"n": event_id},
+        correlation_id=None,
+    )
+
+
+class TestOutboxRelay:
+    """Test ordering and partial failures."""
+
+    async def test_failure_stops_only_its_key(self):
+        """Later events of a failed key wait; other keys are unaffected."""
+        publisher = FakePublisher(fail_ids={"outbox-2"})
+        relay = OutboxRelay(None, publisher)
+        events = [
+            make_event(1, "conversation:1"),
+            make_event(2, "conversation:1"),
+            make_event(3, "conversation:2"),
+            make_event(4, "conversation:1"),
+        ]
+
+        published = await relay.publish_events(events)
+
+        assert sorted(published) == [1, 3]
+        assert "outbox-4" not in publisher.published
+
+    async def test_message_id_is_stable(self):
+        """Events are published with a message id derived from the outbox id."""
+        publisher = FakePublisher()
+        relay = OutboxRelay(None, publisher)
+
+        await relay.publish_events([make_event(7, None)])
+
+        assert publisher.published == ["outbox-7"]
+
+
+class FlakyBroker(FakePublisher):
+    """Publisher whose first connection attempts fail."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.exchange = None
+        self.attempts = 0
+        self.failures = failures
+
+    async def connect(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("broker unavailable")
+        self.exchange = object()
+
+
+async def test_relay_connects_with_backoff():
+    """The relay keeps retrying the broker instead of failing startup."""
+    publisher = FlakyBroker(failures=2)
+    relay = OutboxRelay(None, publisher, reconnect_delay=0)
+
+    await relay._connect()
+
+    assert publisher.attempts == 3
+    assert publisher.exchange is not None
@@ -0,0 +1,51 @@
+"""Tests for precompiled path classification."""
+
+import pytest
+
+from core.middleware.service_rate_limiters import (
+    ENDPOINT_RATE_LIMITERS,
+    get_rate_limiter_for_endpoint,
+)
+from core.utils.path_router import PathRouter
+
+pytestmark = pytest.mark.unit
+
+
+class TestPathRouter:
+    """Test exact, parameterized and prefix matches."""
+
+    def test_exact_and_parameterized_patterns(self):
+        """Literal segments win over parameters; extra segments don't match."""
+        router = PathRouter()
+        router.add("/chat/conversations/{id}/messages", "messages")
+        router.add("/chat/conversations/archived/messages", "archived")
+
+        assert router.match("/chat/conversations/42/messages") == "messages"
+        assert router.match("/chat/conversations/archived/messages") == "archived"
+        assert router.match("/chat/conversations/42/messages/7") is None
+        assert router.match("/chat/conversations/42") is None
+
+    def test_deepest_prefix_wins(self):
+        """Prefix patterns cover sub-paths and the most specific one is used."""
+        router = PathRouter()
+        router.add("/media", "media", prefix=True)
+        router.add("/media/upload", "upload", prefix=True)
+        router.add("/admin/users/{user_id}/ban", "ban", prefix=True)
+        router.add("/admin/users/{user_id}/unban", "unban", prefix=True)
+
+        assert router.match("/media/upload/photo") == "upload"
+        assert router.match("/media/abc") == "media"
+        assert router.match("/admin/users/5/unban") == "unban"
+        assert router.match("/other") is None
+
+    def test_endpoint_rate_limiters_are_routed(self):
+        """Service middleware resolves configured endpoint limiters."""
+        assert (
+            get_rate_limiter_for_endpoint("/chat/conversations/9/messages")
+            is ENDPOINT_RATE_LIMITERS["/chat/conversations/{id}/messages"]
+        )
+        assert (
+            get_rate_limiter_for_endpoint("/auth/validate")
+            is ENDPOINT_RATE_LIMITERS["/auth/validate"]
+        )
+        assert get_rate_limiter_for_endpoint("/profiles/me") is None
@@ -0,0 +1,70 @@
+"""Tests for stage timing, loop monitoring and sampling profiles."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.middleware.profiling import (
+    LoopMonitor,
+    _stage_timings,
+    record_stage,
+    sample_profile,
+    stage,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def busy_wait(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+class TestProfiling:
+    """Test the profiling building blocks."""
+
+    def test_stages_accumulate_per_request(self):
+        """Spans of the same stage add up in the request's timings."""
+        timings = {}
+        token = _stage_timings.set(timings)
+        try:
+            record_stage("db", 0.25)
+            record_stage("db", 0.5)
+            with stage("serialization"):
+                pass
+        finally:
+            _stage_timings.reset(token)
+
+        assert timings["db"] == pytest.approx(0.75)
+        assert "serialization" in timings
+
+    def test_sample_profile_returns_folded_stacks(self):
+        """Samples of a busy thread name the function it is running."""
+        stop = threading.Event()
+        thread = threading.Thread(target=busy_wait, args=(stop,))
+        thread.start()
+        try:
+            folded = sample_profile(thread.ident, 0.1, interval=0.001)
+        finally:
+            stop.set()
+            thread.join()
+
+        stack, count = folded.splitlines()[0].rsplit(" ", 1)
+        assert "busy_wait (test_profiling.py" in stack
+        assert int(count) > 0
+
+    async def test_blocked_loop_is_reported(self):
+        """A callback blocking the loop is reported with its stack."""
+        monitor = LoopMonitor("test", interval=0.01, slow_threshold=0.05)
+        await monitor.start()
+        await asyncio.sleep(0.03)
+
+        time.sleep(0.2)  # Block the event loop
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        assert monitor.slow_callbacks
+        assert "test_blocked_loop_is_reported" in monitor.slow_callbacks[0]["stack"]
+        assert monitor.max_lag >= 0.1
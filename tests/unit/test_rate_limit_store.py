@@ -0,0 +1,108 @@
+"""Tests for rate limiting shared across replicas."""
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from core.middleware.service_rate_limiters import _get_user_identifier
+from core.utils.rate_limit_store import DistributedRateLimiter, InMemoryRateLimitStore
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FailingStore:
+    async def sync(self, name, window_seconds, updates):
+        raise ConnectionError("store down")
+
+
+class OutageStore(InMemoryRateLimitStore):
+    """In-memory store that can be switched off."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    async def sync(self, name, window_seconds, updates):
+        if self.down:
+            raise ConnectionError("store down")
+        return await super().sync(name, window_seconds, updates)
+
+
+class TestDistributedRateLimiter:
+    """Test shared limits, batched sync and local fallback."""
+
+    async def test_replicas_share_limit_after_sync(self):
+        """Requests counted by one replica reduce the budget of another."""
+        clock = FakeClock(0.0)
+        store = InMemoryRateLimitStore()
+        first = DistributedRateLimiter("api", 4, 60, store, clock=clock)
+        second = DistributedRateLimiter("api", 4, 60, store, clock=clock)
+
+        assert all(first.check("user").allowed for _ in range(3))
+        await first.sync()
+        await second.sync()
+        assert second.check("user").allowed
+        await second.sync()
+
+        decision = second.check("user")
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(60.0)
+
+        await first.close()
+        await second.close()
+
+    async def test_store_failure_falls_back_to_local_limit(self):
+        """An unavailable store keeps enforcing the limit per replica."""
+        clock = FakeClock(0.0)
+        limiter = DistributedRateLimiter("api", 2, 60, FailingStore(), clock=clock)
+
+        assert limiter.check("user").allowed
+        await limiter.sync()
+        assert limiter.check("user").allowed
+        await limiter.sync()
+
+        assert not limiter.check("user").allowed
+        await limiter.close()
+
+    async def test_requests_counted_during_outage_are_pushed(self):
+        """Deltas counted while degraded reach the store when it recovers."""
+        clock = FakeClock(0.0)
+        store = OutageStore()
+        first = DistributedRateLimiter(
+            "api", 4, 60, store, retry_interval=5, clock=clock
+        )
+        second = DistributedRateLimiter("api", 4, 60, store, clock=clock)
+
+        store.down = True
+        assert first.check("user").allowed
+        await first.sync()
+        assert all(first.check("user").allowed for _ in range(2))
+        await first.sync()
+
+        store.down = False
+        clock.now = 10.0
+        await first.sync()
+
+        await second.sync()
+        assert second.check("user").allowed
+        await second.sync()
+        assert not second.check("user").allowed
+
+        await first.close()
+        await second.close()
+
+
+def test_anonymous_clients_keyed_by_address():
+    """Anonymous keys are stable across processes and distinct from user IDs."""
+    request = make_mocked_request(
+        "GET", "/", headers={"X-Forwarded-For": "203.0.113.7, 10.0.0.1"}
+    )
+
+    assert _get_user_identifier(request) == "ip:203.0.113.7"
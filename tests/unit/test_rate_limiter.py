@@ -0,0 +1,54 @@
+"""Tests for the sliding-window-counter rate limiter."""
+
+import pytest
+
+from core.utils.rate_limiter import SlidingWindowRateLimiter
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestSlidingWindowRateLimiter:
+    """Test limits, window sliding and eviction."""
+
+    def test_limit_within_window(self):
+        """Requests beyond the limit are rejected with a retry hint."""
+        clock = FakeClock(0.0)
+        limiter = SlidingWindowRateLimiter(3, 60, clock=clock)
+
+        assert [limiter.is_allowed("a") for _ in range(4)] == [True] * 3 + [False]
+        decision = limiter.check("a")
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(60.0)
+        assert limiter.is_allowed("b")
+
+    def test_previous_window_is_weighted(self):
+        """Half-way into the next window half of the old requests still count."""
+        clock = FakeClock(0.0)
+        limiter = SlidingWindowRateLimiter(4, 60, clock=clock)
+        for _ in range(4):
+            limiter.check("a")
+
+        clock.now = 90.0  # 50% of the previous window still overlaps
+
+        assert [limiter.is_allowed("a") for _ in range(3)] == [True, True, False]
+
+    def test_idle_keys_are_evicted(self):
+        """Keys idle for two windows are dropped as new keys arrive."""
+        clock = FakeClock(0.0)
+        limiter = SlidingWindowRateLimiter(10, 60, clock=clock)
+        for key in range(5):
+            limiter.check(key)
+
+        clock.now = 180.0
+        for key in range(5, 10):
+            limiter.check(key)
+
+        assert limiter.get_stats()["active_users"] == 5
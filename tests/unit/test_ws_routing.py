@@ -0,0 +1,66 @@
+"""Tests for gateway WebSocket upstream selection and mux framing."""
+
+import pytest
+
+from core.utils.ws_mux import OP_OPEN, OP_TEXT, pack_control, pack_frame, unpack_frame
+from gateway.upstreams import UpstreamSelector
+
+pytestmark = pytest.mark.unit
+
+
+class TestUpstreamSelector:
+    """Test upstream selection policies."""
+
+    def test_rendezvous_is_sticky(self):
+        """The same conversation always maps to the same upstream."""
+        urls = ["http://chat-1:8085", "http://chat-2:8085", "http://chat-3:8085"]
+        selector = UpstreamSelector(urls, "rendezvous")
+
+        picks = {selector.select("42") for _ in range(10)}
+
+        assert len(picks) == 1
+
+    def test_rendezvous_only_moves_keys_of_removed_upstream(self):
+        """Removing an upstream keeps the other keys where they were."""
+        urls = ["http://chat-1:8085", "http://chat-2:8085", "http://chat-3:8085"]
+        before = UpstreamSelector(urls, "rendezvous")
+        after = UpstreamSelector(urls[:2], "rendezvous")
+
+        for key in map(str, range(200)):
+            if before.select(key) != urls[2]:
+                assert after.select(key) == before.select(key)
+
+    def test_round_robin_without_key(self):
+        """Requests without a routing key are spread across upstreams."""
+        urls = ["http://chat-1:8085", "http://chat-2:8085"]
+        selector = UpstreamSelector(urls, "rendezvous")
+
+        assert {selector.select(None) for _ in range(4)} == set(urls)
+
+    def test_unknown_policy(self):
+        """Unknown policies are rejected."""
+        with pytest.raises(ValueError):
+            UpstreamSelector(["http://chat-1:8085"], "random")
+
+
+class TestMuxFraming:
+    """Test mux frame encoding."""
+
+    def test_roundtrip(self):
+        """Frames keep channel id, opcode and payload."""
+        frame = pack_frame(70000, OP_TEXT, b'{"type":"typing"}')
+
+        assert unpack_frame(frame) == (70000, OP_TEXT, b'{"type":"typing"}')
+
+    def test_control_frame(self):
+        """Control frames carry JSON payloads."""
+        channel_id, opcode, payload = unpack_frame(
+            pack_control(1, OP_OPEN, {"protocol": None})
+        )
+
+        assert (channel_id, opcode, payload) == (1, OP_OPEN, b'{"protocol": null}')
+
+    def test_short_frame(self):
+        """Truncated frames are rejected."""
+        with pytest.raises(ValueError):
+            unpack_frame(b"\x00\x01")